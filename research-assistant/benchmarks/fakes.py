@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import weakref
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from unittest.mock import patch
+
+import httpx
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+# Deterministic local stand-ins for Groq, Tavily and the web, so the workflow
+# can be benchmarked offline. Every response is derived from the prompt, query
+# or URL, so repeated runs do the same work.
+
+_VOCABULARY = (
+    "energy solar wind battery storage grid policy market cost efficiency research climate emissions "
+    "carbon demand supply technology investment data analysis growth capacity panel turbine network "
+    "regulation price consumer industry report evidence study result trend model forecast region"
+).split()
+
+
+@dataclass
+class BenchmarkProfile:
+    """Latency and payload sizes for the fake services."""
+    llm_latency: float = 0.05
+    search_latency: float = 0.05
+    fetch_latency: float = 0.05
+    subtopics: int = 3
+    queries_per_subtopic: int = 2
+    results_per_query: int = 4
+    page_words: int = 1500
+    summary_words: int = 60
+    # Keep the configured per-model rate limits; off by default so runs measure the pipeline
+    rate_limits: bool = False
+
+
+def _rng(key: str) -> random.Random:
+    return random.Random(int(hashlib.sha256(key.encode("utf-8")).hexdigest()[:16], 16))
+
+
+def make_text(key: str, words: int) -> str:
+    """Generate deterministic filler text for a key."""
+    rng = _rng(key)
+    sentences = []
+    for _ in range(max(1, words // 12)):
+        sentence = " ".join(rng.choice(_VOCABULARY) for _ in range(12))
+        sentences.append(sentence.capitalize() + ".")
+    return " ".join(sentences)
+
+
+class FakeLLM:
+    """Chat model that answers each workflow prompt with valid, deterministic JSON or text."""
+
+    def __init__(self, profile: BenchmarkProfile, model_name: str = "fake-llm"):
+        self.profile = profile
+        self.model_name = model_name
+        self.calls = 0
+
+    def _respond(self, prompt: str) -> str:
+        profile = self.profile
+        if "Create a detailed research plan" in prompt:
+            subtopics = [f"Subtopic {i + 1}" for i in range(profile.subtopics)]
+            return json.dumps({
+                "main_topic": "Benchmark topic",
+                "subtopics": subtopics,
+                "queries": [
+                    {"query": f"{subtopic} query {j + 1}", "purpose": "Benchmark", "subtopic": subtopic}
+                    for subtopic in subtopics for j in range(profile.queries_per_subtopic)
+                ],
+                "expected_depth": 3,
+                "estimated_sources": profile.subtopics * profile.queries_per_subtopic
+            })
+        if "Analyze and summarize the following content from" in prompt:
+            url = re.search(r"content from (\S+)", prompt).group(1)
+            return json.dumps({
+                "source_url": url,
+                "source_title": f"Page {url}",
+                "key_points": [make_text(f"{url}:point:{i}", 12) for i in range(3)],
+                "evidence": [make_text(f"{url}:evidence", 12)],
+                "relevance_score": 0.5 + _rng(url).random() / 2,
+                "summary": make_text(f"{url}:summary", profile.summary_words),
+                "content_type": "article"
+            })
+        if "Write one section" in prompt:
+            subtopic = re.search(r"subtopic: (.+)", prompt).group(1).strip()
+            return json.dumps({
+                "heading": subtopic,
+                "content": make_text(f"section:{subtopic}", profile.summary_words * 2),
+                "references": [int(index) for index in re.findall(r"Source (\d+):", prompt)]
+            })
+        if "research brief" in prompt:
+            indices = sorted({int(index) for index in re.findall(r"Source (\d+):", prompt)}) or [1]
+            return json.dumps({
+                "topic": "Benchmark topic",
+                "summary": make_text("brief:summary", profile.summary_words),
+                "sections": [
+                    {"heading": f"Section {i + 1}", "content": make_text(f"brief:section:{i}", profile.summary_words * 2), "references": indices}
+                    for i in range(profile.subtopics)
+                ],
+                "references": [],
+                "metadata": {},
+                "timestamp": "2024-01-01T00:00:00",
+                "token_usage": {"prompt": 0, "completion": 0, "total": 0}
+            })
+        return make_text(f"text:{len(prompt)}", profile.summary_words)
+
+    async def ainvoke(self, prompt: str, *args, **kwargs) -> Any:
+        self.calls += 1
+        await asyncio.sleep(self.profile.llm_latency)
+        return AIMessage(content=self._respond(prompt))
+
+    async def astream(self, prompt: str, *args, **kwargs):
+        response = await self.ainvoke(prompt)
+        yield AIMessageChunk(content=response.content)
+
+
+class FakeSearchTool:
+    """Tavily stand-in returning a fixed number of results per query.
+
+    Half of each query's results are shared with the other queries of its
+    subtopic, so merging and de-duplication have work to do.
+    """
+
+    def __init__(self, profile: BenchmarkProfile):
+        self.profile = profile
+        self.calls = 0
+
+    async def ainvoke(self, query: str) -> List[Dict[str, Any]]:
+        self.calls += 1
+        await asyncio.sleep(self.profile.search_latency)
+        subtopic = query.rsplit(" query ", 1)[0].replace(" ", "-").lower()
+        results = []
+        for i in range(self.profile.results_per_query):
+            path = f"{subtopic}/shared-{i}" if i % 2 == 0 else f"{query.replace(' ', '-').lower()}/{i}"
+            url = f"https://site{i % 3}.example.com/{path}"
+            results.append({"url": url, "title": f"Result {path}", "content": "snippet", "score": 1 - i / 10})
+        return results
+
+
+class FakeWeb:
+    """Serves deterministic HTML pages through an httpx mock transport."""
+
+    def __init__(self, profile: BenchmarkProfile):
+        self.profile = profile
+        self.requests = 0
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        await asyncio.sleep(self.profile.fetch_latency)
+        url = str(request.url)
+        html = (
+            "<html><body><nav>Home News About</nav>"
+            f"<h1>Page {url}</h1><p>{make_text(url, self.profile.page_words)}</p>"
+            "<footer>Copyright Example</footer></body></html>"
+        )
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, text=html)
+
+    def client(self) -> httpx.AsyncClient:
+        """Get the mock-backed client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if loop not in self._clients:
+            self._clients[loop] = httpx.AsyncClient(transport=httpx.MockTransport(self._handle))
+        return self._clients[loop]
+
+
+@contextmanager
+def offline_services(profile: BenchmarkProfile, storage_dir: str, llm: Optional[FakeLLM] = None):
+    """Patch the workflow to use the fake LLM, search and web, with storage, checkpoints and blobs in storage_dir."""
+    from src.services.context import wait_for_rolling_summary_updates
+    from src.services.fetcher import fetch_pages
+
+    llm = llm or FakeLLM(profile)
+    search_tool = FakeSearchTool(profile)
+    web = FakeWeb(profile)
+
+    async def fake_fetch_pages(urls: List[str], client: Optional[httpx.AsyncClient] = None, **kwargs) -> List[Any]:
+        return await fetch_pages(urls, client=web.client(), **kwargs)
+
+    with ExitStack() as stack:
+        stack.enter_context(patch("src.graph.nodes.get_llm", return_value=llm))
+        stack.enter_context(patch("src.services.context.get_llm", return_value=llm))
+        stack.enter_context(patch("src.services.search.get_search_tool", return_value=search_tool))
+        stack.enter_context(patch("src.graph.nodes.fetch_pages", fake_fetch_pages))
+        stack.enter_context(patch("src.services.fetcher.PAGE_CACHE_ENABLED", False))
+        stack.enter_context(patch("src.services.storage.STORAGE_DIR", storage_dir))
+        stack.enter_context(patch("src.services.checkpoints.CHECKPOINT_DB_PATH", os.path.join(storage_dir, "checkpoints.sqlite3")))
+        stack.enter_context(patch("src.services.blobs.BLOB_STORE_DIR", os.path.join(storage_dir, "blobs")))
+        stack.enter_context(patch("src.services.scheduler._schedulers", {}))
+        if not profile.rate_limits:
+            stack.enter_context(patch("src.services.scheduler.LLM_RATE_LIMITS", {}))
+            stack.enter_context(patch(
+                "src.services.scheduler.LLM_DEFAULT_RATE_LIMIT",
+                {"requests_per_minute": 0, "tokens_per_minute": 0}
+            ))
+        # Background rolling summary updates must finish while storage is still patched
+        stack.callback(wait_for_rolling_summary_updates)
+        yield llm, search_tool, web
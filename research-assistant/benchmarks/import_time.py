@@ -0,0 +1,114 @@
+"""Import-time profile of the package entry points.
+
+Imports each module in a fresh interpreter under `python -X importtime` and
+reports its start-up time, the slowest imports it pulls in, and any heavy
+packages that were loaded eagerly:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time src.cli.main --budget-ms 200 --output imports.json
+
+Exits with status 1 when a module is over the start-up budget or loads a
+package that should only be imported on first use.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import click
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ("src.cli.main", "src.api.main", "src.services.llm", "src.graph.workflow")
+
+_LANGCHAIN = ("langchain", "langchain_core", "langchain_community", "langchain_groq", "langgraph", "langsmith")
+
+# Packages each module must leave for first use
+LAZY_PACKAGES = {
+    "src.cli.main": _LANGCHAIN + ("requests", "fastapi", "httpx"),
+    "src.api.main": _LANGCHAIN,
+    "src.services.llm": _LANGCHAIN,
+    "src.graph.workflow": _LANGCHAIN
+}
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+    """Parse `-X importtime` output into (module, self, cumulative) times in microseconds."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        imports.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return imports
+
+
+def _run_import(module: str, importtime: bool) -> Tuple[float, str]:
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", f"import {module}"]
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed: {result.stderr.strip().splitlines()[-1]}")
+    return elapsed, result.stderr
+
+
+def profile_import(module: str, runs: int = 3, top: int = 10) -> Dict[str, Any]:
+    """Profile importing module in a fresh interpreter.
+
+    Start-up is the best wall-clock time over runs, interpreter start
+    included; the import breakdown comes from one extra run with importtime.
+    """
+    startup = min(_run_import(module, importtime=False)[0] for _ in range(max(1, runs)))
+    imports = parse_importtime(_run_import(module, importtime=True)[1])
+
+    cumulative = next((total for name, _, total in imports if name == module), 0)
+    loaded = sorted({name.split(".")[0] for name, _, _ in imports})
+    slowest = sorted((entry for entry in imports if entry[0] != module), key=lambda entry: entry[2], reverse=True)[:top]
+
+    return {
+        "module": module,
+        "startup_ms": round(startup * 1000, 1),
+        "import_ms": round(cumulative / 1000, 1),
+        "slowest": [{"module": name, "self_ms": round(own / 1000, 1), "cumulative_ms": round(total / 1000, 1)} for name, own, total in slowest],
+        "lazy_violations": [package for package in LAZY_PACKAGES.get(module, ()) if package in loaded]
+    }
+
+
+@click.command()
+@click.argument("modules", nargs=-1)
+@click.option("--runs", default=3, help="Timed imports per module; the fastest counts")
+@click.option("--top", default=10, help="Slowest imports to list per module")
+@click.option("--budget-ms", type=float, help="Fail modules whose start-up takes longer")
+@click.option("--output", type=click.Path(dir_okay=False), help="Where to write the JSON profile")
+def main(modules, runs, top, budget_ms, output):
+    """Profile the import time of the package entry points."""
+    profiles = [profile_import(module, runs, top) for module in modules or DEFAULT_MODULES]
+
+    failed = False
+    for profile in profiles:
+        click.echo(f"{profile['module']}: start-up {profile['startup_ms']:.0f} ms, imports {profile['import_ms']:.0f} ms")
+        for entry in profile["slowest"]:
+            click.echo(f"    {entry['cumulative_ms']:8.1f} ms  {entry['module']}")
+        if profile["lazy_violations"]:
+            click.echo(f"  Loaded at import time: {', '.join(profile['lazy_violations'])}")
+            failed = True
+        if budget_ms is not None and profile["startup_ms"] > budget_ms:
+            click.echo(f"  Over the {budget_ms:.0f} ms budget")
+            failed = True
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(profiles, f, indent=2)
+        click.echo(f"Profile written to {output}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
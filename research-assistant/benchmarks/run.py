@@ -0,0 +1,251 @@
+"""Offline benchmark for the research workflow.
+
+Runs the full graph against deterministic fakes (see benchmarks/fakes.py) and
+writes the results as JSON:
+
+    python -m benchmarks.run --briefs 20 --concurrency 8 --output results.json
+    python -m benchmarks.run --baseline results.json
+
+Measures per-node latency, end-to-end p50/p95, throughput through the FastAPI
+app at the given concurrency, peak memory, and LLM calls and tokens per brief.
+With --baseline, metrics that got worse by more than --tolerance are reported
+and the exit status is 1.
+"""
+import asyncio
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Dict, List
+
+import click
+import httpx
+
+from benchmarks.fakes import BenchmarkProfile, FakeLLM, offline_services
+
+TOPIC = "Benchmark topic"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def latency_stats(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "max": max(values) if values else 0.0
+    }
+
+
+def _initial_state(index: int, depth: int) -> Dict[str, Any]:
+    from src.graph.state import ResearchState
+
+    return ResearchState(user_id=f"bench-{index}", topic=TOPIC, depth=depth, is_follow_up=False).dict()
+
+
+async def run_sequential(briefs: int, depth: int, llm: FakeLLM) -> Dict[str, Any]:
+    """Run briefs one at a time, timing each node and the whole workflow."""
+    from src.graph.workflow import get_research_graph
+
+    workflow = get_research_graph()
+    node_times: Dict[str, List[float]] = {}
+    totals, tokens, calls = [], [], []
+
+    for i in range(briefs):
+        calls_before = llm.calls
+        start = previous = time.perf_counter()
+        result = None
+        async for update in workflow.astream(_initial_state(i, depth)):
+            now = time.perf_counter()
+            for node, result in update.items():
+                node_times.setdefault(node, []).append(now - previous)
+            previous = now
+        totals.append(time.perf_counter() - start)
+        calls.append(llm.calls - calls_before)
+
+        if not result or not result.get("final_brief"):
+            raise RuntimeError(f"Benchmark brief failed: {result.get('error') if result else 'no result'}")
+        tokens.append(result["final_brief"].dict()["token_usage"]["total"])
+
+    return {
+        "nodes": {node: latency_stats(times) for node, times in node_times.items()},
+        "end_to_end": latency_stats(totals),
+        "llm": {
+            "calls_per_brief": sum(calls) / len(calls),
+            "tokens_per_brief": sum(tokens) / len(tokens),
+            "token_usage_by_node": result["final_brief"].metadata.get("token_usage", {}).get("nodes", {})
+        }
+    }
+
+
+async def run_throughput(briefs: int, concurrency: int, depth: int) -> Dict[str, Any]:
+    """POST briefs to the FastAPI app with at most concurrency in flight."""
+    from src.api.main import app
+
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses: Dict[str, int] = {}
+    latencies = []
+
+    async def post(client: httpx.AsyncClient, index: int):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/brief", json={
+                "topic": TOPIC, "depth": depth, "follow_up": False, "user_id": f"bench-{index}"
+            })
+            latencies.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(post(client, i) for i in range(briefs)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": briefs,
+        "seconds": elapsed,
+        "requests_per_second": briefs / elapsed if elapsed else 0.0,
+        "status_codes": statuses,
+        "latency": latency_stats(latencies)
+    }
+
+
+async def run_memory(depth: int) -> Dict[str, Any]:
+    """Run one brief under tracemalloc to find the peak Python allocation.
+
+    Also reports the most page content the brief held in memory at once, and
+    how much it spilled to the blob store.
+    """
+    from src.graph.workflow import get_research_graph
+    from src.services.memory import track_memory
+
+    tracemalloc.start()
+    try:
+        with track_memory() as tracker:
+            await get_research_graph().ainvoke(_initial_state(0, depth))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    memory = {
+        "peak_traced_bytes": peak,
+        "peak_content_bytes": tracker.peak,
+        "spilled_content_bytes": tracker.spilled
+    }
+    try:
+        import resource
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        memory["max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    except ImportError:
+        pass
+    return memory
+
+
+async def run_benchmark(profile: BenchmarkProfile, briefs: int, concurrency: int, depth: int) -> Dict[str, Any]:
+    llm = FakeLLM(profile)
+    with tempfile.TemporaryDirectory() as storage_dir, offline_services(profile, storage_dir, llm):
+        sequential = await run_sequential(briefs, depth, llm)
+        throughput = await run_throughput(briefs, concurrency, depth)
+        memory = await run_memory(depth)
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "config": {"briefs": briefs, "concurrency": concurrency, "depth": depth, "profile": asdict(profile)},
+        **sequential,
+        "throughput": throughput,
+        "memory": memory
+    }
+
+
+# Metrics compared against a baseline, and whether higher values are better
+COMPARED_METRICS = {
+    ("end_to_end", "p50"): False,
+    ("end_to_end", "p95"): False,
+    ("throughput", "requests_per_second"): True,
+    ("memory", "peak_traced_bytes"): False,
+    ("memory", "peak_content_bytes"): False,
+    ("llm", "calls_per_brief"): False,
+    ("llm", "tokens_per_brief"): False
+}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """List the metrics that regressed by more than tolerance (a fraction) against the baseline."""
+    regressions = []
+    for (section, metric), higher_is_better in COMPARED_METRICS.items():
+        old = baseline.get(section, {}).get(metric)
+        new = results.get(section, {}).get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            regressions.append(f"{section}.{metric}: {old:.4g} -> {new:.4g} ({change:+.1%})")
+    return regressions
+
+
+@click.command()
+@click.option("--briefs", default=10, help="Briefs per measurement")
+@click.option("--concurrency", default=4, help="Concurrent requests for the throughput run")
+@click.option("--depth", default=3, help="Research depth of each brief")
+@click.option("--llm-latency", default=0.05, help="Seconds per fake LLM call")
+@click.option("--search-latency", default=0.05, help="Seconds per fake search query")
+@click.option("--fetch-latency", default=0.05, help="Seconds per fake page fetch")
+@click.option("--results-per-query", default=4, help="Search results per query")
+@click.option("--page-words", default=1500, help="Words per fetched page")
+@click.option("--rate-limits", is_flag=True, help="Apply the configured LLM rate limits")
+@click.option("--output", type=click.Path(dir_okay=False), help="Where to write the JSON results")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False), help="Earlier results to compare against")
+@click.option("--tolerance", default=0.1, help="Allowed regression against the baseline, as a fraction")
+def main(briefs, concurrency, depth, llm_latency, search_latency, fetch_latency, results_per_query,
+         page_words, rate_limits, output, baseline, tolerance):
+    """Benchmark the research workflow offline."""
+    profile = BenchmarkProfile(
+        llm_latency=llm_latency,
+        search_latency=search_latency,
+        fetch_latency=fetch_latency,
+        results_per_query=results_per_query,
+        page_words=page_words,
+        rate_limits=rate_limits
+    )
+    results = asyncio.run(run_benchmark(profile, briefs, concurrency, depth))
+
+    output = output or os.path.join("benchmarks", "results", f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    click.echo(f"End to end: p50 {results['end_to_end']['p50']:.3f}s, p95 {results['end_to_end']['p95']:.3f}s")
+    click.echo(f"Throughput: {results['throughput']['requests_per_second']:.2f} briefs/s at concurrency {concurrency}")
+    click.echo(f"LLM: {results['llm']['calls_per_brief']:.1f} calls, {results['llm']['tokens_per_brief']:.0f} tokens per brief")
+    click.echo(f"Peak memory: {results['memory']['peak_traced_bytes'] / 1024 / 1024:.1f} MiB traced, "
+               f"{results['memory']['peak_content_bytes'] / 1024:.0f} KiB of page content")
+    click.echo(f"Results written to {output}")
+
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare(results, json.load(f), tolerance)
+        for regression in regressions:
+            click.echo(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,25 @@
 from ..utils import patch
 from fastapi import FastAPI, HTTPException
-from typing import Optional
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+import asyncio
+import json
 import uuid
 import os
 from pathlib import Path
 from dotenv import dotenv_values
 from .schemas import BriefRequest
-from ..graph.workflow import create_research_graph
+from ..graph.workflow import get_research_graph
 from ..graph.state import ResearchState
+from ..services.fetcher import close_http_client
+from ..services.checkpoints import is_run_of_other_request, request_fingerprint
+from ..services.context import wait_for_rolling_summary_updates
+from ..services.events import progress_listener
+from ..services.jobs import JobWorkerPool, submit_job, get_job
+from ..services.metrics import WORKFLOWS_IN_FLIGHT, render_metrics, track_in_flight
+from ..services.memory import track_memory
+from ..utils.config import WARMUP_ENABLED, MAX_INFLIGHT_WORKFLOWS, JOB_WORKERS, LLM_HTTP_TIMEOUT
 
 
 env_path = Path('.') / '.env'
@@ -20,46 +32,304 @@ if env_path.exists():
 if not os.getenv("LANGCHAIN_API_KEY"):
     os.environ["LANGCHAIN_TRACING_V2"] = "false"
 
-app = FastAPI(title="Research Assistant API", version="1.0.0")
+def warm_up():
+    """Preload the tokenizer, search tool and loaders so the first request doesn't pay for them."""
+    from bs4 import BeautifulSoup
+    from ..services.search import get_search_tool
+    from ..services.tokens import get_encoding
+    
+    get_encoding()
+    BeautifulSoup("<html></html>", "html.parser")
+    
+    try:
+        get_search_tool(max_results=1)
+    except Exception as e:
+        print(f"Warmup: search tool not available: {str(e)}")
+
+
+async def awarm_up():
+    """Warm up, creating the model clients on the server's event loop.
+
+    Async clients are kept per event loop, so they have to be created on
+    the loop the requests run on rather than in a worker thread.
+    """
+    from ..services.llm import get_llm
+    
+    await asyncio.to_thread(warm_up)
+    
+    for task_type in ["planning", "summarization", "synthesis"]:
+        try:
+            get_llm(task_type)
+        except Exception as e:
+            print(f"Warmup: LLM for {task_type} not available: {str(e)}")
+
+
+async def _warm_up_in_background(app: FastAPI):
+    try:
+        await awarm_up()
+    except Exception as e:
+        print(f"Warmup failed: {str(e)}")
+    app.state.ready = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Compile the workflow once per worker, warm up in the background and start the job workers.
+
+    On shutdown, rolling summary updates still running get up to LLM_HTTP_TIMEOUT to finish.
+    """
+    app.state.ready = False
+    app.state.workflow = get_research_graph()
+    
+    if WARMUP_ENABLED:
+        warmup_task = asyncio.create_task(_warm_up_in_background(app))
+    else:
+        app.state.ready = True
+    
+    job_workers.start()
+    
+    yield
+    
+    await job_workers.stop()
+    if WARMUP_ENABLED:
+        warmup_task.cancel()
+    await asyncio.to_thread(wait_for_rolling_summary_updates, LLM_HTTP_TIMEOUT)
+    await close_http_client()
+
+
+app = FastAPI(title="Research Assistant API", version="1.0.0", lifespan=lifespan)
+
+
+@app.get("/health")
+async def health():
+    """Liveness check."""
+    return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness check: healthy only once the workflow is compiled and warmup has finished."""
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this worker process."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+class WorkflowLimiter:
+    """Counts in-flight workflows in this worker and rejects new ones past the limit."""
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+    
+    def acquire(self):
+        # Runs on the event loop thread only, so no lock is needed
+        if self.limit > 0 and self.in_flight >= self.limit:
+            raise HTTPException(
+                status_code=503,
+                detail="Too many briefs in progress, please retry later",
+                headers={"Retry-After": "5"}
+            )
+        self.in_flight += 1
+        WORKFLOWS_IN_FLIGHT.inc(kind="request")
+    
+    def release(self):
+        self.in_flight -= 1
+        WORKFLOWS_IN_FLIGHT.dec(kind="request")
+    
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+workflow_limiter = WorkflowLimiter(MAX_INFLIGHT_WORKFLOWS)
+
 
 @app.post("/brief")
 async def generate_brief(request: BriefRequest):
     """Generate a research brief on the given topic."""
+    with workflow_limiter:
+        return await _run_brief(request)
+
+
+async def _run_id_taken(request: BriefRequest) -> bool:
+    """Whether a client-supplied run_id already names a run of a different request."""
+    if not request.run_id:
+        return False
+    fingerprint = request_fingerprint(request.user_id, request.topic, request.depth, request.follow_up)
+    return await asyncio.to_thread(is_run_of_other_request, request.run_id, fingerprint)
+
+
+async def _run_brief(request: BriefRequest):
+    """Run the research workflow for a request without blocking the event loop."""
+    # The run id names the workflow's checkpoints; failures return it so the
+    # client can retry from the last completed node
+    run_id = request.run_id or str(uuid.uuid4())
+    headers = {"X-Run-Id": run_id}
+    
     try:
-        # Create a unique ID for this request
-        request_id = str(uuid.uuid4())
+        if await _run_id_taken(request):
+            raise HTTPException(status_code=409, detail=f"Run {run_id} belongs to a different request", headers=headers)
         
         # Initialize state
         state = ResearchState(
             user_id=request.user_id,
             topic=request.topic,
             depth=request.depth,
-            is_follow_up=request.follow_up
+            is_follow_up=request.follow_up,
+            run_id=run_id
         )
         
-        # Create and run the workflow
-        workflow_app = create_research_graph()
-        result = workflow_app.invoke(state.dict())
+        # Run the workflow compiled at startup
+        workflow_app = get_research_graph()
+        with track_memory():
+            result = await workflow_app.ainvoke(state.dict())
         
         if result.get("error"):
-            raise HTTPException(status_code=500, detail=result["error"])
+            raise HTTPException(status_code=500, detail=result["error"], headers=headers)
         
         if not result.get("final_brief"):
-            raise HTTPException(status_code=500, detail="Failed to generate brief")
+            raise HTTPException(status_code=500, detail="Failed to generate brief", headers=headers)
         
         return result["final_brief"].dict()
     
+    except HTTPException:
+        raise
     except ValueError as e:
         
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e), headers=headers)
     except Exception as e:
         
         import traceback
         error_detail = f"{str(e)}\n{traceback.format_exc()}"
         print(error_detail) 
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e), headers=headers)
+
+async def _run_job(request: Dict[str, Any]) -> Dict[str, Any]:
+    with track_in_flight("job"):
+        return await _run_brief(BriefRequest(**request))
+
+
+job_workers = JobWorkerPool(_run_job, JOB_WORKERS)
+
+
+@app.post("/jobs", status_code=202)
+async def submit_brief_job(request: BriefRequest):
+    """Queue a research brief and return its job id.
+
+    An identical request (same user, topic, depth and follow-up flag) that is
+    still queued or running is joined instead of starting another workflow.
+    """
+    job_id, created = await asyncio.to_thread(submit_job, request.dict())
+    if created:
+        job_workers.notify()
+    return {"job_id": job_id, "created": created}
+
+
+@app.get("/jobs/{job_id}")
+async def get_brief_job(job_id: str):
+    """Get the status of a queued brief, with the brief once it has succeeded."""
+    job = await asyncio.to_thread(get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _format_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _node_events(node: str, state: Dict[str, Any]):
+    """Progress events for a finished workflow node."""
+    if node == "planning" and state.get("research_plan"):
+        yield "plan", state["research_plan"].dict()
+    yield "node", {"node": node}
+
+
+@app.post("/brief/stream")
+async def stream_brief(request: BriefRequest):
+    """Generate a research brief, streaming progress as Server-Sent Events.
+
+    Emits "node" as each workflow node finishes, "plan" once it is known,
+    "sources" as each subtopic's search finishes, "source_summary" for each
+    summarized source,
+    "section_draft" for each subtopic drafted in hierarchical synthesis, "token"
+    deltas while the brief is synthesized, and finally "brief" or "error".
+    Errors carry the run_id to retry with.
+    """
+    workflow_limiter.acquire()
+    
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    def publish(event: str, data: Dict[str, Any]):
+        # Nodes may emit from worker threads
+        loop.call_soon_threadsafe(queue.put_nowait, _format_event(event, data))
+    
+    run_id = request.run_id or str(uuid.uuid4())
+    
+    async def run():
+        try:
+            if await _run_id_taken(request):
+                publish("error", {"detail": f"Run {run_id} belongs to a different request", "run_id": run_id})
+                return
+            
+            state = ResearchState(
+                user_id=request.user_id,
+                topic=request.topic,
+                depth=request.depth,
+                is_follow_up=request.follow_up,
+                run_id=run_id
+            )
+            
+            result = None
+            with progress_listener(publish), track_memory():
+                async for update in get_research_graph().astream(state.dict()):
+                    for node, result in update.items():
+                        for event, data in _node_events(node, result):
+                            publish(event, data)
+            
+            if result and result.get("error"):
+                publish("error", {"detail": result["error"], "run_id": run_id})
+            elif result and result.get("final_brief"):
+                publish("brief", result["final_brief"].dict())
+            else:
+                publish("error", {"detail": "Failed to generate brief", "run_id": run_id})
+        except Exception as e:
+            print(f"Error streaming brief: {str(e)}")
+            publish("error", {"detail": str(e), "run_id": run_id})
+        finally:
+            workflow_limiter.release()
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+    
+    task = asyncio.create_task(run())
+    
+    async def events() -> AsyncIterator[str]:
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                yield message
+        finally:
+            # Stop the workflow if the client goes away
+            if not task.done():
+                task.cancel()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,7 +1,10 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class BriefRequest(BaseModel):
     topic: str
     depth: int
     follow_up: bool
-    user_id: str
\ No newline at end of file
+    user_id: str
+    # Retrying a failed brief with its run_id resumes it from its last checkpoint
+    run_id: Optional[str] = None
\ No newline at end of file
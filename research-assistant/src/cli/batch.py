@@ -0,0 +1,162 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+# Batch brief generation: topics are read from a JSONL or CSV file and posted
+# to the API from a thread pool sharing one keep-alive session. Each result is
+# appended to the output JSONL as soon as it arrives, so a rerun with the same
+# output skips the topics that already succeeded.
+
+_TRUE = {"1", "true", "yes", "y"}
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE
+    return bool(value)
+
+
+def read_topics(path: str, depth: int = 3, user_id: str = "batch", follow_up: bool = False) -> List[Dict[str, Any]]:
+    """Read batch items from a JSONL or CSV file (by extension).
+
+    Each row needs a topic and may set id, depth, follow_up and user_id;
+    missing fields take the given defaults.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = [row for row in csv.DictReader(f)]
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    items = []
+    for number, row in enumerate(rows, start=1):
+        topic = (row.get("topic") or "").strip()
+        if not topic:
+            raise ValueError(f"Row {number} of {path} has no topic")
+        item = {
+            "topic": topic,
+            "depth": int(row.get("depth") or depth),
+            "follow_up": _parse_bool(row["follow_up"]) if row.get("follow_up") not in (None, "") else follow_up,
+            "user_id": str(row.get("user_id") or user_id)
+        }
+        item["id"] = str(row.get("id") or item_key(item))
+        items.append(item)
+    return items
+
+
+def item_key(item: Dict[str, Any]) -> str:
+    """Identify a batch item by its request fields."""
+    return f"{item['user_id']}:{item['depth']}:{int(item['follow_up'])}:{item['topic']}"
+
+
+def load_completed(path: str) -> Set[str]:
+    """Get the ids of the items that already succeeded in an output file."""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by an interrupted run
+            if record.get("status") == "ok":
+                completed.add(record["id"])
+    return completed
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def create_session(concurrency: int):
+    """Create a requests session whose connection pool fits the batch concurrency."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, concurrency))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def post_brief(session, url: str, item: Dict[str, Any], timeout: Optional[float] = None, retries: int = 3) -> Dict[str, Any]:
+    """Generate one brief, retrying while the API is at capacity (503 or 429)."""
+    request_data = {key: item[key] for key in ("topic", "depth", "follow_up", "user_id")}
+    for attempt in range(retries + 1):
+        response = session.post(url, json=request_data, timeout=timeout)
+        if response.status_code in (429, 503) and attempt < retries:
+            time.sleep(float(response.headers.get("Retry-After") or 2 ** attempt))
+            continue
+        response.raise_for_status()
+        return response.json()
+
+
+def _error_message(error: Exception) -> str:
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return f"HTTP {response.status_code}: {response.json().get('detail', response.text)}"
+        except ValueError:
+            return f"HTTP {response.status_code}: {response.text}"
+    return str(error)
+
+
+def run_batch(
+    items: Iterable[Dict[str, Any]],
+    output: str,
+    post: Callable[[Dict[str, Any]], Dict[str, Any]],
+    concurrency: int = 4,
+    on_result: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """Run post for every item not yet completed in output, appending each result to output.
+
+    Items whose id already succeeded in output, or appeared earlier in items,
+    are skipped. on_result is called with the running totals and each record
+    as it is written. Returns the final totals.
+    """
+    seen = load_completed(output)
+    pending, skipped = [], 0
+    for item in items:
+        if item["id"] in seen:
+            skipped += 1
+            continue
+        seen.add(item["id"])
+        pending.append(item)
+    totals = {"total": len(pending), "skipped": skipped, "done": 0, "failed": 0, "seconds": 0.0}
+
+    def run(item: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        record = {"id": item["id"], "topic": item["topic"], "user_id": item["user_id"]}
+        try:
+            record.update(status="ok", brief=post(item))
+        except Exception as e:
+            record.update(status="error", error=_error_message(e))
+        record["seconds"] = round(time.perf_counter() - start, 3)
+        return record
+
+    start = time.perf_counter()
+    with open(output, "a", encoding="utf-8") as f, ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        if f.tell() and not _ends_with_newline(output):
+            f.write("\n")  # finish a line cut short by an interrupted run
+        futures = [executor.submit(run, item) for item in pending]
+        # Only this thread writes, so records never interleave
+        for future in as_completed(futures):
+            record = future.result()
+            f.write(json.dumps(record, default=str) + "\n")
+            f.flush()
+            totals["done"] += 1
+            if record["status"] != "ok":
+                totals["failed"] += 1
+            totals["seconds"] = time.perf_counter() - start
+            if on_result:
+                on_result(totals, record)
+
+    totals["seconds"] = time.perf_counter() - start
+    return totals
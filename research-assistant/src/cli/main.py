@@ -3,12 +3,14 @@ from ..utils import patch
 
 import click
 import json
-import requests
 import os
 import sys
 from pathlib import Path
 from dotenv import dotenv_values
-from typing import Dict, Any
+from typing import Dict, Any, Iterable
+
+# requests is imported where it is used, so the CLI starts (and answers
+# --help) without paying for it.
 
 # Load environment variables from .env file
 env_path = Path('.') / '.env'
@@ -22,15 +24,105 @@ if not os.getenv("LANGCHAIN_API_KEY"):
     os.environ["LANGCHAIN_TRACING_V2"] = "false"
 
 API_URL = "http://localhost:8000/brief"
+STREAM_URL = f"{API_URL}/stream"
+
+
+def iter_events(lines: Iterable[str]):
+    """Parse the lines of a Server-Sent Events stream into (event, data) pairs."""
+    event, data = "message", []
+    for line in lines:
+        if line is None:
+            continue
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def stream_brief(request_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate a brief through the streaming endpoint, rendering progress as it arrives."""
+    import requests
+    
+    tokens = 0
+    
+    with requests.post(STREAM_URL, json=request_data, stream=True) as response:
+        response.raise_for_status()
+        
+        for event, data in iter_events(response.iter_lines(decode_unicode=True)):
+            if event == "plan":
+                click.echo(f"Plan ready: {len(data['subtopics'])} subtopics, {len(data['queries'])} queries")
+            elif event == "sources":
+                click.echo(f"Found {data['count']} sources" + (f" for {data['subtopic']}" if data.get("subtopic") else ""))
+            elif event == "source_summary":
+                progress = f"{data['index'] + 1}/{data['total']}" + (f" of {data['subtopic']}" if data.get("subtopic") else "")
+                click.echo(f"Summarized source {progress}: {data['summary']['source_title']}")
+            elif event == "token":
+                tokens += 1
+                click.echo(f"\rSynthesizing brief... {tokens} chunks", nl=False)
+            elif event == "brief":
+                if tokens:
+                    click.echo()
+                return data
+            elif event == "error":
+                if tokens:
+                    click.echo()
+                if data.get("run_id"):
+                    raise click.ClickException(f"{data['detail']} (retry with --run-id {data['run_id']} to resume)")
+                raise click.ClickException(data["detail"])
+    
+    raise click.ClickException("Stream ended without a brief")
+
+
+def generate_options(required: bool):
+    """The options of the generate command, shared with the bare `cli --topic ...` invocation."""
+    options = [
+        click.option("--topic", required=required, help="Research topic"),
+        click.option("--depth", default=3, type=int, help="Research depth (1-5)"),
+        click.option("--follow-up", is_flag=True, help="Is this a follow-up query?"),
+        click.option("--user-id", required=required, help="User ID for context tracking"),
+        click.option("--output", type=click.Path(), help="Output file path"),
+        click.option("--stream", is_flag=True, help="Stream progress while the brief is generated"),
+        click.option("--run-id", help="Resume a failed brief from its last checkpoint")
+    ]
+    
+    def decorate(command):
+        for option in reversed(options):
+            command = option(command)
+        return command
+    return decorate
+
+
+@click.group(invoke_without_command=True)
+@generate_options(required=False)
+@click.pass_context
+def cli(ctx: click.Context, topic: str, depth: int, follow_up: bool, user_id: str, output: str, stream: bool, run_id: str):
+    """Research Assistant command line client.
+
+    Called without a command, it generates a brief like the generate command,
+    so `cli --topic ... --user-id ...` keeps working.
+    """
+    if ctx.invoked_subcommand is not None:
+        return
+    if not topic or not user_id:
+        raise click.UsageError("Missing option '--topic' or '--user-id' (or give a command, see --help)")
+    generate(topic, depth, follow_up, user_id, output, stream, run_id)
 
-@click.command()
-@click.option("--topic", required=True, help="Research topic")
-@click.option("--depth", default=3, type=int, help="Research depth (1-5)")
-@click.option("--follow-up", is_flag=True, help="Is this a follow-up query?")
-@click.option("--user-id", required=True, help="User ID for context tracking")
-@click.option("--output", type=click.Path(), help="Output file path")
-def generate_brief(topic: str, depth: int, follow_up: bool, user_id: str, output: str):
+
+@cli.command("generate")
+@generate_options(required=True)
+def generate_brief(topic: str, depth: int, follow_up: bool, user_id: str, output: str, stream: bool, run_id: str):
     """Generate a research brief using the Research Assistant API."""
+    generate(topic, depth, follow_up, user_id, output, stream, run_id)
+
+
+def generate(topic: str, depth: int, follow_up: bool, user_id: str, output: str, stream: bool, run_id: str):
+    """Generate a brief through the API and save or print it."""
+    import requests
+    
     try:
         # Prepare request
         request_data = {
@@ -39,12 +131,17 @@ def generate_brief(topic: str, depth: int, follow_up: bool, user_id: str, output
             "follow_up": follow_up,
             "user_id": user_id
         }
+        if run_id:
+            request_data["run_id"] = run_id
         
         # Make API request
-        response = requests.post(API_URL, json=request_data)
-        response.raise_for_status()
-        
-        brief = response.json()
+        if stream:
+            brief = stream_brief(request_data)
+        else:
+            response = requests.post(API_URL, json=request_data)
+            response.raise_for_status()
+            
+            brief = response.json()
         
         # Output results
         if output:
@@ -65,6 +162,8 @@ def generate_brief(topic: str, depth: int, follow_up: bool, user_id: str, output
                 click.echo("Error: Groq API key not configured. Please set the GROQ_API_KEY environment variable in your .env file.", err=True)
             else:
                 click.echo(f"Server error: {error_detail}", err=True)
+            if e.response.headers.get("X-Run-Id"):
+                click.echo(f"Retry with --run-id {e.response.headers['X-Run-Id']} to resume", err=True)
         else:
             click.echo(f"HTTP error: {str(e)}", err=True)
     except requests.exceptions.RequestException as e:
@@ -72,5 +171,48 @@ def generate_brief(topic: str, depth: int, follow_up: bool, user_id: str, output
     except Exception as e:
         click.echo(f"Error: {str(e)}", err=True)
 
+
+@cli.command("batch")
+@click.argument("input_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--output", required=True, type=click.Path(dir_okay=False), help="JSONL file results are appended to")
+@click.option("--concurrency", default=4, type=int, help="Briefs generated at the same time")
+@click.option("--depth", default=3, type=int, help="Research depth for rows that don't set one")
+@click.option("--user-id", default="batch", help="User ID for rows that don't set one")
+@click.option("--timeout", default=600, type=float, help="Seconds to wait for each brief")
+@click.option("--retries", default=3, type=int, help="Retries while the API is at capacity")
+def batch_briefs(input_path: str, output: str, concurrency: int, depth: int, user_id: str, timeout: float, retries: int):
+    """Generate briefs for every topic in a JSONL or CSV file.
+
+    Results are appended to OUTPUT as they finish; rerunning with the same
+    OUTPUT skips topics that already succeeded.
+    """
+    from .batch import create_session, post_brief, read_topics, run_batch
+    
+    try:
+        items = read_topics(input_path, depth=depth, user_id=user_id)
+    except (ValueError, KeyError) as e:
+        raise click.ClickException(f"Invalid input: {str(e)}")
+    
+    def report(totals: Dict[str, Any], record: Dict[str, Any]):
+        rate = totals["done"] / totals["seconds"] * 60 if totals["seconds"] else 0.0
+        status = "done" if record["status"] == "ok" else f"failed ({record['error']})"
+        click.echo(f"[{totals['done']}/{totals['total']}] {record['topic']}: {status} in {record['seconds']:.1f}s, {rate:.1f} briefs/min")
+    
+    with create_session(concurrency) as session:
+        totals = run_batch(
+            items,
+            output,
+            lambda item: post_brief(session, API_URL, item, timeout=timeout, retries=retries),
+            concurrency=concurrency,
+            on_result=report
+        )
+    
+    if totals["skipped"]:
+        click.echo(f"Skipped {totals['skipped']} topics already in {output}")
+    click.echo(f"Generated {totals['done'] - totals['failed']}/{totals['total']} briefs in {totals['seconds']:.1f}s ({totals['failed']} failed)")
+    if totals["failed"]:
+        sys.exit(1)
+
+
 if __name__ == "__main__":
-    generate_brief()
\ No newline at end of file
+    cli()
\ No newline at end of file
@@ -1,30 +1,79 @@
-from typing import Dict, Any
-from langchain_groq import ChatGroq
-from langchain.output_parsers import PydanticOutputParser
+import asyncio
+import math
+from datetime import datetime
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from ..models.plan import ResearchPlan
 from ..models.summary import SourceSummary
-from ..models.brief import FinalBrief
-from ..services.context import get_previous_interactions, generate_context_summary
-from ..services.llm import get_llm
-from ..services.storage import save_brief
+from ..models.brief import FinalBrief, BriefSection, Reference
+from ..services.context import (
+    get_relevant_interactions,
+    get_rolling_summary,
+    agenerate_context_summary,
+    schedule_rolling_summary_update
+)
+from ..services.llm import get_llm, get_model_name, prepare_prompt, ainvoke_counted
+from ..services.llm_cache import commit_response
+from ..services.storage import save_brief, save_sources, list_sources, get_sources
+from ..services.fetcher import fetch_pages
+from ..services.blobs import content_fields, set_content, has_content, read_content, loaded_content, release_content
+from ..services.search import UrlClaims, run_searches
+from ..services.dedup import SketchIndex, collapse_duplicates, result_signature
+from ..services.extraction import extract_relevant_content, get_token_budget
+from ..services.relevance import plan_query, select_relevant_sources, select_reusable_sources
+from ..services.scheduler import get_scheduler
+from ..services.tokens import count_tokens, record_response, merge_usage, total_usage
+from ..services.events import emit, is_streaming
+from ..services.memory import memory_report
+from ..utils.concurrency import run_sync
+from ..utils.urls import normalize_url
+from ..utils.config import (
+    DEDUP_ENABLED,
+    SOURCE_REUSE_ENABLED,
+    SOURCE_REUSE_PER_SUBTOPIC,
+    SOURCE_REUSE_MIN_MATCH,
+    SOURCE_STORE_MAX_PER_USER,
+    SOURCES_PER_DEPTH,
+    SUBTOPIC_BRANCHES_ENABLED,
+    SYNTHESIS_MAP_REDUCE_THRESHOLD,
+    SYNTHESIS_GROUP_TOKEN_BUDGET
+)
 
-def summarize_context(state: Dict[str, Any]) -> Dict[str, Any]:
+# Each node is implemented once as a coroutine, used by the async workflow
+# (ainvoke). The plain functions run the same coroutine for sync callers.
+# Every LLM call records its token usage in state["token_usage"].
+
+
+def _usage(state: Dict[str, Any]) -> Dict[str, Any]:
+    if not state.get("token_usage"):
+        state["token_usage"] = {}
+    return state["token_usage"]
+
+
+def _output_parser(model):
+    # langchain is heavy to import, so it loads with the first parser
+    from langchain.output_parsers import PydanticOutputParser
+    return PydanticOutputParser(pydantic_object=model)
+
+
+async def asummarize_context(state: Dict[str, Any]) -> Dict[str, Any]:
     """Summarize previous interactions if this is a follow-up query."""
     if state.get("is_follow_up"):
-        previous_interactions = get_previous_interactions(state["user_id"])
+        previous_interactions = await asyncio.to_thread(get_relevant_interactions, state["user_id"], state["topic"])
         state["previous_interactions"] = previous_interactions
-        state["context_summary"] = generate_context_summary(
+        state["context_summary"] = await agenerate_context_summary(
             state["topic"], 
-            previous_interactions
+            previous_interactions,
+            await asyncio.to_thread(get_rolling_summary, state["user_id"]),
+            usage=_usage(state)
         )
     return state
 
 
-def create_research_plan(state: Dict[str, Any]) -> Dict[str, Any]:
+async def acreate_research_plan(state: Dict[str, Any]) -> Dict[str, Any]:
     """Create a research plan based on the topic and context."""
     llm = get_llm("planning")  # Use Llama 3 70B for planning
     
-    parser = PydanticOutputParser(pydantic_object=ResearchPlan)
+    parser = _output_parser(ResearchPlan)
     
     prompt = f"""
     Create a detailed research plan for the topic: "{state['topic']}"
@@ -43,63 +92,211 @@ def create_research_plan(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     
     try:
-        response = llm.invoke(prompt)
-        research_plan = parser.parse(response.content)
+        research_plan = await ainvoke_counted(llm, "planning", prompt, _usage(state), "planning", parse=parser.parse)
         state["research_plan"] = research_plan
     except Exception as e:
         state["error"] = f"Error creating research plan: {str(e)}"
     
     return state
 
-def execute_search(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Execute search queries based on the research plan."""
-    from langchain_community.tools.tavily_search import TavilySearchResults
+def _reuse_stored_source(result: Dict[str, Any], source: Dict[str, Any]):
+    set_content(result, source["content"])
+    result["source_summary"] = source["summary"]
+    result["reused"] = True
+
+
+async def _areuse_sources(state: Dict[str, Any], results: List[Dict[str, Any]], reusable: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Fill search results already in the user's source store, and add the stored sources picked per subtopic."""
+    by_url = {normalize_url(result["url"]): result for result in results}
+    picked = {source["url"]: subtopic for subtopic, sources in reusable.items() for source in sources}
+    stored = await asyncio.to_thread(get_sources, state["user_id"], list({*by_url, *picked}))
     
-    search_tool = TavilySearchResults(max_results=state["depth"] * 2)
-    search_results = []
+    for url, source in stored.items():
+        if url in by_url:
+            result = by_url[url]
+        else:
+            result = {"url": url, "title": source["title"], "score": 0, "queries": [], "subtopics": []}
+            results.append(result)
+        if picked.get(url) and picked[url] not in result["subtopics"]:
+            result["subtopics"].append(picked[url])
+        _reuse_stored_source(result, source)
+    return results
+
+
+async def aexecute_search(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute search queries based on the research plan.
+
+    On a follow-up, sources from the user's earlier briefs are reused: a
+    subtopic the stored sources already cover is not searched again, and
+    results that were summarized before keep their content and summary.
+    """
+    queries = state["research_plan"].queries
+    reusable = {}
+    reuse = state.get("is_follow_up") and SOURCE_REUSE_ENABLED
     
-    for query in state["research_plan"].queries:
-        try:
-            results = search_tool.invoke(query.query)
-            search_results.extend(results)
-        except Exception as e:
-            
-            print(f"Error executing search query '{query.query}': {str(e)}")
+    if reuse:
+        stored = await asyncio.to_thread(list_sources, state["user_id"], SOURCE_STORE_MAX_PER_USER)
+        reusable = select_reusable_sources(
+            stored, state["topic"], state["research_plan"], SOURCE_REUSE_PER_SUBTOPIC, SOURCE_REUSE_MIN_MATCH
+        )
+        covered = {subtopic for subtopic, sources in reusable.items() if len(sources) >= SOURCE_REUSE_PER_SUBTOPIC}
+        queries = [query for query in queries if query.subtopic not in covered]
     
-    state["search_results"] = search_results
+    results = await run_searches(queries, max_results=state["depth"] * 2) if queries else []
+    
+    if reuse:
+        results = await _areuse_sources(state, results, reusable)
+    # Pages another subtopic branch already kept are not fetched again
+    if state.get("url_claims") is not None:
+        results = state["url_claims"].unclaimed(results)
+    if reuse:
+        state["source_reuse"] = {
+            "sources_reused": sum(1 for result in results if result.get("reused")),
+            "queries_skipped": len(state["research_plan"].queries) - len(queries)
+        }
+    
+    state["search_results"] = results
+    emit("sources", {
+        "subtopic": state.get("subtopic"),
+        "count": len(results),
+        "sources": [{"url": result["url"], "title": result.get("title")} for result in results]
+    })
     return state
 
-def fetch_content(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Fetch full content for each search result."""
-    from langchain_community.document_loaders import WebBaseLoader
-    
-    fetched_results = []
-    
-    for result in state["search_results"]:
-        try:
-            loader = WebBaseLoader(result["url"])
-            docs = loader.load()
-            if docs:
-                result["content"] = docs[0].page_content
-            fetched_results.append(result)
-        except Exception as e:
+async def afetch_content(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Fetch full content for each search result not already taken from the source store.
+
+    Pages are stored as they arrive, long ones in the blob store, so the
+    state only carries handles to them.
+    """
+    results = [result for result in state["search_results"] if not result.get("reused")]
+    pages = await fetch_pages([result["url"] for result in results], store=content_fields)
+    
+    if state.get("source_reuse") is not None:
+        state["source_reuse"]["fetches_skipped"] = len(state["search_results"]) - len(results)
+    
+    for result, page in zip(results, pages):
+        if isinstance(page, Exception):
             
-            print(f"Error fetching content from {result['url']}: {str(e)}")
-            fetched_results.append(result)
+            print(f"Error fetching content from {result['url']}: {str(page)}")
+        elif page:
+            set_content(result, page)
     
-    state["search_results"] = fetched_results
     return state
 
 
-def summarize_sources(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Generate structured summaries for each source."""
+async def adeduplicate_sources(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Collapse fetched sources with near-duplicate content so each is summarized once."""
+    results = state["search_results"]
+    if DEDUP_ENABLED:
+        unique = await asyncio.to_thread(collapse_duplicates, results)
+    else:
+        unique = results
+    
+    kept = {id(result) for result in unique}
+    release_content(result for result in results if id(result) not in kept)
+    
+    # Every dropped copy is one source summary the LLM no longer has to write
+    removed = len(results) - len(unique)
+    state["deduplication"] = {
+        "duplicates_removed": removed,
+        "llm_calls_saved": removed
+    }
+    state["search_results"] = unique
+    return state
+
+
+async def aextract_content(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep the parts of each fetched page most relevant to the topic and the queries that found it."""
+    token_budget = get_token_budget(get_model_name("summarization"))
+    
+    def extract(result: Dict[str, Any]) -> str:
+        query = " ".join([state["topic"], *result.get("queries", []), *result.get("subtopics", [])])
+        with loaded_content(result) as content:
+            excerpt = extract_relevant_content(content, query, token_budget)
+            return excerpt or content[:token_budget * 4]
+    
+    results = [result for result in state["search_results"] if has_content(result)]
+    excerpts = await asyncio.gather(*(asyncio.to_thread(extract, result) for result in results))
+    for result, excerpt in zip(results, excerpts):
+        result["excerpt"] = excerpt
+    
+    return state
+
+
+async def afilter_sources(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the fetched sources most relevant to the research plan.
+
+    A subtopic branch keeps its source_limit; otherwise depth * SOURCES_PER_DEPTH are kept.
+    A branch claims the pages it keeps, skipping pages another branch
+    claimed or that near-duplicate a page another branch kept; the latter
+    are listed under the kept page's "duplicates".
+    """
+    results = [result for result in state["search_results"] if has_content(result)]
+    limit = state.get("source_limit") or max(1, state["depth"]) * SOURCES_PER_DEPTH
+    query = plan_query(state["topic"], state["research_plan"])
+    claims = state.get("url_claims")
+    sketches = state.get("sketches") if DEDUP_ENABLED else None
+    duplicates = []
+    
+    def accept(result: Dict[str, Any]) -> bool:
+        if claims is not None and not claims.claim(result):
+            return False
+        if sketches is None or sketches.add(result_signature(result), result):
+            return True
+        if claims is not None:
+            claims.release(result)
+        duplicates.append(result)
+        return False
+    
+    selected = await asyncio.to_thread(
+        select_relevant_sources, results, query, limit,
+        accept if claims is not None or sketches is not None else None
+    )
+    kept = {id(result) for result in selected}
+    release_content(result for result in results if id(result) not in kept)
+    if duplicates:
+        counts = state.get("deduplication") or {"duplicates_removed": 0, "llm_calls_saved": 0}
+        state["deduplication"] = {key: value + len(duplicates) for key, value in counts.items()}
+    state["relevance_filter"] = {
+        "candidates": len(results),
+        "selected": len(selected)
+    }
+    state["search_results"] = selected
+    return state
+
+
+def _stored_summary(result: Dict[str, Any]):
+    if not result.get("source_summary"):
+        return None
+    try:
+        return SourceSummary(**result["source_summary"])
+    except Exception as e:
+        print(f"Ignoring stored summary of {result['url']}: {str(e)}")
+        return None
+
+
+async def asummarize_sources(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate structured summaries for each source.
+
+    Sources reused from the user's source store keep their stored summary.
+    The summarized sources are saved to the store for later follow-ups, and
+    their page content is released.
+    """
     llm = get_llm("summarization")  
     
-    parser = PydanticOutputParser(pydantic_object=SourceSummary)
-    source_summaries = []
+    parser = _output_parser(SourceSummary)
+    sources = []
+    summaries = []
+    pending = []
     
     for i, result in enumerate(state["search_results"]):
-        if "content" not in result:
+        if not has_content(result):
+            continue
+        
+        sources.append(result)
+        summaries.append(_stored_summary(result))
+        if summaries[-1] is not None:
             continue
             
         prompt = f"""
@@ -108,7 +305,7 @@ def summarize_sources(state: Dict[str, Any]) -> Dict[str, Any]:
         Research topic: {state['topic']}
         
         Content:
-        {result['content'][:4000]}  # Limit content length
+        {result.get('excerpt') or read_content(result)}
         
         Instructions:
         1. Extract the key points relevant to the research topic
@@ -119,24 +316,331 @@ def summarize_sources(state: Dict[str, Any]) -> Dict[str, Any]:
         
         {parser.get_format_instructions()}
         """
-        
-        try:
-            response = llm.invoke(prompt)
-            summary = parser.parse(response.content)
-            source_summaries.append(summary)
-        except Exception as e:
+        pending.append((len(sources) - 1, *prepare_prompt("summarization", prompt)))
+    
+    model_name = get_model_name("summarization")
+    usage = _usage(state)
+    
+    scheduler = get_scheduler(model_name)
+    
+    async def summarize(index: int, prompt: str, prompt_tokens: int) -> SourceSummary:
+        response = await scheduler.ainvoke(llm, prompt, prompt_tokens)
+        record_response(usage, "source_summarization", model_name, response, prompt_tokens, response.content)
+        summary = parser.parse(response.content)
+        commit_response(llm, prompt, response)
+        emit("source_summary", {"index": index, "total": len(sources), "subtopic": state.get("subtopic"), "summary": summary.dict()})
+        return summary
+    
+    for i, summary in enumerate(summaries):
+        if summary is not None:
+            emit("source_summary", {"index": i, "total": len(sources), "subtopic": state.get("subtopic"), "summary": summary.dict()})
+    
+    generated = await asyncio.gather(
+        *(summarize(i, prompt, tokens) for i, prompt, tokens in pending),
+        return_exceptions=True
+    )
+    for (i, _, _), summary in zip(pending, generated):
+        summaries[i] = summary
+    
+    if state.get("source_reuse") is not None:
+        state["source_reuse"]["llm_calls_saved"] = len(sources) - len(pending)
+    
+    source_summaries = []
+    source_subtopics = []
+    for result, summary in zip(sources, summaries):
+        if isinstance(summary, Exception):
             
-            print(f"Error summarizing source {result['url']}: {str(e)}")
+            print(f"Error summarizing source {result['url']}: {str(summary)}")
+        else:
+            result["source_summary"] = summary.dict()
+            source_summaries.append(summary)
+            source_subtopics.append((result.get("subtopics") or ["General"])[0])
+    
+    if SOURCE_REUSE_ENABLED:
+        await asyncio.to_thread(_save_sources, state["user_id"], sources)
+    release_content(state["search_results"])
     
     state["source_summaries"] = source_summaries
+    state["source_subtopics"] = source_subtopics
     return state
 
 
-def synthesize_brief(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Synthesize all source summaries into a coherent brief."""
+def _save_sources(user_id: str, results: List[Dict[str, Any]]):
+    try:
+        save_sources(user_id, [
+            {
+                "url": normalize_url(result["url"]),
+                "title": result.get("title"),
+                "content": read_content(result),
+                "summary": result["source_summary"],
+                "subtopics": result.get("subtopics", [])
+            }
+            for result in results
+            if result.get("source_summary")
+        ])
+    except Exception as e:
+        print(f"Error saving sources for {user_id}: {str(e)}")
+
+
+def _plan_subtopics(plan: ResearchPlan) -> List[str]:
+    # Queries may name a subtopic the plan doesn't list
+    return list(dict.fromkeys([*plan.subtopics, *(query.subtopic for query in plan.queries)]))
+
+
+def plan_branches(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Split the research plan into one branch state per subtopic.
+
+    Each branch searches its subtopic's queries and keeps an equal share of
+    the depth * SOURCES_PER_DEPTH sources. The branches share the URLs and
+    page sketches they claim, so a page is summarized by one branch only.
+    With SUBTOPIC_BRANCHES_ENABLED off, a single branch covers the whole plan.
+    A run's branches are checkpointed as runs of their own, "<run_id>:branch-<n>".
+    """
+    plan = state["research_plan"]
+    limit = max(1, state["depth"]) * SOURCES_PER_DEPTH
+    shared = {key: state.get(key) for key in ("user_id", "topic", "depth", "is_follow_up", "resumed")}
+    
+    def run_id(index: int) -> Optional[str]:
+        return f"{state['run_id']}:branch-{index}" if state.get("run_id") else None
+    
+    subtopics = _plan_subtopics(plan)
+    if not SUBTOPIC_BRANCHES_ENABLED or len(subtopics) < 2:
+        return [{**shared, "run_id": run_id(0), "research_plan": plan, "subtopic": None, "source_limit": limit}]
+    
+    claims = UrlClaims()
+    sketches = SketchIndex()
+    return [
+        {
+            **shared,
+            "run_id": run_id(i),
+            "research_plan": plan.copy(update={
+                "subtopics": [subtopic],
+                "queries": [query for query in plan.queries if query.subtopic == subtopic]
+            }),
+            "subtopic": subtopic,
+            "source_limit": max(1, math.ceil(limit / len(subtopics))),
+            "url_claims": claims,
+            "sketches": sketches
+        }
+        for i, subtopic in enumerate(subtopics)
+    ]
+
+
+def _add_counts(counts: Dict[str, int], other: Optional[Dict[str, int]]):
+    for key, value in (other or {}).items():
+        counts[key] = counts.get(key, 0) + value
+
+
+async def amerge_subtopics(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge the results of the subtopic branches, in plan order, for synthesis.
+
+    Sources and summaries are concatenated, token usage and the per-stage
+    counts are summed, and a stage's timing is its slowest branch. The run
+    fails if every branch did.
+    """
+    order = _plan_subtopics(state["research_plan"]) if state.get("research_plan") else []
+    branches = sorted(
+        state.get("subtopic_branches") or [],
+        key=lambda branch: order.index(branch["subtopic"]) if branch["subtopic"] in order else len(order)
+    )
+    
+    results, summaries, subtopics = [], [], []
+    counts = {"deduplication": {}, "relevance_filter": {}, "source_reuse": {}}
+    timings = {}
+    for branch in branches:
+        if branch.get("error"):
+            print(f"Error researching subtopic '{branch['subtopic']}': {branch['error']}")
+        results.extend(branch.get("search_results") or [])
+        summaries.extend(branch.get("source_summaries") or [])
+        subtopics.extend(branch.get("source_subtopics") or [])
+        merge_usage(_usage(state), branch.get("token_usage"))
+        for key, values in counts.items():
+            _add_counts(values, branch.get(key))
+        for stage, seconds in (branch.get("timings") or {}).items():
+            timings[stage] = max(seconds, timings.get(stage, 0))
+    
+    # Without a single researched subtopic there is nothing to synthesize
+    failed = [branch for branch in branches if branch.get("error")]
+    if failed and len(failed) == len(branches):
+        state["error"] = failed[0]["error"]
+    
+    state["search_results"] = results
+    state["source_summaries"] = summaries
+    state["source_subtopics"] = subtopics
+    for key, values in counts.items():
+        state[key] = values or None
+    if timings:
+        state["timings"] = {**(state.get("timings") or {}), **timings}
+    # The branch results are merged; clear them from the graph state
+    state["subtopic_branches"] = None
+    return state
+
+
+async def _agenerate(llm, prompt: str, prompt_tokens: int, state: Dict[str, Any], parse: Callable[[str], Any]) -> Any:
+    # Stream token deltas to progress listeners when someone is listening
+    if is_streaming():
+        chunks, response = [], None
+        async for chunk in llm.astream(prompt):
+            chunks.append(chunk.content)
+            # A cached reply streams as one chunk, marked as cached
+            if response is None:
+                response = chunk
+            emit("token", {"delta": chunk.content})
+        content = "".join(chunks)
+    else:
+        response = await llm.ainvoke(prompt)
+        content = response.content
+    
+    record_response(_usage(state), "synthesis", get_model_name("synthesis"), response, prompt_tokens, content)
+    # Only a reply that parses is cached, so a retry asks the model again
+    result = parse(content)
+    commit_response(llm, prompt, response, content)
+    return result
+
+
+def _group_sources(state: Dict[str, Any], formatted_sources: List[str]) -> List[Tuple[str, List[int]]]:
+    """Group source indices by subtopic, in plan order, splitting groups that exceed the token budget."""
+    subtopics = state.get("source_subtopics") or ["General"] * len(formatted_sources)
+    order = list(state["research_plan"].subtopics) if state.get("research_plan") else []
+    for subtopic in subtopics:
+        if subtopic not in order:
+            order.append(subtopic)
+    
+    groups = []
+    for subtopic in order:
+        group, used = [], 0
+        for i, source_subtopic in enumerate(subtopics):
+            if source_subtopic != subtopic:
+                continue
+            tokens = count_tokens(formatted_sources[i])
+            if group and used + tokens > SYNTHESIS_GROUP_TOKEN_BUDGET:
+                groups.append((subtopic, group))
+                group, used = [], 0
+            group.append(i)
+            used += tokens
+        if group:
+            groups.append((subtopic, group))
+    return groups
+
+
+async def _asynthesize_hierarchical(state: Dict[str, Any], llm, formatted_sources: List[str]) -> Dict[str, Any]:
+    """Draft a section per subtopic group in parallel, then combine the drafts into the brief.
+
+    Sources keep their global index numbers in every prompt, so section
+    references point into the same references list as a single-pass brief.
+    """
+    parser = _output_parser(FinalBrief)
+    section_parser = _output_parser(BriefSection)
+    summaries = state["source_summaries"]
+    model_name = get_model_name("synthesis")
+    usage = _usage(state)
+    
+    groups = _group_sources(state, formatted_sources)
+    prompts = []
+    for subtopic, indices in groups:
+        sources_text = "\n\n".join(formatted_sources[i] for i in indices)
+        prompt = f"""
+        Write one section of a research brief on the topic: {state['topic']}
+        
+        This section covers the subtopic: {subtopic}
+        
+        Source summaries:
+        {sources_text}
+        
+        Instructions:
+        1. Give the section a clear heading and detailed content
+        2. Include specific information from the sources
+        3. Reference sources using their index numbers exactly as given above
+        
+        {section_parser.get_format_instructions()}
+        """
+        prompts.append(prepare_prompt("synthesis", prompt))
+    
+    scheduler = get_scheduler(model_name)
+    
+    async def draft(subtopic: str, prompt: str, prompt_tokens: int) -> BriefSection:
+        response = await scheduler.ainvoke(llm, prompt, prompt_tokens)
+        record_response(usage, "synthesis", model_name, response, prompt_tokens, response.content)
+        section = section_parser.parse(response.content)
+        commit_response(llm, prompt, response)
+        emit("section_draft", {"subtopic": subtopic, "heading": section.heading})
+        return section
+    
+    drafts = await asyncio.gather(
+        *(draft(subtopic, *prompt) for (subtopic, _), prompt in zip(groups, prompts)),
+        return_exceptions=True
+    )
+    
+    sections = []
+    for (subtopic, _), section in zip(groups, drafts):
+        if isinstance(section, Exception):
+            print(f"Error drafting section for {subtopic}: {str(section)}")
+        else:
+            sections.append(section)
+    
+    drafts_text = "\n\n".join(
+        f"Section: {section.heading}\nSources: {section.references}\n{section.content}" for section in sections
+    )
+    sources_index = "\n".join(
+        f"{i + 1}: {summary.source_title}" for i, summary in enumerate(summaries)
+    )
+    
+    prompt = f"""
+    Combine the following section drafts into a research brief on the topic: {state['topic']}
+    
+    Subtopics: {', '.join(state['research_plan'].subtopics) if state.get('research_plan') else ''}
+    
+    Section drafts:
+    {drafts_text}
+    
+    Sources:
+    {sources_index}
+    
+    {f"Context from previous research: {state['context_summary']}" if state.get('context_summary') else ""}
+    
+    Instructions:
+    1. Write an overall summary of the research
+    2. Keep the sections, merging or reordering them only where it helps the brief read well
+    3. Keep each section's source index numbers unchanged
+    4. Leave the references list empty; it is filled in from the sources above
+    
+    {parser.get_format_instructions()}
+    """
+    
+    try:
+        prompt, prompt_tokens = prepare_prompt("synthesis", prompt)
+        brief = await _agenerate(llm, prompt, prompt_tokens, state, parser.parse)
+        
+        # The references list is rebuilt in source order so the indices stay valid
+        brief.references = [
+            Reference(
+                url=summary.source_url,
+                title=summary.source_title,
+                key_points=summary.key_points,
+                relevance_score=summary.relevance_score
+            )
+            for summary in summaries
+        ]
+        for section in brief.sections:
+            section.references = [index for index in section.references if 1 <= index <= len(summaries)]
+        
+        brief.token_usage = total_usage(usage)
+        state["final_brief"] = brief
+    except Exception as e:
+        state["error"] = f"Error synthesizing brief: {str(e)}"
+    
+    return state
+
+
+async def asynthesize_brief(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Synthesize all source summaries into a coherent brief.
+
+    Large source sets (over SYNTHESIS_MAP_REDUCE_THRESHOLD tokens of
+    summaries) are synthesized hierarchically, one subtopic at a time.
+    """
     llm = get_llm("synthesis")  
     
-    parser = PydanticOutputParser(pydantic_object=FinalBrief)
+    parser = _output_parser(FinalBrief)
     
     
     formatted_sources = []
@@ -145,6 +649,9 @@ def synthesize_brief(state: Dict[str, Any]) -> Dict[str, Any]:
     
     sources_text = "\n\n".join(formatted_sources)
     
+    if count_tokens(sources_text) > SYNTHESIS_MAP_REDUCE_THRESHOLD:
+        return await _asynthesize_hierarchical(state, llm, formatted_sources)
+    
     prompt = f"""
     Synthesize a comprehensive research brief on the topic: {state['topic']}
     
@@ -166,15 +673,8 @@ def synthesize_brief(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     
     try:
-        
-        import tiktoken
-        encoding = tiktoken.encoding_for_model("gpt-4")  
-        
-        prompt_tokens = len(encoding.encode(prompt))
-        response = llm.invoke(prompt)
-        completion_tokens = len(encoding.encode(response.content))
-        
-        brief = parser.parse(response.content)
+        prompt, prompt_tokens = prepare_prompt("synthesis", prompt)
+        brief = await _agenerate(llm, prompt, prompt_tokens, state, parser.parse)
         
         
         if not brief.references and state["source_summaries"]:
@@ -188,11 +688,7 @@ def synthesize_brief(state: Dict[str, Any]) -> Dict[str, Any]:
                 ))
         
         
-        brief.token_usage = {
-            "prompt": prompt_tokens,
-            "completion": completion_tokens,
-            "total": prompt_tokens + completion_tokens
-        }
+        brief.token_usage = total_usage(state["token_usage"])
         
         state["final_brief"] = brief
     except Exception as e:
@@ -201,8 +697,11 @@ def synthesize_brief(state: Dict[str, Any]) -> Dict[str, Any]:
     return state
 
 
-def post_process(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Post-process the final brief and save it."""
+async def apost_process(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Post-process the final brief and save it.
+
+    The brief is folded into the user's rolling summary in the background.
+    """
     if state.get("final_brief"):
         
         state["final_brief"].metadata = {
@@ -211,20 +710,14 @@ def post_process(state: Dict[str, Any]) -> Dict[str, Any]:
             "is_follow_up": state["is_follow_up"],
             "created_at": state["created_at"].isoformat()
         }
+        if state.get("run_id"):
+            state["final_brief"].metadata["run_id"] = state["run_id"]
         
         
         if not state["final_brief"].timestamp:
             state["final_brief"].timestamp = datetime.now()
         
         
-        if not state["final_brief"].token_usage:
-            state["final_brief"].token_usage = {
-                "prompt": 0,
-                "completion": 0,
-                "total": 0
-            }
-        
-        
         if not state["final_brief"].references and state.get("source_summaries"):
             state["final_brief"].references = []
             for summary in state["source_summaries"]:
@@ -235,7 +728,77 @@ def post_process(state: Dict[str, Any]) -> Dict[str, Any]:
                     relevance_score=summary.relevance_score
                 ))
         
+        usage = _usage(state)
+        state["final_brief"].token_usage = total_usage(usage)
+        for key in ("deduplication", "relevance_filter", "source_reuse"):
+            if state.get(key):
+                state["final_brief"].metadata[key] = state[key]
+        state["final_brief"].metadata["token_usage"] = {
+            "nodes": usage.get("nodes", {}),
+            "models": usage.get("models", {})
+        }
+        memory = memory_report()
+        if memory:
+            state["final_brief"].metadata["memory"] = memory
         
-        save_brief(state["user_id"], state["final_brief"].dict())
+        brief = state["final_brief"].dict()
+        await asyncio.to_thread(save_brief, state["user_id"], brief)
+        # Only the user's next request needs the updated rolling summary, so don't make this one wait for it
+        schedule_rolling_summary_update(state["user_id"], brief)
     
-    return state
\ No newline at end of file
+    return state
+
+
+def summarize_context(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarize previous interactions if this is a follow-up query."""
+    return run_sync(asummarize_context(state))
+
+
+def create_research_plan(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Create a research plan based on the topic and context."""
+    return run_sync(acreate_research_plan(state))
+
+
+def execute_search(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute search queries based on the research plan."""
+    return run_sync(aexecute_search(state))
+
+
+def fetch_content(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Fetch full content for each search result."""
+    return run_sync(afetch_content(state))
+
+
+def deduplicate_sources(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Collapse fetched sources with near-duplicate content so each is summarized once."""
+    return run_sync(adeduplicate_sources(state))
+
+
+def extract_content(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep the parts of each fetched page most relevant to the topic and the queries that found it."""
+    return run_sync(aextract_content(state))
+
+
+def filter_sources(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the fetched sources most relevant to the research plan, depth * SOURCES_PER_DEPTH of them."""
+    return run_sync(afilter_sources(state))
+
+
+def summarize_sources(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate structured summaries for each source."""
+    return run_sync(asummarize_sources(state))
+
+
+def merge_subtopics(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge the results of the subtopic branches, in plan order, for synthesis."""
+    return run_sync(amerge_subtopics(state))
+
+
+def synthesize_brief(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Synthesize all source summaries into a coherent brief."""
+    return run_sync(asynthesize_brief(state))
+
+
+def post_process(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Post-process the final brief and save it."""
+    return run_sync(apost_process(state))
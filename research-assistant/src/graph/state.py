@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Any
+from typing import Annotated, Dict, List, Optional, Any, TypedDict
 from pydantic import BaseModel
 from datetime import datetime
 from ..models.plan import ResearchPlan
@@ -11,11 +11,37 @@ class ResearchState(BaseModel):
     topic: str
     depth: int
     is_follow_up: bool
+    # Checkpoints are kept per run; retrying with the same run_id resumes it
+    run_id: Optional[str] = None
+    # Set when a run is resumed; its model calls then skip cached replies
+    resumed: bool = False
     previous_interactions: Optional[List[Dict]] = None
     context_summary: Optional[str] = None
     research_plan: Optional[ResearchPlan] = None
     search_results: Optional[List[Dict[str, Any]]] = None
     source_summaries: Optional[List[SourceSummary]] = None
+    source_subtopics: Optional[List[str]] = None
     final_brief: Optional[FinalBrief] = None
+    token_usage: Optional[Dict[str, Any]] = None
+    deduplication: Optional[Dict[str, int]] = None
+    relevance_filter: Optional[Dict[str, int]] = None
+    source_reuse: Optional[Dict[str, int]] = None
+    timings: Optional[Dict[str, float]] = None
     error: Optional[str] = None
-    created_at: datetime = datetime.now()
\ No newline at end of file
+    created_at: datetime = datetime.now()
+
+
+def merge_branches(current: List[Dict[str, Any]], update: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Reducer for the subtopic branch results: each branch appends its result, None clears them."""
+    if update is None:
+        return []
+    return current + update
+
+
+# Graph channels: one per ResearchState field, plus the results of the
+# parallel subtopic branches, collected by merge_branches
+ResearchChannels = TypedDict("ResearchChannels", {name: Any for name in ResearchState.__annotations__}, total=False)
+
+
+class WorkflowState(ResearchChannels, total=False):
+    subtopic_branches: Annotated[List[Dict[str, Any]], merge_branches]
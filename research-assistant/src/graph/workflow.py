@@ -1,28 +1,289 @@
-from langgraph.graph import Graph, END
-from typing import Dict, Any
-from .state import ResearchState
+from functools import lru_cache, wraps
+from typing import TYPE_CHECKING, Callable, Dict, Any, List, Optional, Tuple
+import asyncio
+import logging
+import time
+from .state import ResearchChannels, ResearchState, WorkflowState
 from .nodes import (
+    plan_branches,
     summarize_context,
     create_research_plan,
     execute_search,
     fetch_content,
+    deduplicate_sources,
+    extract_content,
+    filter_sources,
     summarize_sources,
+    merge_subtopics,
     synthesize_brief,
-    post_process
+    post_process,
+    asummarize_context,
+    acreate_research_plan,
+    aexecute_search,
+    afetch_content,
+    adeduplicate_sources,
+    aextract_content,
+    afilter_sources,
+    asummarize_sources,
+    amerge_subtopics,
+    asynthesize_brief,
+    apost_process
 )
+from ..services.metrics import CHECKPOINT_ERRORS, NODE_DURATION, NODE_ERRORS
+from ..services.checkpoints import get_completed_nodes, load_checkpoint, request_fingerprint, save_checkpoint
+from ..services.llm_cache import fresh_replies
+from ..utils.config import REQUEST_TIMINGS_ENABLED, CHECKPOINTS_ENABLED
 
-def create_research_graph():
-    """Create and configure the research workflow graph."""
+# langgraph and langchain_core are imported when the graph is built, so
+# importing this module (and the API app) doesn't load them.
+if TYPE_CHECKING:
+    from langchain_core.runnables import RunnableLambda
+
+logger = logging.getLogger(__name__)
+
+
+def _record_node(name: str, state: Dict[str, Any], previous_error: Any, elapsed: float):
+    NODE_DURATION.observe(elapsed, node=name)
+    # Nodes report most failures in state["error"] rather than raising
+    if state.get("error") and state.get("error") != previous_error:
+        NODE_ERRORS.inc(node=name)
+    
+    if REQUEST_TIMINGS_ENABLED:
+        timings = state.get("timings") or {}
+        timings[name] = round(elapsed, 4)
+        state["timings"] = timings
+        if state.get("final_brief"):
+            state["final_brief"].metadata["timings"] = dict(timings)
+
+
+def _fingerprint(state: Dict[str, Any]) -> str:
+    return request_fingerprint(state.get("user_id"), state.get("topic"), state.get("depth"), state.get("is_follow_up"))
+
+
+def _restore(name: str, state: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """Look up a node in its run's checkpoint.
+
+    Returns the state to pass on if the node already completed in this run
+    (None if it has to run), and the nodes completed so far. Only checkpoints
+    saved for the same request (user, topic, depth and follow-up) are used.
+    Keys a checkpoint does not keep, such as a branch's subtopic and the
+    claims it shares with the other branches, come from the incoming state.
+    """
+    run_id = state.get("run_id")
+    if not CHECKPOINTS_ENABLED or not run_id:
+        return None, []
+    
+    try:
+        completed = get_completed_nodes(run_id, _fingerprint(state))
+        if name not in completed:
+            return None, completed
+        # Earlier nodes pass the state through; the last completed one restores it
+        if name != completed[-1]:
+            return state, completed
+        checkpoint = load_checkpoint(run_id, _fingerprint(state))
+        if checkpoint is None:
+            return None, []
+        context = {key: value for key, value in state.items() if key not in WorkflowState.__annotations__}
+        return {**context, **dict(ResearchState.parse_raw(checkpoint["state"]))}, completed
+    except Exception:
+        CHECKPOINT_ERRORS.inc(operation="load")
+        logger.exception("Error loading checkpoint for run %s", run_id)
+        return None, []
+
+
+def _checkpoint(name: str, state: Dict[str, Any], completed: List[str]):
+    """Save the state after a node, unless the run has failed."""
+    run_id = state.get("run_id")
+    if not CHECKPOINTS_ENABLED or not run_id or state.get("error"):
+        return
+    
+    try:
+        if not save_checkpoint(run_id, _fingerprint(state), completed + [name], ResearchState(**state).json()):
+            CHECKPOINT_ERRORS.inc(operation="conflict")
+            logger.warning("Not checkpointing run %s: its id is in use by another request", run_id)
+    except Exception:
+        CHECKPOINT_ERRORS.inc(operation="save")
+        logger.exception("Error saving checkpoint for run %s", run_id)
+
+
+# The nodes each run starts with; a checkpoint already holding one means the run is resumed
+ENTRY_NODES = ("context_summarization", "search")
+
+
+def _mark_resumed(name: str, state: Dict[str, Any], restored: Optional[Dict[str, Any]], completed: List[str]) -> bool:
+    resumed = bool(state.get("resumed")) or (name in ENTRY_NODES and bool(completed))
+    if resumed:
+        state["resumed"] = True
+        if restored is not None:
+            restored["resumed"] = True
+    return resumed
+
+
+def _instrumented(name: str, func: Callable, afunc: Callable) -> "RunnableLambda":
+    """Wrap a node's sync and async functions with checkpoints, latency and error metrics.
+
+    A node that already completed in the state's run is skipped, so a retry
+    with the same run_id resumes after the last completed node. The nodes of
+    a resumed run ask the model again instead of replaying cached replies.
+    """
+    from langchain_core.runnables import RunnableLambda
+    
+    @wraps(func)
+    def run(state: Dict[str, Any]) -> Dict[str, Any]:
+        restored, completed = _restore(name, state)
+        resumed = _mark_resumed(name, state, restored, completed)
+        if restored is not None:
+            return restored
+        
+        previous_error, start = state.get("error"), time.perf_counter()
+        try:
+            with fresh_replies(resumed):
+                result = func(state)
+        except Exception:
+            NODE_ERRORS.inc(node=name)
+            NODE_DURATION.observe(time.perf_counter() - start, node=name)
+            raise
+        _record_node(name, result, previous_error, time.perf_counter() - start)
+        _checkpoint(name, result, completed)
+        return result
+    
+    @wraps(afunc)
+    async def arun(state: Dict[str, Any]) -> Dict[str, Any]:
+        restored, completed = await asyncio.to_thread(_restore, name, state) if state.get("run_id") else (None, [])
+        resumed = _mark_resumed(name, state, restored, completed)
+        if restored is not None:
+            return restored
+        
+        previous_error, start = state.get("error"), time.perf_counter()
+        try:
+            with fresh_replies(resumed):
+                result = await afunc(state)
+        except Exception:
+            NODE_ERRORS.inc(node=name)
+            NODE_DURATION.observe(time.perf_counter() - start, node=name)
+            raise
+        _record_node(name, result, previous_error, time.perf_counter() - start)
+        if result.get("run_id"):
+            await asyncio.to_thread(_checkpoint, name, result, completed)
+        return result
+    
+    return RunnableLambda(run, afunc=arun)
+
+
+# The stages each subtopic branch runs, in order, on its own state
+SUBTOPIC_STAGES = (
+    ("search", execute_search, aexecute_search),
+    ("content_fetching", fetch_content, afetch_content),
+    ("deduplication", deduplicate_sources, adeduplicate_sources),
+    ("content_extraction", extract_content, aextract_content),
+    ("relevance_filtering", filter_sources, afilter_sources),
+    ("source_summarization", summarize_sources, asummarize_sources)
+)
+
+# What a branch hands back to the merge
+BRANCH_KEYS = (
+    "subtopic", "search_results", "source_summaries", "source_subtopics", "token_usage",
+    "deduplication", "relevance_filter", "source_reuse", "timings", "error"
+)
+
+
+def create_subtopic_graph():
+    """Create the search-to-summary chain run once per subtopic branch."""
+    from langgraph.graph import Graph, END
+    
     workflow = Graph()
+    for name, func, afunc in SUBTOPIC_STAGES:
+        workflow.add_node(name, _instrumented(name, func, afunc))
+    
+    workflow.set_entry_point(SUBTOPIC_STAGES[0][0])
+    for (name, _, _), (next_name, _, _) in zip(SUBTOPIC_STAGES, SUBTOPIC_STAGES[1:]):
+        workflow.add_edge(name, next_name)
+    workflow.add_edge(SUBTOPIC_STAGES[-1][0], END)
+    
+    return workflow.compile()
+
+
+@lru_cache(maxsize=None)
+def get_subtopic_graph():
+    """Get the compiled subtopic branch, building it once per process."""
+    return create_subtopic_graph()
+
+
+def _branch_result(branch: Dict[str, Any], state: Optional[Dict[str, Any]], error: Optional[Exception] = None) -> Dict[str, Any]:
+    if error is not None:
+        # A failed branch only loses its own subtopic
+        NODE_ERRORS.inc(node="subtopic_research")
+        state = {"subtopic": branch["subtopic"], "error": f"Error researching subtopic: {str(error)}"}
+    return {"subtopic_branches": [{key: state.get(key) for key in BRANCH_KEYS}]}
+
+
+def research_subtopic(branch: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one subtopic branch and hand its result to the merge."""
+    try:
+        return _branch_result(branch, get_subtopic_graph().invoke(branch))
+    except Exception as e:
+        return _branch_result(branch, None, e)
+
+
+async def aresearch_subtopic(branch: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one subtopic branch and hand its result to the merge."""
+    try:
+        return _branch_result(branch, await get_subtopic_graph().ainvoke(branch))
+    except Exception as e:
+        return _branch_result(branch, None, e)
+
+
+def _completed_in_run(name: str, state: Dict[str, Any]) -> bool:
+    run_id = state.get("run_id")
+    if not CHECKPOINTS_ENABLED or not run_id:
+        return False
+    try:
+        return name in get_completed_nodes(run_id, _fingerprint(state))
+    except Exception:
+        CHECKPOINT_ERRORS.inc(operation="load")
+        logger.exception("Error loading checkpoint for run %s", run_id)
+        return False
+
+
+def _fan_out(state: Dict[str, Any]):
+    """Send the plan to one research branch per subtopic.
+
+    A resumed run whose branches were already merged goes straight to the merge,
+    which restores them from the checkpoint. Otherwise every branch resumes
+    from its own checkpoint, so finished branches are not researched again.
+    """
+    from langgraph.types import Send
+    
+    if state.get("error") is not None:
+        return "post_processing"
+    if _completed_in_run("merge_subtopics", state):
+        return "merge_subtopics"
+    if not state.get("research_plan"):
+        return "post_processing"
+    return [Send("subtopic_research", branch) for branch in plan_branches(state)] or "merge_subtopics"
+
+
+def create_research_graph():
+    """Create and configure the research workflow graph.
+
+    After planning, every subtopic is searched, fetched and summarized in its
+    own branch; the branches run in parallel and their results are merged
+    before synthesis, so a slow site only holds up its own subtopic.
+    """
+    from langchain_core.runnables import RunnableLambda
+    from langgraph.graph import StateGraph, END
+    
+    workflow = StateGraph(WorkflowState)
     
-    # Add nodes
-    workflow.add_node("context_summarization", summarize_context)
-    workflow.add_node("planning", create_research_plan)
-    workflow.add_node("search", execute_search)
-    workflow.add_node("content_fetching", fetch_content)
-    workflow.add_node("source_summarization", summarize_sources)
-    workflow.add_node("synthesis", synthesize_brief)
-    workflow.add_node("post_processing", post_process)
+    # Add nodes; invoke runs the sync functions, ainvoke their async versions.
+    # Every node is timed and its errors counted for /metrics. The nodes see
+    # the research state; only the merge reads the branch results.
+    workflow.add_node("context_summarization", _instrumented("context_summarization", summarize_context, asummarize_context), input=ResearchChannels)
+    workflow.add_node("planning", _instrumented("planning", create_research_plan, acreate_research_plan), input=ResearchChannels)
+    workflow.add_node("subtopic_research", RunnableLambda(research_subtopic, afunc=aresearch_subtopic))
+    workflow.add_node("merge_subtopics", _instrumented("merge_subtopics", merge_subtopics, amerge_subtopics))
+    workflow.add_node("synthesis", _instrumented("synthesis", synthesize_brief, asynthesize_brief), input=ResearchChannels)
+    workflow.add_node("post_processing", _instrumented("post_processing", post_process, apost_process), input=ResearchChannels)
     
     
     workflow.set_entry_point("context_summarization")
@@ -37,14 +298,26 @@ def create_research_graph():
         }
     )
     
-    workflow.add_edge("planning", "search")
-    workflow.add_edge("search", "content_fetching")
-    workflow.add_edge("content_fetching", "source_summarization")
-    workflow.add_edge("source_summarization", "synthesis")
+    workflow.add_conditional_edges("planning", _fan_out, ["subtopic_research", "merge_subtopics", "post_processing"])
+    workflow.add_edge("subtopic_research", "merge_subtopics")
+    workflow.add_conditional_edges(
+        "merge_subtopics",
+        lambda state: "synthesis" if state.get("error") is None else "post_processing",
+        {
+            "synthesis": "synthesis",
+            "post_processing": "post_processing"
+        }
+    )
     workflow.add_edge("synthesis", "post_processing")
     workflow.add_edge("post_processing", END)
     
     
     app = workflow.compile()
     
-    return app
\ No newline at end of file
+    return app
+
+
+@lru_cache(maxsize=None)
+def get_research_graph():
+    """Get the compiled research workflow, building it once per process."""
+    return create_research_graph()
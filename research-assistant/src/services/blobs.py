@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+
+from . import page_cache
+from .memory import charge, discharge, record_spill, text_bytes
+from ..utils.config import BLOB_STORE_ENABLED, BLOB_STORE_DIR, BLOB_SPILL_MIN_CHARS, BLOB_TTL
+
+# Fetched pages are spilled to one text file each, so a search result in the
+# workflow state carries a "content_blob" handle instead of the page text.
+# Nodes load a page only while they use it, and summarization releases the
+# pages. Files left behind by failed runs are swept once older than BLOB_TTL.
+# A page the page cache already holds is not written again: its handle,
+# "page:<url>", refers to the cache entry, which the page cache owns.
+
+_lock = threading.Lock()
+_last_sweep = 0.0
+_PAGE_PREFIX = "page:"
+
+
+def _blob_path(handle: str) -> str:
+    return os.path.join(BLOB_STORE_DIR, handle[:2], f"{handle}.txt")
+
+
+def put_blob(text: str) -> str:
+    """Write text to the blob store and return its handle."""
+    _maybe_sweep()
+    handle = uuid.uuid4().hex
+    path = _blob_path(handle)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return handle
+
+
+def get_blob(handle: str) -> str:
+    """Read a blob's text."""
+    if handle.startswith(_PAGE_PREFIX):
+        entry = page_cache.get_entry(handle[len(_PAGE_PREFIX):])
+        if entry is None:
+            raise FileNotFoundError(handle)
+        return entry["text"]
+    with open(_blob_path(handle), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def delete_blob(handle: str):
+    if handle.startswith(_PAGE_PREFIX):
+        return
+    try:
+        os.remove(_blob_path(handle))
+    except FileNotFoundError:
+        pass
+
+
+def sweep_blobs(max_age: float = BLOB_TTL) -> int:
+    """Delete blobs older than max_age seconds; returns how many were deleted."""
+    cutoff = time.time() - max_age
+    removed = 0
+    for root, _, files in os.walk(BLOB_STORE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+    return removed
+
+
+def _maybe_sweep():
+    global _last_sweep
+    with _lock:
+        if time.time() - _last_sweep < BLOB_TTL:
+            return
+        _last_sweep = time.time()
+    try:
+        sweep_blobs()
+    except OSError as e:
+        print(f"Error sweeping blob store: {str(e)}")
+
+
+def content_fields(text: str, cached_url: Optional[str] = None) -> Dict[str, Any]:
+    """Store a page's text, returning the fields that stand for it in a search result.
+
+    Pages of at least BLOB_SPILL_MIN_CHARS are spilled and get a
+    "content_blob" handle; shorter ones keep their text under "content".
+    Either way "content_length" is set. cached_url is the URL the page cache
+    holds the text under, if it does; the handle then refers to that entry.
+    """
+    if BLOB_STORE_ENABLED and len(text) >= BLOB_SPILL_MIN_CHARS:
+        try:
+            handle = _PAGE_PREFIX + cached_url if cached_url else put_blob(text)
+            record_spill(text_bytes(text))
+            return {"content_blob": handle, "content_length": len(text)}
+        except OSError as e:
+            print(f"Error spilling page content, keeping it in memory: {str(e)}")
+    charge(text_bytes(text))
+    return {"content": text, "content_length": len(text)}
+
+
+def set_content(result: Dict[str, Any], page: Union[str, Dict[str, Any]]):
+    """Replace a search result's content (such as its search snippet) with a fetched page.
+
+    page is the page text, or the fields content_fields already stored it as.
+    """
+    result.pop("content", None)
+    result.update(content_fields(page) if isinstance(page, str) else page)
+
+
+def has_content(result: Dict[str, Any]) -> bool:
+    return bool(result.get("content") or result.get("content_blob"))
+
+
+def content_length(result: Dict[str, Any]) -> int:
+    return result.get("content_length") or len(result.get("content") or "")
+
+
+def read_content(result: Dict[str, Any]) -> str:
+    """Get a search result's page text, loading it from the blob store if it was spilled."""
+    if not result.get("content_blob"):
+        return result.get("content") or ""
+    try:
+        return get_blob(result["content_blob"])
+    except FileNotFoundError:
+        print(f"Content of {result.get('url')} is no longer in the blob store")
+        return ""
+
+
+@contextmanager
+def loaded_content(result: Dict[str, Any]) -> Iterator[str]:
+    """Load a search result's page text for the block, counting a spilled page as held while it is loaded."""
+    text = read_content(result)
+    nbytes = text_bytes(text) if result.get("content_blob") else 0
+    charge(nbytes)
+    try:
+        yield text
+    finally:
+        discharge(nbytes)
+
+
+def release_content(results: Iterable[Dict[str, Any]]):
+    """Drop the page text and excerpt of results that no longer need them, deleting spilled pages.
+
+    Results whose content is a search snippet rather than a stored page are
+    left as they are.
+    """
+    for result in results:
+        if "content_length" not in result:
+            continue
+        if result.get("content_blob"):
+            delete_blob(result.pop("content_blob"))
+        elif result.get("content") is not None:
+            discharge(text_bytes(result["content"]))
+        result.pop("content", None)
+        result.pop("content_length")
+        result.pop("excerpt", None)
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ..utils.config import CHECKPOINT_DB_PATH, CHECKPOINT_TTL
+
+# SQLite store of workflow checkpoints. Each run keeps one row: the nodes it
+# has completed, in order, and the state after the last of them. Rows older
+# than CHECKPOINT_TTL are ignored and deleted as new checkpoints are written.
+# A row also keeps the fingerprint of the request that started the run, and is
+# only read or replaced by a request with the same fingerprint, so a run_id
+# cannot be used to resume someone else's run.
+
+_local = threading.local()
+
+
+def _get_connection() -> sqlite3.Connection:
+    # sqlite3 connections cannot be shared between threads
+    connection = getattr(_local, "connection", None)
+    if connection is None or getattr(_local, "path", None) != CHECKPOINT_DB_PATH:
+        os.makedirs(os.path.dirname(CHECKPOINT_DB_PATH) or ".", exist_ok=True)
+        connection = sqlite3.connect(CHECKPOINT_DB_PATH, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                run_id TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL DEFAULT '',
+                nodes TEXT NOT NULL,
+                state TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_checkpoints_updated_at ON checkpoints (updated_at);
+        """)
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(checkpoints)")}
+        if "fingerprint" not in columns:
+            # Rows written before fingerprints never match one, so they are not resumed
+            connection.execute("ALTER TABLE checkpoints ADD COLUMN fingerprint TEXT NOT NULL DEFAULT ''")
+        _local.connection = connection
+        _local.path = CHECKPOINT_DB_PATH
+    return connection
+
+
+def request_fingerprint(user_id: str, topic: str, depth: int, is_follow_up: bool) -> str:
+    """Identify the request a run was started for."""
+    key = json.dumps([user_id, topic, depth, bool(is_follow_up)])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def is_run_of_other_request(run_id: str, fingerprint: str) -> bool:
+    """Check whether run_id names a live run started for a different request."""
+    row = _get_connection().execute(
+        "SELECT fingerprint FROM checkpoints WHERE run_id = ? AND updated_at >= ?",
+        (run_id, time.time() - CHECKPOINT_TTL)
+    ).fetchone()
+    return row is not None and row[0] != fingerprint
+
+
+def get_completed_nodes(run_id: str, fingerprint: str) -> List[str]:
+    """Get the nodes a run of this request has completed, in order, without loading its state."""
+    row = _get_connection().execute(
+        "SELECT nodes FROM checkpoints WHERE run_id = ? AND fingerprint = ? AND updated_at >= ?",
+        (run_id, fingerprint, time.time() - CHECKPOINT_TTL)
+    ).fetchone()
+    return json.loads(row[0]) if row else []
+
+
+def load_checkpoint(run_id: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+    """Get the latest checkpoint of a run of this request as {"nodes": [...], "state": "..."}, or None.
+
+    The state is returned as the JSON it was saved as.
+    """
+    row = _get_connection().execute(
+        "SELECT nodes, state FROM checkpoints WHERE run_id = ? AND fingerprint = ? AND updated_at >= ?",
+        (run_id, fingerprint, time.time() - CHECKPOINT_TTL)
+    ).fetchone()
+    if row is None:
+        return None
+    return {"nodes": json.loads(row[0]), "state": row[1]}
+
+
+def save_checkpoint(run_id: str, fingerprint: str, nodes: List[str], state: str) -> bool:
+    """Replace a run's checkpoint with the state (as JSON) after the last of nodes.
+
+    A live checkpoint of the run_id saved for a different request is left
+    alone; returns whether the checkpoint was saved.
+    """
+    now = time.time()
+    connection = _get_connection()
+    with connection:
+        connection.execute("DELETE FROM checkpoints WHERE updated_at < ?", (now - CHECKPOINT_TTL,))
+        cursor = connection.execute(
+            """
+            INSERT INTO checkpoints (run_id, fingerprint, nodes, state, updated_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(run_id) DO UPDATE SET nodes = excluded.nodes, state = excluded.state, updated_at = excluded.updated_at
+            WHERE checkpoints.fingerprint = excluded.fingerprint
+            """,
+            (run_id, fingerprint, json.dumps(nodes), state, now)
+        )
+    return cursor.rowcount > 0
+
@@ -1,32 +1,127 @@
-from typing import Dict, List, Any
-from .llm import get_llm
-from .storage import get_previous_interactions
+import asyncio
+import threading
+from concurrent.futures import Future, wait
+from typing import Dict, List, Any, Optional, Set
+from .llm import get_llm, ainvoke_counted
+from .tokens import count_tokens
+from .storage import get_previous_interactions, search_briefs, get_context_summary, save_context_summary
+from ..utils.concurrency import get_background_loop
+from ..utils.config import CONTEXT_TOP_K, CONTEXT_TOKEN_BUDGET, CONTEXT_SUMMARY_MAX_WORDS, CONTEXT_SUMMARY_UPDATE_ATTEMPTS
 
-def generate_context_summary(topic: str, previous_interactions: List[Dict[str, Any]]) -> str:
-    """Generate a summary of previous interactions for context."""
-    if not previous_interactions:
-        return "No previous research available."
+# Rolling summary updates only matter to the user's next request, so they run
+# after the brief is returned, on the process-wide background loop (a caller's
+# own loop may be closed as soon as its workflow finishes).
+_pending: Set[Future] = set()
+_pending_lock = threading.Lock()
+
+def get_relevant_interactions(user_id: str, topic: str) -> List[Dict[str, Any]]:
+    """Get the previous briefs most relevant to the topic, within the context token budget."""
+    relevant = []
+    used_tokens = 0
+    
+    for brief in search_briefs(user_id, topic, limit=CONTEXT_TOP_K):
+        tokens = count_tokens(f"{brief.get('topic', '')}\n{brief.get('summary', '')}")
+        if relevant and used_tokens + tokens > CONTEXT_TOKEN_BUDGET:
+            break
+        relevant.append(brief)
+        used_tokens += tokens
     
+    return relevant
+
+def _context_prompt(topic: str, previous_interactions: List[Dict[str, Any]], rolling_summary: Optional[str]) -> str:
     # Extract relevant information from previous briefs
     previous_topics = [brief.get("topic", "") for brief in previous_interactions]
     previous_summaries = [brief.get("summary", "") for brief in previous_interactions]
     
     # Create a prompt for context summarization
-    prompt = f"""
+    return f"""
     The user is researching: {topic}
     
-    Previous research topics: {', '.join(previous_topics)}
+    {f"Overview of the user's research so far: {rolling_summary}" if rolling_summary else ""}
+    
+    Most relevant previous research topics: {', '.join(previous_topics)}
     
-    Previous research summaries:
+    Most relevant previous research summaries:
     {chr(10).join([f"- {summary}" for summary in previous_summaries])}
     
     Generate a concise summary of the previous research that would be relevant
     to the user's current research topic. Focus on key findings, conclusions,
     and any gaps that might need further exploration.
     """
+
+async def agenerate_context_summary(topic: str, previous_interactions: List[Dict[str, Any]], rolling_summary: Optional[str] = None, usage: Optional[Dict[str, Any]] = None) -> str:
+    """Generate a summary of previous interactions for context.
+
+    Token usage is added to usage, if given.
+    """
+    if not previous_interactions and not rolling_summary:
+        return "No previous research available."
     
-    # Use LLM to generate context summary
     llm = get_llm("summarization")
-    response = llm.invoke(prompt)
+    prompt = _context_prompt(topic, previous_interactions, rolling_summary)
+    
+    return await ainvoke_counted(llm, "summarization", prompt, usage, "context_summarization")
+
+def get_rolling_summary(user_id: str) -> Optional[str]:
+    """Get the user's rolling summary of all previous research, if any."""
+    context_summary = get_context_summary(user_id)
+    return context_summary["summary"] if context_summary else None
+
+def _rolling_summary_prompt(previous_summary: str, brief: Dict[str, Any]) -> str:
+    return f"""
+    Here is a running summary of a user's research so far:
+    {previous_summary}
     
-    return response.content
\ No newline at end of file
+    The user has just completed research on: {brief.get('topic', '')}
+    Summary of the new research: {brief.get('summary', '')}
+    
+    Update the running summary to include the new research. Keep the main
+    topics, key findings and open questions, in at most {CONTEXT_SUMMARY_MAX_WORDS} words.
+    Respond with the updated summary only.
+    """
+
+async def aupdate_rolling_summary(user_id: str, brief: Dict[str, Any], usage: Optional[Dict[str, Any]] = None):
+    """Fold a newly saved brief into the user's rolling research summary.
+
+    Only the previous rolling summary and the new brief are sent to the LLM,
+    so the cost of an update does not grow with the user's history. If
+    another update saves first, the brief is folded into its summary instead.
+    The database is read and written from a worker thread.
+    """
+    for _ in range(CONTEXT_SUMMARY_UPDATE_ATTEMPTS):
+        previous = await asyncio.to_thread(get_context_summary, user_id)
+        
+        if previous is None:
+            summary = f"{brief.get('topic', '')}: {brief.get('summary', '')}"
+        else:
+            llm = get_llm("summarization")
+            summary = await ainvoke_counted(llm, "summarization", _rolling_summary_prompt(previous["summary"], brief), usage, "post_processing")
+        
+        brief_count = previous["brief_count"] + 1 if previous else 1
+        if await asyncio.to_thread(save_context_summary, user_id, summary, brief_count):
+            return
+    
+    print(f"Error updating context summary for {user_id}: it kept changing during the update")
+
+
+def _update_done(user_id: str, future: Future):
+    with _pending_lock:
+        _pending.discard(future)
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error updating context summary for {user_id}: {str(future.exception())}")
+
+
+def schedule_rolling_summary_update(user_id: str, brief: Dict[str, Any]) -> Future:
+    """Fold a brief into the user's rolling summary in the background; returns the update's future."""
+    future = asyncio.run_coroutine_threadsafe(aupdate_rolling_summary(user_id, brief), get_background_loop())
+    with _pending_lock:
+        _pending.add(future)
+    future.add_done_callback(lambda done: _update_done(user_id, done))
+    return future
+
+
+def wait_for_rolling_summary_updates(timeout: Optional[float] = None) -> bool:
+    """Wait for scheduled rolling summary updates to finish; returns whether they all did."""
+    with _pending_lock:
+        pending = list(_pending)
+    return not wait(pending, timeout=timeout).not_done
@@ -0,0 +1,140 @@
+import hashlib
+import heapq
+import re
+import threading
+from typing import Any, Dict, List, Set, Tuple
+
+from .blobs import content_length, has_content, loaded_content
+from ..utils.config import DEDUP_THRESHOLD, DEDUP_SHINGLE_SIZE, DEDUP_SIGNATURE_SIZE
+
+# Near-duplicate detection with bottom-k MinHash sketches: each page is
+# reduced to the smallest hashes of its word shingles, and the overlap of two
+# sketches estimates the Jaccard similarity of the full shingle sets.
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def shingles(text: str, size: int = DEDUP_SHINGLE_SIZE) -> Set[str]:
+    """Get the set of word n-grams in text."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text: str, size: int = DEDUP_SIGNATURE_SIZE) -> Set[int]:
+    """Get the bottom-k MinHash sketch of text."""
+    return set(heapq.nsmallest(size, {_hash(shingle) for shingle in shingles(text)}))
+
+
+def estimate_similarity(a: Set[int], b: Set[int], size: int = DEDUP_SIGNATURE_SIZE) -> float:
+    """Estimate the Jaccard similarity of two texts from their sketches."""
+    if not a or not b:
+        return 0.0
+    union = heapq.nsmallest(size, a | b)
+    return sum(1 for h in union if h in a and h in b) / len(union)
+
+
+def cluster_duplicates(texts: List[str], threshold: float = DEDUP_THRESHOLD) -> List[List[int]]:
+    """Group the indices of near-duplicate texts, in order of first appearance."""
+    return cluster_signatures([minhash_signature(text) for text in texts], threshold)
+
+
+def cluster_signatures(signatures: List[Set[int]], threshold: float = DEDUP_THRESHOLD) -> List[List[int]]:
+    """Group the indices of near-duplicate texts by their sketches, in order of first appearance."""
+    parent = list(range(len(signatures)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(len(signatures)):
+        for j in range(i + 1, len(signatures)):
+            if find(i) != find(j) and estimate_similarity(signatures[i], signatures[j]) >= threshold:
+                parent[find(j)] = find(i)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(signatures)):
+        clusters.setdefault(find(i), []).append(i)
+    return list(clusters.values())
+
+
+def result_signature(result: Dict[str, Any]) -> Set[int]:
+    """Get the sketch of a search result's page."""
+    with loaded_content(result) as text:
+        return minhash_signature(text)
+
+
+def _add_duplicate(representative: Dict[str, Any], copy: Dict[str, Any]):
+    # A copy may itself have collapsed duplicates of its own
+    representative.setdefault("duplicates", []).extend([{"url": copy["url"], "title": copy.get("title")}, *copy.get("duplicates", [])])
+    for field in ("queries", "subtopics"):
+        for value in copy.get(field, []):
+            if value not in representative.setdefault(field, []):
+                representative[field].append(value)
+
+
+class SketchIndex:
+    """Sketches of the pages kept by the parallel subtopic branches of one brief.
+
+    Each branch collapses its own duplicates; the index lets a branch skip a
+    page that is a near-duplicate of one another branch already kept.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._kept: List[Tuple[Set[int], Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+
+    def add(self, signature: Set[int], result: Dict[str, Any]) -> bool:
+        """Record a kept page and its sketch.
+
+        Returns False if a near-duplicate was kept already; the page is then
+        listed under that page's "duplicates" instead, as collapse_duplicates
+        would.
+        """
+        with self._lock:
+            for other, kept in self._kept:
+                if estimate_similarity(signature, other) >= self.threshold:
+                    _add_duplicate(kept, result)
+                    return False
+            self._kept.append((signature, result))
+            return True
+
+
+def collapse_duplicates(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Collapse search results with near-duplicate content into one representative each.
+
+    The representative is the copy with the best search score (then the
+    longest content). It lists the other copies under "duplicates" and
+    inherits their queries and subtopics. Results without content are kept
+    as they are. Pages are sketched one at a time, so spilled pages are
+    never all loaded at once.
+    """
+    fetched = [result for result in results if has_content(result)]
+    signatures = []
+    for result in fetched:
+        with loaded_content(result) as text:
+            signatures.append(minhash_signature(text))
+    clusters = cluster_signatures(signatures)
+
+    dropped = set()
+    for cluster in clusters:
+        if len(cluster) < 2:
+            continue
+        copies = [fetched[i] for i in cluster]
+        representative = max(copies, key=lambda r: (r.get("score", 0), content_length(r)))
+
+        for copy in copies:
+            if copy is representative:
+                continue
+            _add_duplicate(representative, copy)
+            dropped.add(id(copy))
+
+    return [result for result in results if id(result) not in dropped]
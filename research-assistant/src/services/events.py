@@ -0,0 +1,34 @@
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+# Progress listener for the workflow running in the current context. Context
+# variables follow the workflow into LangGraph node tasks and worker threads.
+_listener: contextvars.ContextVar[Optional[Callable[[str, Dict[str, Any]], None]]] = contextvars.ContextVar(
+    "progress_listener", default=None
+)
+
+
+@contextmanager
+def progress_listener(listener: Callable[[str, Dict[str, Any]], None]):
+    """Send progress events emitted while the block runs to listener(event, data)."""
+    token = _listener.set(listener)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+def is_streaming() -> bool:
+    """Check whether anyone is listening for progress events."""
+    return _listener.get() is not None
+
+
+def emit(event: str, data: Dict[str, Any]):
+    """Emit a progress event to the current listener, if any."""
+    listener = _listener.get()
+    if listener is not None:
+        try:
+            listener(event, data)
+        except Exception as e:
+            print(f"Error emitting progress event '{event}': {str(e)}")
@@ -0,0 +1,127 @@
+import re
+from collections import Counter
+from typing import List
+
+from .tokens import count_tokens
+from ..utils.config import EXTRACTION_CHUNK_TOKENS, EXTRACTION_TOKEN_BUDGETS, EXTRACTION_DEFAULT_TOKEN_BUDGET
+from ..utils.text import BM25
+
+_BOILERPLATE_RE = re.compile(
+    r"(cookie|privacy policy|terms of (use|service)|all rights reserved|copyright|©|subscribe|sign (in|up)|"
+    r"log ?in|newsletter|share (this|on)|follow us|skip to (main )?content|advertisement)",
+    re.IGNORECASE
+)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def _is_short(line: str) -> bool:
+    return len(line.split()) < 5 and not line.rstrip().endswith((".", "!", "?", ":"))
+
+
+def strip_boilerplate(text: str) -> str:
+    """Drop navigation, footer and other repeated page furniture from extracted text.
+
+    Removes lines that repeat on the page (menus), runs of three or more short
+    link-like lines, and short lines that look like cookie banners, sign-in
+    prompts or copyright notices. A short line right before prose is kept as
+    its heading.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    counts = Counter(lines)
+
+    kept = []
+    run: List[str] = []
+
+    def flush(before_prose: bool = False):
+        if len(run) < 3:
+            kept.extend(run)
+        elif before_prose:
+            kept.append(run[-1])
+        run.clear()
+
+    for line in lines:
+        if counts[line] > 1 and _is_short(line):
+            continue
+        if len(line.split()) < 12 and _BOILERPLATE_RE.search(line):
+            continue
+        if _is_short(line):
+            run.append(line)
+            continue
+        flush(before_prose=True)
+        kept.append(line)
+    flush()
+
+    return "\n".join(kept)
+
+
+def _split_long(line: str, chunk_tokens: int) -> List[str]:
+    pieces = []
+    # A sentence longer than a chunk is cut by words, at roughly 1.5 tokens per word
+    step = max(1, chunk_tokens * 2 // 3)
+    for sentence in _SENTENCE_END_RE.split(line):
+        words = sentence.split()
+        for start in range(0, len(words), step):
+            pieces.append(" ".join(words[start:start + step]))
+    return pieces
+
+
+def chunk_text(text: str, chunk_tokens: int = EXTRACTION_CHUNK_TOKENS) -> List[str]:
+    """Split text into chunks of roughly chunk_tokens tokens along line and sentence boundaries."""
+    chunks = []
+    current: List[str] = []
+    size = 0
+
+    for line in text.splitlines():
+        pieces = _split_long(line, chunk_tokens) if count_tokens(line) > chunk_tokens else [line]
+        for piece in pieces:
+            tokens = count_tokens(piece)
+            if current and size + tokens > chunk_tokens:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += tokens
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def select_chunks(chunks: List[str], query: str, token_budget: int) -> str:
+    """Pack the chunks that best match the query into the token budget.
+
+    Chunks are ranked with BM25 (ties and irrelevant pages fall back to page
+    order) and returned in their original order, with "..." marking gaps.
+    """
+    if not chunks:
+        return ""
+
+    scores = BM25(chunks).scores(query)
+    ranked = sorted(range(len(chunks)), key=lambda i: (-scores[i], i))
+
+    selected = []
+    used = 0
+    for i in ranked:
+        tokens = count_tokens(chunks[i])
+        if used + tokens > token_budget:
+            continue
+        selected.append(i)
+        used += tokens
+
+    parts = []
+    previous = -1
+    for i in sorted(selected):
+        if parts and i != previous + 1:
+            parts.append("...")
+        parts.append(chunks[i])
+        previous = i
+    return "\n".join(parts)
+
+
+def get_token_budget(model_name: str) -> int:
+    """Get the per-source content budget, in tokens, for prompts sent to a model."""
+    return EXTRACTION_TOKEN_BUDGETS.get(model_name, EXTRACTION_DEFAULT_TOKEN_BUDGET)
+
+
+def extract_relevant_content(text: str, query: str, token_budget: int) -> str:
+    """Strip boilerplate from page text and keep the parts most relevant to the query within the budget."""
+    return select_chunks(chunk_text(strip_boilerplate(text)), query, token_budget)
@@ -0,0 +1,196 @@
+import asyncio
+import weakref
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from ..utils.config import (
+    FETCH_MAX_CONCURRENCY,
+    FETCH_PER_HOST_CONCURRENCY,
+    FETCH_TIMEOUT,
+    FETCH_MAX_BYTES,
+    FETCH_USER_AGENT,
+    FETCH_ALLOWED_CONTENT_TYPES,
+    PAGE_CACHE_ENABLED,
+)
+from . import page_cache
+from .metrics import FETCH_DURATION, FETCH_ERRORS
+
+
+class FetchError(Exception):
+    """Raised when a page cannot be fetched or is not usable."""
+
+
+class _LoopResources:
+    """HTTP client and concurrency limits bound to a single event loop."""
+
+    def __init__(self):
+        self.client = httpx.AsyncClient(
+            headers={"User-Agent": FETCH_USER_AGENT},
+            timeout=httpx.Timeout(FETCH_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=FETCH_MAX_CONCURRENCY,
+                max_keepalive_connections=FETCH_MAX_CONCURRENCY,
+            ),
+            follow_redirects=True,
+        )
+        self.semaphore = asyncio.Semaphore(FETCH_MAX_CONCURRENCY)
+        self.host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def host_semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(FETCH_PER_HOST_CONCURRENCY)
+        return self.host_semaphores[host]
+
+
+# asyncio primitives and httpx pools cannot be shared across event loops
+_resources: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopResources]" = weakref.WeakKeyDictionary()
+
+
+def _get_resources() -> _LoopResources:
+    loop = asyncio.get_running_loop()
+    if loop not in _resources:
+        _resources[loop] = _LoopResources()
+    return _resources[loop]
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared pooled HTTP client for the running event loop."""
+    return _get_resources().client
+
+
+async def close_http_client():
+    """Close the shared HTTP client for the running event loop."""
+    resources = _resources.pop(asyncio.get_running_loop(), None)
+    if resources:
+        await resources.client.aclose()
+
+
+def extract_text(html: str) -> str:
+    """Extract the readable text from an HTML document, without navigation and page furniture."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript", "nav", "header", "footer", "aside", "form"]):
+        tag.decompose()
+    return soup.get_text(separator="\n", strip=True)
+
+
+async def _download(client: httpx.AsyncClient, url: str, headers: Dict[str, str]) -> Tuple[int, httpx.Headers, str]:
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code == 304:
+            return response.status_code, response.headers, ""
+        response.raise_for_status()
+
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type and content_type not in FETCH_ALLOWED_CONTENT_TYPES:
+            raise FetchError(f"Unsupported content type '{content_type}'")
+
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body.extend(chunk)
+            if len(body) >= FETCH_MAX_BYTES:
+                del body[FETCH_MAX_BYTES:]
+                break
+
+        html = body.decode(response.charset_encoding or "utf-8", errors="replace")
+        return response.status_code, response.headers, html
+
+
+def _conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+async def fetch_page(url: str, client: Optional[httpx.AsyncClient] = None) -> str:
+    """Fetch a single page and return its extracted text.
+
+    Fresh entries in the page cache are returned without a request; stale
+    entries are revalidated with their ETag/Last-Modified. Downloads are
+    bounded by the global and per-host concurrency limits, a total timeout
+    and a byte cap.
+    """
+    text, _ = await _fetch_page(url, client)
+    return text
+
+
+async def _fetch_page(url: str, client: Optional[httpx.AsyncClient]) -> Tuple[str, bool]:
+    # Also returns whether the page cache holds the text under url
+    entry = await asyncio.to_thread(page_cache.get_entry, url) if PAGE_CACHE_ENABLED else None
+    if entry and page_cache.is_fresh(entry):
+        page_cache.record_hit()
+        return entry["text"], True
+
+    resources = _get_resources()
+    client = client or resources.client
+    host = urlsplit(url).netloc.lower()
+
+    # Wait for the host first, so requests queued behind a busy host don't
+    # hold global slots that other hosts could use
+    async with resources.host_semaphore(host):
+        async with resources.semaphore:
+            try:
+                status_code, headers, html = await asyncio.wait_for(
+                    _download(client, url, _conditional_headers(entry)),
+                    timeout=FETCH_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                raise FetchError(f"Timed out after {FETCH_TIMEOUT}s")
+
+    if status_code == 304:
+        if not entry:
+            raise FetchError("Unexpected 304 Not Modified response")
+        page_cache.record_hit()
+        cached = await asyncio.to_thread(page_cache.refresh_entry, url, entry)
+        return entry["text"], cached
+
+    # Parsing is CPU-bound; keep it off the event loop
+    text = await asyncio.to_thread(extract_text, html)
+
+    if not PAGE_CACHE_ENABLED:
+        return text, False
+    page_cache.record_miss()
+    cached = await asyncio.to_thread(
+        page_cache.put_entry,
+        url,
+        text,
+        headers.get("etag"),
+        headers.get("last-modified")
+    )
+    return text, cached
+
+
+async def _metered_fetch(url: str, client: Optional[httpx.AsyncClient], store: Optional[Callable[..., Any]]) -> Any:
+    try:
+        with FETCH_DURATION.time():
+            text, cached = await _fetch_page(url, client)
+    except Exception:
+        FETCH_ERRORS.inc()
+        raise
+    if store is None or not text:
+        return text
+    return await asyncio.to_thread(store, text, url if cached else None)
+
+
+async def fetch_pages(
+    urls: List[str],
+    client: Optional[httpx.AsyncClient] = None,
+    store: Optional[Callable[..., Any]] = None
+) -> List[Any]:
+    """Fetch several pages concurrently.
+
+    Returns one entry per URL, in input order: the extracted text, or the
+    exception raised while fetching it. With store, each page's text is
+    passed to store as soon as it arrives and its return value is returned
+    instead, so only the pages in flight are held in memory. store is also
+    passed the URL the page cache holds the text under, or None.
+    """
+    return await asyncio.gather(
+        *(_metered_fetch(url, client, store) for url in urls),
+        return_exceptions=True
+    )
@@ -0,0 +1,274 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..utils.config import JOBS_DB_PATH, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_POLL_INTERVAL, JOB_TTL
+
+# SQLite-backed queue of brief jobs. Workers claim a job by taking a lease
+# and renew it while the job runs; a job whose lease runs out (its worker
+# crashed or was restarted) is claimed again, so queued and running jobs
+# survive restarts. A job whose lease ran out JOB_MAX_ATTEMPTS times is
+# failed instead, so a request that crashes its worker is not retried forever.
+# A worker that cannot renew its lease stops the job rather than risk running
+# it alongside the worker that claims it next. Finished jobs are deleted
+# JOB_TTL after they finished, as new jobs are submitted.
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+_local = threading.local()
+
+
+def _get_connection() -> sqlite3.Connection:
+    # sqlite3 connections cannot be shared between threads
+    connection = getattr(_local, "connection", None)
+    if connection is None or getattr(_local, "path", None) != JOBS_DB_PATH:
+        os.makedirs(os.path.dirname(JOBS_DB_PATH) or ".", exist_ok=True)
+        connection = sqlite3.connect(JOBS_DB_PATH, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                dedupe_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                request TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_until REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status_created_at ON jobs (status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_dedupe_key ON jobs (dedupe_key, status);
+        """)
+        _local.connection = connection
+        _local.path = JOBS_DB_PATH
+    return connection
+
+
+def make_dedupe_key(request: Dict[str, Any]) -> str:
+    """Build the key under which identical brief requests are coalesced."""
+    fields = [request.get("user_id"), request.get("topic"), request.get("depth"), request.get("follow_up")]
+    return hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()
+
+
+def submit_job(request: Dict[str, Any]) -> Tuple[str, bool]:
+    """Queue a brief request, or join an identical queued or running job.
+
+    Returns the job id and whether a new job was created.
+    """
+    key = make_dedupe_key(request)
+    connection = _get_connection()
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        row = connection.execute(
+            "SELECT id FROM jobs WHERE dedupe_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+            (key, QUEUED, RUNNING)
+        ).fetchone()
+        if row:
+            connection.commit()
+            return row[0], False
+
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        connection.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (SUCCEEDED, FAILED, now - JOB_TTL)
+        )
+        # A job reclaimed after its worker died resumes from the workflow checkpoints of its run
+        request = {**request, "run_id": request.get("run_id") or job_id}
+        connection.execute(
+            "INSERT INTO jobs (id, dedupe_key, status, request, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, key, QUEUED, json.dumps(request), now, now)
+        )
+        connection.commit()
+        return job_id, True
+    except Exception:
+        connection.rollback()
+        raise
+
+
+def claim_next_job() -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Lease the oldest queued job, or a running job whose lease has expired.
+
+    Expired jobs that have used up their JOB_MAX_ATTEMPTS are marked failed
+    instead of being claimed.
+    """
+    connection = _get_connection()
+    now = time.time()
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        while True:
+            row = connection.execute(
+                "SELECT id, request, status, attempts FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, now)
+            ).fetchone()
+            if row is None or row[2] == QUEUED or row[3] < JOB_MAX_ATTEMPTS:
+                break
+            connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (FAILED, f"Gave up after {row[3]} attempts: the job's worker stopped every time", now, row[0])
+            )
+        if row is None:
+            connection.commit()
+            return None
+
+        connection.execute(
+            "UPDATE jobs SET status = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+            (RUNNING, now + JOB_LEASE_SECONDS, now, row[0])
+        )
+        connection.commit()
+        return row[0], json.loads(row[1])
+    except Exception:
+        connection.rollback()
+        raise
+
+
+def renew_lease(job_id: str) -> bool:
+    """Extend the lease of a running job; returns False if the job is no longer running."""
+    connection = _get_connection()
+    with connection:
+        cursor = connection.execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ?",
+            (time.time() + JOB_LEASE_SECONDS, job_id, RUNNING)
+        )
+    return cursor.rowcount > 0
+
+
+def _finish(job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
+    connection = _get_connection()
+    with connection:
+        connection.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+            (status, result, error, time.time(), job_id)
+        )
+
+
+def complete_job(job_id: str, result: Dict[str, Any]):
+    """Store the result of a finished job."""
+    _finish(job_id, SUCCEEDED, result=json.dumps(result, default=str))
+
+
+def fail_job(job_id: str, error: str):
+    """Mark a job as failed."""
+    _finish(job_id, FAILED, error=error)
+
+
+def requeue_job(job_id: str):
+    """Put a running job back in the queue, e.g. when its worker shuts down."""
+    _finish(job_id, QUEUED)
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Get the status of a job, with its result once it has succeeded."""
+    row = _get_connection().execute(
+        "SELECT id, status, result, error, created_at, updated_at FROM jobs WHERE id = ?", (job_id,)
+    ).fetchone()
+    if row is None:
+        return None
+
+    job = {
+        "job_id": row[0],
+        "status": row[1],
+        "created_at": datetime.fromtimestamp(row[4]).isoformat(),
+        "updated_at": datetime.fromtimestamp(row[5]).isoformat()
+    }
+    if row[2] is not None:
+        job["result"] = json.loads(row[2])
+    if row[3] is not None:
+        job["error"] = row[3]
+    return job
+
+
+class JobWorkerPool:
+    """A bounded pool of asyncio workers that run queued jobs with the given coroutine."""
+
+    def __init__(self, runner: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]], workers: int):
+        self.runner = runner
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers after a job was submitted."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await asyncio.to_thread(claim_next_job)
+            except Exception as e:
+                print(f"Error claiming job: {str(e)}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(*job)
+
+    async def _heartbeat(self, job_id: str):
+        """Renew a job's lease while it runs; returns once the lease is lost or may have run out."""
+        renewed = time.time()
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                if not await asyncio.to_thread(renew_lease, job_id):
+                    print(f"Job {job_id} is no longer running, stopping it")
+                    return
+                renewed = time.time()
+            except Exception as e:
+                print(f"Error renewing the lease of job {job_id}: {str(e)}")
+                # The lease would run out before the next attempt
+                if time.time() - renewed >= JOB_LEASE_SECONDS * 2 / 3:
+                    print(f"Stopping job {job_id}: its lease could not be renewed")
+                    return
+
+    async def _run(self, job_id: str, request: Dict[str, Any]):
+        work = asyncio.create_task(self.runner(request))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            await asyncio.wait({work, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+            if not work.done():
+                # The lease is lost: another worker may claim the job, and resumes it from its checkpoints
+                work.cancel()
+                await asyncio.gather(work, return_exceptions=True)
+                return
+            result = work.result()
+            await asyncio.to_thread(complete_job, job_id, result)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job to the next worker to start
+            work.cancel()
+            requeue_job(job_id)
+            raise
+        except Exception as e:
+            print(f"Error running job {job_id}: {str(e)}")
+            await asyncio.to_thread(fail_job, job_id, getattr(e, "detail", None) or str(e))
+        finally:
+            heartbeat.cancel()
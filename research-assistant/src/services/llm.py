@@ -1,52 +1,259 @@
-from langchain_groq import ChatGroq
-from langchain.globals import set_debug
-from langchain.callbacks.manager import CallbackManager
-from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
+import asyncio
 import os
+import sys
+import threading
 import warnings
+import weakref
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+import httpx
+from .llm_cache import CachedLLM, commit_response
+from .metrics import LLM_DURATION, LLM_ERRORS
+from .tokens import fit_prompt, record_response
+from ..utils.config import LLM_CACHE_MODE, LLM_HTTP_MAX_CONNECTIONS, LLM_HTTP_TIMEOUT
+from ..utils.concurrency import get_background_loop
 
 # Suppress warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 
-# Set debug mode based on environment variable
-set_debug(os.getenv("LANGCHAIN_DEBUG", "false").lower() == "true")
-
 # Disable LangSmith tracing if API key is not set
 if not os.getenv("LANGCHAIN_API_KEY"):
     os.environ["LANGCHAIN_TRACING_V2"] = "false"
 
-def get_llm(task_type: str):
-    """Get an appropriate Groq LLM for the given task type."""
+# langchain and the Groq client are imported when the first model is created,
+# so importing this module stays cheap for callers that only need settings.
+
+# Configured clients are reused across nodes and requests. Async HTTP pools are
+# bound to an event loop, so clients are kept per loop; sync callers drive their
+# async calls on the background loop from run_sync.
+_lock = threading.Lock()
+_settings: Optional[Tuple[Any, ...]] = None
+_http_client: Optional[httpx.Client] = None
+_registry: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+_async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _is_debug() -> bool:
+    return os.getenv("LANGCHAIN_DEBUG", "false").lower() == "true"
+
+
+def _current_settings() -> Tuple[Any, ...]:
+    return (os.getenv("GROQ_API_KEY"), _is_debug(), LLM_CACHE_MODE)
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS
+    )
+
+
+def set_debug(enabled: bool):
+    """Turn langchain debug output on or off, importing langchain only if it is needed."""
+    # Debug output is off by default, so there is nothing to turn off before langchain loads
+    if not enabled and "langchain.globals" not in sys.modules:
+        return
+    from langchain.globals import set_debug as langchain_set_debug
+    langchain_set_debug(enabled)
+
+
+def _close_async_client(loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient):
+    # An async pool can only be closed on the loop it was used on
+    try:
+        loop.call_soon_threadsafe(lambda: loop.create_task(client.aclose()))
+    except RuntimeError:
+        pass  # The loop is closed, and its connections with it
+
+
+def _retire_http_clients(sync_client: Optional[httpx.Client], async_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient]):
+    """Close replaced HTTP pools once calls already using them have had LLM_HTTP_TIMEOUT to finish."""
+    def close():
+        if sync_client is not None:
+            sync_client.close()
+        for loop, client in async_clients.items():
+            _close_async_client(loop, client)
+    
+    timer = threading.Timer(LLM_HTTP_TIMEOUT, close)
+    timer.daemon = True
+    timer.start()
+
+
+def reset_llm_registry():
+    """Drop all cached model clients and re-apply environment settings.
+
+    Called automatically when GROQ_API_KEY, LANGCHAIN_DEBUG or the cache mode
+    change; the next get_llm call builds fresh clients. The old HTTP pools
+    are closed later, so calls still running on them can finish.
+    """
+    global _settings, _http_client
+    
+    with _lock:
+        sync_client, async_clients = _http_client, dict(_async_http_clients)
+        _registry.clear()
+        _async_http_clients.clear()
+        _http_client = None
+        _settings = _current_settings()
+        set_debug(_is_debug())
+    
+    if sync_client is not None or async_clients:
+        _retire_http_clients(sync_client, async_clients)
+
+
+def get_model_settings(task_type: str) -> Tuple[str, float, int]:
+    """Get the model name, temperature and completion token limit for a task type."""
+    # Use Llama 3 70B for complex reasoning tasks
+    if task_type in ["planning", "synthesis"]:
+        return "llama3-70b-8192", 0.1, 4000
+    
+    # Use Mixtral for simpler tasks, and by default
+    return "mixtral-8x7b-32768", 0.2, 2000
+
+
+def get_model_name(task_type: str) -> str:
+    """Get the name of the model used for the given task type, without creating a client."""
+    return get_model_settings(task_type)[0]
+
+
+class MeteredLLM:
+    """Chat model wrapper that records call latency and errors for /metrics.
+
+    It wraps the model inside the response cache, so only calls that reach
+    the model are recorded.
+    """
+
+    def __init__(self, llm: Any, model_name: str):
+        self.llm = llm
+        self.model_name = model_name
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+    def _record(self, start: float, failed: bool):
+        LLM_DURATION.observe(time.perf_counter() - start, model=self.model_name)
+        if failed:
+            LLM_ERRORS.inc(model=self.model_name)
+
+    def invoke(self, prompt: Any, *args, **kwargs) -> Any:
+        start, failed = time.perf_counter(), True
+        try:
+            response = self.llm.invoke(prompt, *args, **kwargs)
+            failed = False
+            return response
+        finally:
+            self._record(start, failed)
+
+    async def ainvoke(self, prompt: Any, *args, **kwargs) -> Any:
+        start, failed = time.perf_counter(), True
+        try:
+            response = await self.llm.ainvoke(prompt, *args, **kwargs)
+            failed = False
+            return response
+        finally:
+            self._record(start, failed)
+
+    async def astream(self, prompt: Any, *args, **kwargs) -> AsyncIterator[Any]:
+        start, failed = time.perf_counter(), True
+        try:
+            async for chunk in self.llm.astream(prompt, *args, **kwargs):
+                yield chunk
+            failed = False
+        finally:
+            self._record(start, failed)
+
+
+def _create_llm(task_type: str, loop: asyncio.AbstractEventLoop):
+    """Create an appropriate Groq LLM for the given task type.
+
+    Unless LLM_CACHE_MODE is "off", the model is wrapped so repeated prompts
+    are served from the response cache. In "replay" mode no Groq client is
+    created at all and only recorded responses are returned.
+    """
+    global _http_client
+    
+    model, temperature, max_tokens = get_model_settings(task_type)
+    
+    if LLM_CACHE_MODE == "replay":
+        return CachedLLM(None, model, temperature)
+    
     groq_api_key = os.getenv("GROQ_API_KEY")
     if not groq_api_key:
         raise ValueError("GROQ_API_KEY environment variable not set. Please set it in your .env file.")
     
-    # Use Llama 3 70B for complex reasoning tasks
-    if task_type in ["planning", "synthesis"]:
-        return ChatGroq(
-            model="llama3-70b-8192",
-            temperature=0.1,
-            max_tokens=4000,
-            groq_api_key=groq_api_key,
-            callback_manager=CallbackManager([StreamingStdOutCallbackHandler()]) if os.getenv("LANGCHAIN_DEBUG", "false").lower() == "true" else None
-        )
-    
-    # Use Mixtral for simpler tasks
-    elif task_type in ["summarization", "formatting"]:
-        return ChatGroq(
-            model="mixtral-8x7b-32768",
-            temperature=0.2,
-            max_tokens=2000,
-            groq_api_key=groq_api_key,
-            callback_manager=CallbackManager([StreamingStdOutCallbackHandler()]) if os.getenv("LANGCHAIN_DEBUG", "false").lower() == "true" else None
-        )
-    
-    # Default to Mixtral
-    else:
-        return ChatGroq(
-            model="mixtral-8x7b-32768",
-            temperature=0.2,
-            max_tokens=2000,
-            groq_api_key=groq_api_key,
-            callback_manager=CallbackManager([StreamingStdOutCallbackHandler()]) if os.getenv("LANGCHAIN_DEBUG", "false").lower() == "true" else None
-        )
\ No newline at end of file
+    # One keep-alive pool for sync calls, and one per event loop for async calls
+    if _http_client is None:
+        _http_client = httpx.Client(limits=_http_limits(), timeout=LLM_HTTP_TIMEOUT)
+    if loop not in _async_http_clients:
+        _async_http_clients[loop] = httpx.AsyncClient(limits=_http_limits(), timeout=LLM_HTTP_TIMEOUT)
+    
+    from langchain_groq import ChatGroq
+    from langchain.callbacks.manager import CallbackManager
+    from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
+    
+    llm = ChatGroq(
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        groq_api_key=groq_api_key,
+        http_client=_http_client,
+        http_async_client=_async_http_clients[loop],
+        callback_manager=CallbackManager([StreamingStdOutCallbackHandler()]) if _is_debug() else None
+    )
+    
+    if LLM_CACHE_MODE == "off":
+        return MeteredLLM(llm, model)
+    return CachedLLM(MeteredLLM(llm, model), model, temperature)
+
+
+def get_llm(task_type: str):
+    """Get the shared Groq LLM for the given task type.
+
+    Clients are created once per task type (and event loop) and reused, so
+    their HTTP connections stay alive between calls. Works for both invoke
+    and ainvoke.
+    """
+    if _current_settings() != _settings:
+        reset_llm_registry()
+    
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = get_background_loop()
+    
+    with _lock:
+        clients = _registry.setdefault(loop, {})
+        if task_type not in clients:
+            clients[task_type] = _create_llm(task_type, loop)
+        return clients[task_type]
+
+
+
+def prepare_prompt(task_type: str, prompt: str) -> Tuple[str, int]:
+    """Trim a prompt to fit the task's model context window; returns it with its token count."""
+    model, _, max_tokens = get_model_settings(task_type)
+    return fit_prompt(prompt, model, max_tokens)
+
+
+def invoke_counted(llm, task_type: str, prompt: str, usage: Optional[Dict[str, Any]] = None, node: str = "",
+                   parse: Optional[Callable[[str], Any]] = None) -> Any:
+    """Send a prompt, trimmed to the context window, and record its token usage under node.
+
+    Returns the reply's text, or what parse made of it. The reply is only
+    cached once parse has accepted it.
+    """
+    prompt, prompt_tokens = prepare_prompt(task_type, prompt)
+    response = llm.invoke(prompt)
+    record_response(usage, node, get_model_name(task_type), response, prompt_tokens, response.content)
+    result = parse(response.content) if parse else response.content
+    commit_response(llm, prompt, response)
+    return result
+
+
+async def ainvoke_counted(llm, task_type: str, prompt: str, usage: Optional[Dict[str, Any]] = None, node: str = "",
+                          parse: Optional[Callable[[str], Any]] = None) -> Any:
+    """Async version of invoke_counted."""
+    prompt, prompt_tokens = prepare_prompt(task_type, prompt)
+    response = await llm.ainvoke(prompt)
+    record_response(usage, node, get_model_name(task_type), response, prompt_tokens, response.content)
+    result = parse(response.content) if parse else response.content
+    commit_response(llm, prompt, response)
+    return result
@@ -0,0 +1,209 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from .metrics import CACHE_LOOKUPS
+from ..utils.config import LLM_CACHE_MODE, LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES
+
+
+class LLMCacheMiss(Exception):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+
+_local = threading.local()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+# Set while a retried or resumed run calls the model: it must not replay replies
+_fresh = ContextVar("llm_cache_fresh", default=False)
+
+
+def _get_connection() -> sqlite3.Connection:
+    # sqlite3 connections cannot be shared between threads
+    connection = getattr(_local, "connection", None)
+    if connection is None or getattr(_local, "path", None) != LLM_CACHE_PATH:
+        os.makedirs(os.path.dirname(LLM_CACHE_PATH) or ".", exist_ok=True)
+        connection = sqlite3.connect(LLM_CACHE_PATH, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at)")
+        _local.connection = connection
+        _local.path = LLM_CACHE_PATH
+    return connection
+
+
+_RESULTS = {"hits": "hit", "misses": "miss"}
+
+
+def _count(stat: str):
+    with _lock:
+        _stats[stat] += 1
+    if stat in _RESULTS:
+        CACHE_LOOKUPS.inc(cache="llm", result=_RESULTS[stat])
+
+
+def make_key(model: str, temperature: Optional[float], prompt: Any) -> str:
+    """Build the cache key for a prompt sent to a model at a given temperature."""
+    text = prompt if isinstance(prompt, str) else repr(prompt)
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}:{temperature}:{digest}"
+
+
+def get_response(key: str) -> Optional[str]:
+    """Look up a recorded response."""
+    connection = _get_connection()
+    row = connection.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        _count("misses")
+        return None
+
+    _count("hits")
+    with connection:
+        connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+    return row[0]
+
+
+def put_response(key: str, model: str, content: str):
+    """Record a response, evicting the least recently used ones past the size cap."""
+    connection = _get_connection()
+    now = time.time()
+    with connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO responses (key, model, content, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, content, len(content.encode("utf-8")), now, now)
+        )
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > LLM_CACHE_MAX_BYTES:
+            evicted = 0
+            target = LLM_CACHE_MAX_BYTES * 0.9
+            for row_key, size in connection.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+                if total <= target:
+                    break
+                connection.execute("DELETE FROM responses WHERE key = ?", (row_key,))
+                total -= size
+                evicted += 1
+            with _lock:
+                _stats["evictions"] += evicted
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss counters for the LLM response cache."""
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def is_cached(response: Any) -> bool:
+    """Whether a response (or streamed chunk) was served from the cache rather than by the model."""
+    metadata = getattr(response, "response_metadata", None)
+    return isinstance(metadata, dict) and bool(metadata.get("cached"))
+
+
+@contextmanager
+def fresh_replies(enabled: bool = True) -> Iterator[None]:
+    """Skip cache reads for the model calls made in the block (and tasks it starts).
+
+    Used for retried and resumed runs, so they ask the model again rather
+    than replaying the replies of the attempt that failed. Replies are still
+    recorded, and replay mode still reads the cache.
+    """
+    token = _fresh.set(enabled or _fresh.get())
+    try:
+        yield
+    finally:
+        _fresh.reset(token)
+
+
+class CachedLLM:
+    """Chat model wrapper that serves repeated prompts from the response cache.
+
+    In replay mode the wrapped model is never called (and may be None);
+    prompts without a recorded response raise LLMCacheMiss. Responses served
+    from the cache are marked "cached" in their response_metadata.
+
+    Replies are not recorded as they arrive: the caller records a reply with
+    commit_response once it has parsed it, so a malformed reply is never
+    replayed.
+    """
+
+    def __init__(self, llm: Any, model_name: str, temperature: Optional[float]):
+        self.llm = llm
+        self.model_name = model_name
+        self.temperature = temperature
+
+    def __getattr__(self, name: str) -> Any:
+        if self.llm is None:
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+    def _lookup(self, prompt: Any) -> Optional[str]:
+        if LLM_CACHE_MODE == "off" or (_fresh.get() and self.llm is not None):
+            return None
+        key = make_key(self.model_name, self.temperature, prompt)
+        content = get_response(key)
+        if content is None and (LLM_CACHE_MODE == "replay" or self.llm is None):
+            raise LLMCacheMiss(f"No recorded response for {self.model_name} prompt {key}")
+        return content
+
+    def record(self, prompt: Any, content: str):
+        """Record the reply to a prompt, serving it for repeats of the prompt from now on."""
+        if LLM_CACHE_MODE in ("off", "replay") or self.llm is None:
+            return
+        put_response(make_key(self.model_name, self.temperature, prompt), self.model_name, content)
+
+    def cached_reply(self, prompt: Any) -> Any:
+        """Get the recorded reply to a prompt, marked "cached", or None when the model has to be asked."""
+        content = self._lookup(prompt)
+        if content is None:
+            return None
+        from langchain_core.messages import AIMessage
+        return AIMessage(content=content, response_metadata={"cached": True})
+
+    def invoke(self, prompt: Any, *args, **kwargs) -> Any:
+        response = self.cached_reply(prompt)
+        if response is not None:
+            return response
+        return self.llm.invoke(prompt, *args, **kwargs)
+
+    async def ainvoke(self, prompt: Any, *args, **kwargs) -> Any:
+        response = self.cached_reply(prompt)
+        if response is not None:
+            return response
+        return await self.llm.ainvoke(prompt, *args, **kwargs)
+
+    async def astream(self, prompt: Any, *args, **kwargs) -> AsyncIterator[Any]:
+        content = self._lookup(prompt)
+        if content is not None:
+            from langchain_core.messages import AIMessageChunk
+            yield AIMessageChunk(content=content, response_metadata={"cached": True})
+            return
+        async for chunk in self.llm.astream(prompt, *args, **kwargs):
+            yield chunk
+
+
+def commit_response(llm: Any, prompt: Any, response: Any, content: Optional[str] = None):
+    """Record a model's reply to a prompt in the cache, once the caller has parsed it.
+
+    content is the reply's text, for a streamed reply whose response is its
+    first chunk. Replies served from the cache, and models without a cache,
+    are left alone.
+    """
+    if isinstance(llm, CachedLLM) and not is_cached(response):
+        content = response.content if content is None else content
+        if isinstance(content, str):
+            llm.record(prompt, content)
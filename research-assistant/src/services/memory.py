@@ -0,0 +1,88 @@
+import contextvars
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from .metrics import CONTENT_SPILLED, REQUEST_CONTENT_PEAK
+
+# Page content held in memory by each workflow run, so its peak can be
+# reported per request. The tracker follows the run in a context variable,
+# into LangGraph node tasks and worker threads.
+
+
+class MemoryTracker:
+    """Bytes of page content one workflow run holds in memory, and has spilled to disk."""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self.spilled = 0
+        self._lock = threading.Lock()
+
+    def charge(self, nbytes: int):
+        with self._lock:
+            self.current += nbytes
+            self.peak = max(self.peak, self.current)
+
+    def discharge(self, nbytes: int):
+        with self._lock:
+            self.current -= nbytes
+
+    def spill(self, nbytes: int):
+        with self._lock:
+            self.spilled += nbytes
+
+    def report(self) -> Dict[str, int]:
+        return {"peak_bytes": self.peak, "spilled_bytes": self.spilled}
+
+
+_tracker: contextvars.ContextVar[Optional[MemoryTracker]] = contextvars.ContextVar("memory_tracker", default=None)
+
+
+@contextmanager
+def track_memory():
+    """Track the page content held by the workflow run in the block.
+
+    The peak is observed in /metrics when the block ends.
+    """
+    tracker = MemoryTracker()
+    token = _tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _tracker.reset(token)
+        REQUEST_CONTENT_PEAK.observe(tracker.peak)
+
+
+def text_bytes(text: str) -> int:
+    """Get the memory taken by a string."""
+    return sys.getsizeof(text)
+
+
+def charge(nbytes: int):
+    """Count bytes the current run now holds in memory."""
+    tracker = _tracker.get()
+    if tracker is not None:
+        tracker.charge(nbytes)
+
+
+def discharge(nbytes: int):
+    """Count bytes the current run no longer holds in memory."""
+    tracker = _tracker.get()
+    if tracker is not None:
+        tracker.discharge(nbytes)
+
+
+def record_spill(nbytes: int):
+    """Count bytes the current run spilled to disk instead of holding them."""
+    CONTENT_SPILLED.inc(nbytes)
+    tracker = _tracker.get()
+    if tracker is not None:
+        tracker.spill(nbytes)
+
+
+def memory_report() -> Optional[Dict[str, int]]:
+    """Get the peak and spilled bytes of the current run, if it is tracked."""
+    tracker = _tracker.get()
+    return tracker.report() if tracker is not None else None
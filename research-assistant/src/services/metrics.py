@@ -0,0 +1,232 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+# A minimal in-process metrics registry rendered in the Prometheus text
+# format. Every process keeps its own registry and the values are not shared,
+# so a deployment running several workers (uvicorn --workers, several
+# containers) needs one scrape target per worker; sum across them in queries.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> Iterator[Tuple[str, str, float]]:
+        """Yield each sample's name suffix, rendered labels and value."""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """A monotonically increasing count."""
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield "", _format_labels(self.labelnames, key), value
+
+
+class Gauge(Counter):
+    """A value that can go up and down."""
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Observe the duration of the block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        values = self._values.get(self._key(labels))
+        return values[0][-1] if values else 0
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            for bound, count in zip(self.buckets, counts):
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                yield "_bucket", labels, count
+            yield "_sum", _format_labels(self.labelnames, key), total
+            yield "_count", _format_labels(self.labelnames, key), counts[-1]
+
+
+class Registry:
+    """Holds metrics and collectors and renders them for scraping."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Register a function that refreshes gauges right before each scrape."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Error collecting metrics: {str(e)}")
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+NODE_DURATION = registry.register(Histogram(
+    "research_node_duration_seconds", "Time spent in each workflow node.", ["node"]
+))
+NODE_ERRORS = registry.register(Counter(
+    "research_node_errors_total", "Workflow nodes that raised or reported an error.", ["node"]
+))
+LLM_DURATION = registry.register(Histogram(
+    "research_llm_request_duration_seconds", "Latency of LLM calls.", ["model"]
+))
+LLM_ERRORS = registry.register(Counter(
+    "research_llm_errors_total", "LLM calls that failed.", ["model"]
+))
+LLM_TOKENS = registry.register(Counter(
+    "research_llm_tokens_total", "Tokens sent to and generated by each model.", ["model", "kind"]
+))
+SEARCH_DURATION = registry.register(Histogram(
+    "research_search_duration_seconds", "Latency of search queries."
+))
+SEARCH_ERRORS = registry.register(Counter(
+    "research_search_errors_total", "Search queries that failed."
+))
+FETCH_DURATION = registry.register(Histogram(
+    "research_fetch_duration_seconds", "Latency of page fetches, including cache hits."
+))
+FETCH_ERRORS = registry.register(Counter(
+    "research_fetch_errors_total", "Page fetches that failed."
+))
+CHECKPOINT_ERRORS = registry.register(Counter(
+    "research_checkpoint_errors_total", "Checkpoints that could not be loaded or saved.", ["operation"]
+))
+WORKFLOWS_IN_FLIGHT = registry.register(Gauge(
+    "research_workflows_in_flight", "Workflows currently running in this process.", ["kind"]
+))
+REQUEST_CONTENT_PEAK = registry.register(Histogram(
+    "research_request_content_peak_bytes", "Most page content a workflow held in memory at once.",
+    buckets=(16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+))
+CONTENT_SPILLED = registry.register(Counter(
+    "research_content_spilled_bytes_total", "Page content spilled to the blob store instead of memory."
+))
+CACHE_HIT_RATIO = registry.register(Gauge(
+    "research_cache_hit_ratio", "Share of cache lookups served from the cache.", ["cache"]
+))
+CACHE_LOOKUPS = registry.register(Counter(
+    "research_cache_lookups_total", "Cache lookups, by cache and result (hit or miss).", ["cache", "result"]
+))
+
+
+def _collect_cache_stats():
+    from . import llm_cache, page_cache
+
+    for cache, stats in (("page", page_cache.get_cache_stats()), ("llm", llm_cache.get_cache_stats())):
+        CACHE_HIT_RATIO.set(stats["hit_rate"], cache=cache)
+
+
+registry.add_collector(_collect_cache_stats)
+
+
+@contextmanager
+def track_in_flight(kind: str):
+    """Count a running workflow in the in-flight gauge."""
+    WORKFLOWS_IN_FLIGHT.inc(kind=kind)
+    try:
+        yield
+    finally:
+        WORKFLOWS_IN_FLIGHT.dec(kind=kind)
+
+
+def render_metrics() -> str:
+    """Render all metrics in the Prometheus text exposition format."""
+    return registry.render()
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from .metrics import CACHE_LOOKUPS
+from ..utils.config import PAGE_CACHE_DIR, PAGE_CACHE_TTL, PAGE_CACHE_MAX_BYTES
+from ..utils.urls import normalize_url
+
+# Entries are stored as one JSON file per normalized URL, named by its hash.
+# File modification times track recency for LRU eviction.
+
+_lock = threading.Lock()
+_total_bytes: Optional[int] = None
+_stats = {"hits": 0, "misses": 0, "revalidations": 0, "evictions": 0}
+
+
+def _entry_path(url: str) -> str:
+    key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+    return os.path.join(PAGE_CACHE_DIR, key[:2], f"{key}.json")
+
+
+def _iter_entries():
+    for root, _, files in os.walk(PAGE_CACHE_DIR):
+        for name in files:
+            if name.endswith(".json"):
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat
+
+
+def _touch(path: str):
+    # Filesystem timestamps can be coarser than successive accesses
+    now = time.time()
+    os.utime(path, (now, now))
+
+
+_RESULTS = {"hits": "hit", "misses": "miss"}
+
+
+def _count(stat: str):
+    with _lock:
+        _stats[stat] += 1
+    if stat in _RESULTS:
+        CACHE_LOOKUPS.inc(cache="page", result=_RESULTS[stat])
+
+
+def is_fresh(entry: Dict[str, Any]) -> bool:
+    """Check whether a cache entry is still within its TTL."""
+    return time.time() - entry.get("fetched_at", 0) < PAGE_CACHE_TTL
+
+
+def get_entry(url: str) -> Optional[Dict[str, Any]]:
+    """Load the cache entry for a URL, fresh or stale, and mark it as recently used."""
+    path = _entry_path(url)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        _touch(path)
+        return entry
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error reading page cache entry for {url}: {str(e)}")
+        return None
+
+
+def record_hit():
+    """Count a lookup served from the cache, including revalidated entries."""
+    _count("hits")
+
+
+def record_miss():
+    """Count a lookup that needed a full download."""
+    _count("misses")
+
+
+def put_entry(url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> bool:
+    """Store the extracted text for a URL, evicting old entries if over the size cap.
+
+    Returns whether the entry was written.
+    """
+    global _total_bytes
+
+    path = _entry_path(url)
+    entry = {
+        "url": url,
+        "text": text,
+        "etag": etag,
+        "last_modified": last_modified,
+        "fetched_at": time.time()
+    }
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        _touch(path)
+        size = os.path.getsize(path)
+    except Exception as e:
+        print(f"Error writing page cache entry for {url}: {str(e)}")
+        return False
+
+    with _lock:
+        if _total_bytes is None:
+            _total_bytes = sum(stat.st_size for _, stat in _iter_entries())
+        else:
+            _total_bytes += size - previous
+        over_cap = _total_bytes > PAGE_CACHE_MAX_BYTES
+
+    if over_cap:
+        evict()
+    return True
+
+
+def refresh_entry(url: str, entry: Dict[str, Any]) -> bool:
+    """Mark a stale entry as fresh again after a 304 Not Modified response; returns whether it was written."""
+    _count("revalidations")
+    return put_entry(url, entry["text"], entry.get("etag"), entry.get("last_modified"))
+
+
+def evict():
+    """Remove least recently used entries until the cache is below 90% of its cap."""
+    global _total_bytes
+
+    with _lock:
+        entries = sorted(_iter_entries(), key=lambda item: item[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        target = PAGE_CACHE_MAX_BYTES * 0.9
+
+        for path, stat in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= stat.st_size
+            _stats["evictions"] += 1
+
+        _total_bytes = total
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss counters for the page cache."""
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
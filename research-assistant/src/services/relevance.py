@@ -0,0 +1,91 @@
+from typing import Any, Callable, Dict, List, Optional
+
+from .blobs import has_content, read_content
+from ..models.plan import ResearchPlan
+from ..utils.text import BM25, tokenize
+
+
+def plan_query(topic: str, plan: ResearchPlan) -> str:
+    """Build the lexical query for a research plan from its topic, subtopics and search queries."""
+    return " ".join([topic, *plan.subtopics, *(query.query for query in plan.queries)])
+
+
+def select_relevant_sources(
+    results: List[Dict[str, Any]],
+    query: str,
+    limit: int,
+    accept: Optional[Callable[[Dict[str, Any]], bool]] = None
+) -> List[Dict[str, Any]]:
+    """Keep the limit fetched sources that best match the query, in their original order.
+
+    Sources are ranked with BM25 over their extracted text, with the search
+    score breaking ties. Results without content are dropped. With accept,
+    sources are offered to it best first, and only those it accepts are
+    kept, until limit are.
+    """
+    fetched = [result for result in results if has_content(result)]
+    if len(fetched) <= limit and accept is None:
+        return fetched
+
+    scores = BM25([result.get("excerpt") or read_content(result) for result in fetched]).scores(query)
+    ranked = sorted(range(len(fetched)), key=lambda i: (-scores[i], -fetched[i].get("score", 0), i))
+    if accept is None:
+        return [fetched[i] for i in sorted(ranked[:limit])]
+
+    selected = []
+    for i in ranked:
+        if len(selected) == limit:
+            break
+        if accept(fetched[i]):
+            selected.append(i)
+    return [fetched[i] for i in sorted(selected)]
+
+
+
+def _stored_source_text(source: Dict[str, Any]) -> str:
+    summary = source.get("summary") or {}
+    return " ".join([source.get("title") or "", summary.get("summary", ""), *summary.get("key_points", []), *source.get("subtopics", [])])
+
+
+def select_reusable_sources(
+    sources: List[Dict[str, Any]],
+    topic: str,
+    plan: ResearchPlan,
+    per_subtopic: int,
+    min_match: float
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Pick stored sources that cover each subtopic of a plan, by subtopic.
+
+    A source matches a subtopic when its title, summary, key points and
+    earlier subtopics contain at least one of the subtopic's terms and at
+    least min_match of the topic's and subtopic's terms together. Up to
+    per_subtopic matches are kept per subtopic, best BM25 score first, and
+    each source is used for one subtopic only.
+    """
+    if not sources:
+        return {}
+
+    documents = [_stored_source_text(source) for source in sources]
+    terms = [set(tokenize(document)) for document in documents]
+    index = BM25(documents)
+    topic_terms = set(tokenize(topic))
+
+    used = set()
+    selected: Dict[str, List[Dict[str, Any]]] = {}
+    for subtopic in plan.subtopics:
+        subtopic_terms = set(tokenize(subtopic)) - topic_terms
+        query_terms = topic_terms | subtopic_terms
+        if not query_terms:
+            continue
+        scores = index.scores(" ".join(query_terms))
+        matches = [
+            i for i in range(len(sources))
+            if i not in used
+            and (not subtopic_terms or subtopic_terms & terms[i])
+            and len(query_terms & terms[i]) / len(query_terms) >= min_match
+        ]
+        best = sorted(matches, key=lambda i: (-scores[i], i))[:per_subtopic]
+        if best:
+            used.update(best)
+            selected[subtopic] = [sources[i] for i in best]
+    return selected
\ No newline at end of file
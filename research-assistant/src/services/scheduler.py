@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List
+
+from .llm_cache import CachedLLM
+from ..utils.config import LLM_MAX_IN_FLIGHT, LLM_RATE_LIMITS, LLM_DEFAULT_RATE_LIMIT
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously over a one minute window."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount: int) -> float:
+        """Take amount from the bucket and return how long to wait before using it.
+
+        Reservations may drive the bucket negative; later callers then wait
+        for the debt to be refilled, which keeps callers in arrival order.
+        """
+        if self.capacity <= 0:
+            return 0.0
+
+        with self.lock:
+            now = time.monotonic()
+            self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+            self.updated = now
+            # A single request larger than the budget can only wait for a full bucket
+            self.available -= min(amount, self.capacity)
+            if self.available >= 0:
+                return 0.0
+            return -self.available / self.rate
+
+
+class LLMScheduler:
+    """Bounds concurrency and request/token rates for calls to one model."""
+
+    def __init__(self, max_in_flight: int, requests_per_minute: int, tokens_per_minute: int):
+        self.max_in_flight = max_in_flight
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        # asyncio semaphores are bound to the loop they are first used on
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphores[loop]
+
+    async def submit(self, call: Callable[[], Awaitable[Any]], tokens: int = 0) -> Any:
+        """Run call once the rate budget allows it and a slot is free.
+
+        Callers wait for the budget before taking a slot, so a call waiting
+        for the bucket to refill does not hold a slot others could use.
+        """
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if delay:
+            await asyncio.sleep(delay)
+        async with self._semaphore():
+            return await call()
+
+    async def ainvoke(self, llm: Any, prompt: Any, tokens: int = 0) -> Any:
+        """Ask a model for its reply to a prompt through submit.
+
+        A reply served from the response cache never reaches the provider, so
+        it is returned at once without using a slot or any of the budget.
+        """
+        if isinstance(llm, CachedLLM):
+            response = llm.cached_reply(prompt)
+            if response is not None:
+                return response
+            llm = llm.llm
+        return await self.submit(lambda: llm.ainvoke(prompt), tokens)
+
+    async def map(self, calls: List[Callable[[], Awaitable[Any]]], tokens: List[int]) -> List[Any]:
+        """Run several calls concurrently.
+
+        Results are returned in input order; a failed call yields its
+        exception in place without cancelling the others.
+        """
+        return await asyncio.gather(
+            *(self.submit(call, cost) for call, cost in zip(calls, tokens)),
+            return_exceptions=True
+        )
+
+
+_schedulers: Dict[str, LLMScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(model_name: str) -> LLMScheduler:
+    """Get the shared scheduler for a model."""
+    with _schedulers_lock:
+        if model_name not in _schedulers:
+            limits = LLM_RATE_LIMITS.get(model_name, LLM_DEFAULT_RATE_LIMIT)
+            _schedulers[model_name] = LLMScheduler(
+                max_in_flight=LLM_MAX_IN_FLIGHT,
+                requests_per_minute=limits.get("requests_per_minute", 0),
+                tokens_per_minute=limits.get("tokens_per_minute", 0)
+            )
+        return _schedulers[model_name]
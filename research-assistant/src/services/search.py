@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from typing import Dict, List, Any
+
+from .metrics import SEARCH_DURATION, SEARCH_ERRORS
+from ..models.plan import ResearchQuery
+from ..utils.config import SEARCH_MAX_CONCURRENCY
+from ..utils.urls import normalize_url
+
+
+def get_search_tool(max_results: int):
+    """Get a Tavily search tool returning up to max_results results per query."""
+    from langchain_community.tools.tavily_search import TavilySearchResults
+
+    return TavilySearchResults(max_results=max_results)
+
+
+async def _run_query(search_tool, query: ResearchQuery, semaphore: asyncio.Semaphore) -> List[Dict[str, Any]]:
+    async with semaphore:
+        try:
+            with SEARCH_DURATION.time():
+                results = await search_tool.ainvoke(query.query)
+        except Exception as e:
+            SEARCH_ERRORS.inc()
+            print(f"Error executing search query '{query.query}': {str(e)}")
+            return []
+
+    # The Tavily tool reports failures as a string instead of raising
+    if not isinstance(results, list):
+        SEARCH_ERRORS.inc()
+        print(f"Error executing search query '{query.query}': {results}")
+        return []
+    return results
+
+
+def merge_results(queries: List[ResearchQuery], results_per_query: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Merge per-query results, de-duplicating them by normalized URL.
+
+    Each merged result records every query and subtopic that matched it under
+    "queries" and "subtopics", and keeps the highest search score.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+
+    for query, results in zip(queries, results_per_query):
+        for result in results:
+            if not result.get("url"):
+                continue
+
+            key = normalize_url(result["url"])
+            if key not in merged:
+                merged[key] = {**result, "queries": [], "subtopics": []}
+            entry = merged[key]
+
+            if query.query not in entry["queries"]:
+                entry["queries"].append(query.query)
+            if query.subtopic not in entry["subtopics"]:
+                entry["subtopics"].append(query.subtopic)
+            if result.get("score", 0) > entry.get("score", 0):
+                entry["score"] = result["score"]
+
+    return list(merged.values())
+
+
+class UrlClaims:
+    """Pages claimed by the parallel subtopic branches of one brief.
+
+    A branch claims a page once it has fetched it and decided to keep it, so
+    a page found for several subtopics is summarized only by the branch that
+    claims it first, and a failed fetch leaves it to the other branches.
+    """
+
+    def __init__(self):
+        self._urls = set()
+        self._lock = threading.Lock()
+
+    def claim(self, result: Dict[str, Any]) -> bool:
+        """Claim a result's page; returns False if another branch already has."""
+        key = normalize_url(result["url"])
+        with self._lock:
+            if key in self._urls:
+                return False
+            self._urls.add(key)
+            return True
+
+    def release(self, result: Dict[str, Any]):
+        """Give up a claim, leaving the page to the other branches."""
+        with self._lock:
+            self._urls.discard(normalize_url(result["url"]))
+
+    def unclaimed(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Get the results whose pages no branch has claimed yet."""
+        with self._lock:
+            return [result for result in results if normalize_url(result["url"]) not in self._urls]
+
+
+async def run_searches(queries: List[ResearchQuery], max_results: int) -> List[Dict[str, Any]]:
+    """Run all research queries concurrently and return the merged results."""
+    search_tool = get_search_tool(max_results)
+    semaphore = asyncio.Semaphore(SEARCH_MAX_CONCURRENCY)
+
+    results_per_query = await asyncio.gather(
+        *(_run_query(search_tool, query, semaphore) for query in queries)
+    )
+
+    return merge_results(queries, results_per_query)
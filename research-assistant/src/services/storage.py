@@ -1,61 +1,385 @@
 # src/services/storage.py
 import json
 import os
-import platform
-from typing import Dict, List, Any
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Any, Optional
 from datetime import datetime
+from ..utils.config import SOURCE_STORE_MAX_PER_USER, SOURCE_STORE_MAX_BYTES_PER_USER
+from ..utils.text import tokenize, bm25_term_score
 
-# Simple file-based storage for demonstration
+# SQLite-backed storage. Appends are O(1) and briefs are indexed by user and
+# timestamp; WAL mode and SQLite's file locking keep concurrent workers safe.
 # In production, use a database like PostgreSQL or MongoDB
 
 STORAGE_DIR = os.getenv("STORAGE_DIR", "./storage")
 
+_local = threading.local()
+_migrated_users = set()
+
+
 def ensure_storage_dir():
     """Ensure the storage directory exists."""
     if not os.path.exists(STORAGE_DIR):
         os.makedirs(STORAGE_DIR)
 
+
 def get_user_file_path(user_id: str) -> str:
-    """Get the file path for a user's data."""
+    """Get the path of a user's legacy JSON file."""
     ensure_storage_dir()
     return os.path.join(STORAGE_DIR, f"{user_id}.json")
 
-def load_user_data(user_id: str) -> Dict[str, Any]:
-    """Load user data from file."""
-    file_path = get_user_file_path(user_id)
+
+def get_database_path() -> str:
+    """Get the path of the SQLite database."""
+    return os.path.join(STORAGE_DIR, "research.sqlite3")
+
+
+def get_connection() -> sqlite3.Connection:
+    """Get this thread's connection to the database, creating the schema if needed."""
+    path = get_database_path()
+    connection = getattr(_local, "connection", None)
+    if connection is None or getattr(_local, "path", None) != path:
+        ensure_storage_dir()
+        connection = sqlite3.connect(path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS briefs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                topic TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_briefs_user_timestamp ON briefs (user_id, timestamp);
+            CREATE TABLE IF NOT EXISTS brief_terms (
+                user_id TEXT NOT NULL,
+                brief_id INTEGER NOT NULL,
+                term TEXT NOT NULL,
+                tf INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_brief_terms_user_term ON brief_terms (user_id, term);
+            CREATE TABLE IF NOT EXISTS brief_lengths (
+                brief_id INTEGER PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                length INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_brief_lengths_user ON brief_lengths (user_id);
+            CREATE TABLE IF NOT EXISTS context_summaries (
+                user_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                brief_count INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sources (
+                user_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                title TEXT,
+                content TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                subtopics TEXT NOT NULL,
+                used_at TEXT NOT NULL,
+                size INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, url)
+            );
+            CREATE INDEX IF NOT EXISTS idx_sources_user_used ON sources (user_id, used_at);
+        """)
+        # Databases created before sources were capped by size
+        if "size" not in [row[1] for row in connection.execute("PRAGMA table_info(sources)")]:
+            with connection:
+                connection.execute("ALTER TABLE sources ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+                connection.execute("UPDATE sources SET size = length(CAST(content AS BLOB))")
+        _local.connection = connection
+        _local.path = path
+    return connection
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def get_brief_text(brief: Dict[str, Any]) -> str:
+    """Get the text of a brief used for relevance ranking."""
+    headings = [section.get("heading", "") for section in brief.get("sections", [])]
+    return "\n".join([brief.get("topic", ""), brief.get("summary", ""), *headings])
+
+
+def _insert_brief(connection: sqlite3.Connection, user_id: str, brief: Dict[str, Any]):
+    timestamp = brief.get("timestamp") or datetime.now().isoformat()
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    cursor = connection.execute(
+        "INSERT INTO briefs (user_id, timestamp, topic, data) VALUES (?, ?, ?, ?)",
+        (user_id, timestamp, brief.get("topic"), json.dumps(brief, default=_json_default))
+    )
     
-    if not os.path.exists(file_path):
-        return {"briefs": []}
+    # Maintain the per-user inverted index used by search_briefs
+    terms = Counter(tokenize(get_brief_text(brief)))
+    connection.executemany(
+        "INSERT INTO brief_terms (user_id, brief_id, term, tf) VALUES (?, ?, ?, ?)",
+        [(user_id, cursor.lastrowid, term, tf) for term, tf in terms.items()]
+    )
+    connection.execute(
+        "INSERT INTO brief_lengths (brief_id, user_id, length) VALUES (?, ?, ?)",
+        (cursor.lastrowid, user_id, sum(terms.values()))
+    )
+
+
+def migrate_user_file(user_id: str):
+    """Import a user's legacy JSON file into the database, once.
+
+    The file is renamed to "{user_id}.json.migrated" afterwards. The import
+    runs in an immediate transaction so concurrent workers cannot both
+    migrate the same file.
+    """
+    if user_id in _migrated_users:
+        return
+
+    file_path = get_user_file_path(user_id)
+    if os.path.exists(file_path):
+        connection = get_connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            # Another worker may have finished the migration while we waited
+            if os.path.exists(file_path):
+                with open(file_path, "r") as f:
+                    data = json.load(f)
+                for brief in data.get("briefs", []):
+                    _insert_brief(connection, user_id, brief)
+                connection.commit()
+                os.replace(file_path, f"{file_path}.migrated")
+            else:
+                connection.rollback()
+        except Exception as e:
+            connection.rollback()
+            print(f"Error migrating user data for {user_id}: {str(e)}")
+            return
+
+    _migrated_users.add(user_id)
+
+
+def load_user_data(user_id: str) -> Dict[str, Any]:
+    """Load user data."""
+    return {"briefs": get_previous_interactions(user_id)}
+
+
+def save_user_data(user_id: str, data: Dict[str, Any]):
+    """Replace all stored data for a user."""
+    migrate_user_file(user_id)
+    connection = get_connection()
     
     try:
-        with open(file_path, "r") as f:
-            return json.load(f)
+        with connection:
+            connection.execute("DELETE FROM briefs WHERE user_id = ?", (user_id,))
+            connection.execute("DELETE FROM brief_terms WHERE user_id = ?", (user_id,))
+            connection.execute("DELETE FROM brief_lengths WHERE user_id = ?", (user_id,))
+            for brief in data.get("briefs", []):
+                _insert_brief(connection, user_id, brief)
     except Exception as e:
-        print(f"Error loading user data for {user_id}: {str(e)}")
-        return {"briefs": []}
+        print(f"Error saving user data for {user_id}: {str(e)}")
 
-def save_user_data(user_id: str, data: Dict[str, Any]):
-    """Save user data to file."""
-    file_path = get_user_file_path(user_id)
+
+def get_previous_interactions(user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Get previous interactions for a user, oldest first.
+
+    With a limit, only the latest `limit` briefs are read.
+    """
+    migrate_user_file(user_id)
+    connection = get_connection()
     
     try:
-        with open(file_path, "w") as f:
-            json.dump(data, f, indent=2)
+        rows = connection.execute(
+            "SELECT data FROM briefs WHERE user_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (user_id, -1 if limit is None else limit)
+        ).fetchall()
     except Exception as e:
-        print(f"Error saving user data for {user_id}: {str(e)}")
+        print(f"Error loading user data for {user_id}: {str(e)}")
+        return []
+    
+    return [json.loads(row[0]) for row in reversed(rows)]
 
-def get_previous_interactions(user_id: str) -> List[Dict[str, Any]]:
-    """Get previous interactions for a user."""
-    user_data = load_user_data(user_id)
-    return user_data.get("briefs", [])
 
 def save_brief(user_id: str, brief: Dict[str, Any]):
     """Save a brief to the user's history."""
-    user_data = load_user_data(user_id)
+    migrate_user_file(user_id)
     
     # Add timestamp if not present
-    if "timestamp" not in brief:
+    if not brief.get("timestamp"):
         brief["timestamp"] = datetime.now().isoformat()
     
-    user_data["briefs"].append(brief)
-    save_user_data(user_id, user_data)
\ No newline at end of file
+    try:
+        connection = get_connection()
+        with connection:
+            _insert_brief(connection, user_id, brief)
+    except Exception as e:
+        print(f"Error saving user data for {user_id}: {str(e)}")
+
+
+def search_briefs(user_id: str, query: str, limit: int) -> List[Dict[str, Any]]:
+    """Get a user's briefs most relevant to a query, best first.
+
+    Ranks with BM25 over the per-user term index, so only the postings for
+    the query terms and the top `limit` briefs are read.
+    """
+    migrate_user_file(user_id)
+    query_terms = sorted(set(tokenize(query)))
+    if not query_terms:
+        return []
+    
+    connection = get_connection()
+    try:
+        n_docs, avg_len = connection.execute(
+            "SELECT COUNT(*), AVG(length) FROM brief_lengths WHERE user_id = ?",
+            (user_id,)
+        ).fetchone()
+        if not n_docs:
+            return []
+        
+        placeholders = ", ".join("?" for _ in query_terms)
+        postings = connection.execute(
+            f"""SELECT t.term, t.brief_id, t.tf, l.length
+                FROM brief_terms t JOIN brief_lengths l ON l.brief_id = t.brief_id
+                WHERE t.user_id = ? AND t.term IN ({placeholders})""",
+            (user_id, *query_terms)
+        ).fetchall()
+        
+        df = Counter(term for term, _, _, _ in postings)
+        scores: Dict[int, float] = {}
+        for term, brief_id, tf, length in postings:
+            scores[brief_id] = scores.get(brief_id, 0.0) + bm25_term_score(tf, df[term], n_docs, length, avg_len)
+        
+        best = sorted(scores, key=lambda brief_id: (scores[brief_id], brief_id), reverse=True)[:limit]
+        if not best:
+            return []
+        rows = dict(connection.execute(
+            f"SELECT id, data FROM briefs WHERE id IN ({', '.join('?' for _ in best)})",
+            best
+        ).fetchall())
+    except Exception as e:
+        print(f"Error searching user data for {user_id}: {str(e)}")
+        return []
+    
+    return [json.loads(rows[brief_id]) for brief_id in best if brief_id in rows]
+
+
+def get_context_summary(user_id: str) -> Optional[Dict[str, Any]]:
+    """Get a user's rolling context summary and the number of briefs it covers."""
+    connection = get_connection()
+    row = connection.execute(
+        "SELECT summary, brief_count, updated_at FROM context_summaries WHERE user_id = ?",
+        (user_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {"summary": row[0], "brief_count": row[1], "updated_at": row[2]}
+
+
+def save_context_summary(user_id: str, summary: str, brief_count: int) -> bool:
+    """Store a user's rolling context summary covering brief_count briefs.
+
+    The summary replaces the one covering brief_count - 1 briefs, so an
+    update based on a summary that has since changed is not stored. Returns
+    whether it was stored.
+    """
+    try:
+        connection = get_connection()
+        with connection:
+            if brief_count == 1:
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO context_summaries (user_id, summary, brief_count, updated_at) VALUES (?, ?, ?, ?)",
+                    (user_id, summary, brief_count, datetime.now().isoformat())
+                )
+            else:
+                cursor = connection.execute(
+                    "UPDATE context_summaries SET summary = ?, brief_count = ?, updated_at = ? WHERE user_id = ? AND brief_count = ?",
+                    (summary, brief_count, datetime.now().isoformat(), user_id, brief_count - 1)
+                )
+        return cursor.rowcount > 0
+    except Exception as e:
+        print(f"Error saving context summary for {user_id}: {str(e)}")
+        return False
+
+
+
+def save_sources(user_id: str, sources: List[Dict[str, Any]]):
+    """Store a user's summarized sources, keyed by URL.
+
+    Each source has a url, title, content, summary (a SourceSummary dict) and
+    subtopics. Saving a URL again replaces it and marks it recently used; only
+    the most recently used sources are kept, at most SOURCE_STORE_MAX_PER_USER
+    of them and SOURCE_STORE_MAX_BYTES_PER_USER of content.
+    """
+    if not sources:
+        return
+    used_at = datetime.now().isoformat()
+    try:
+        connection = get_connection()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO sources (user_id, url, title, content, summary, subtopics, used_at, size) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (user_id, source["url"], source.get("title"), source["content"],
+                     json.dumps(source["summary"], default=_json_default), json.dumps(source.get("subtopics", [])), used_at,
+                     len(source["content"].encode("utf-8")))
+                    for source in sources
+                ]
+            )
+            connection.execute(
+                """DELETE FROM sources WHERE user_id = ? AND url IN (
+                       SELECT url FROM (
+                           SELECT url,
+                                  ROW_NUMBER() OVER recent AS position,
+                                  SUM(size) OVER recent AS total_size
+                           FROM sources WHERE user_id = ?
+                           WINDOW recent AS (ORDER BY used_at DESC, rowid DESC ROWS UNBOUNDED PRECEDING)
+                       ) WHERE position > ? OR total_size > ?
+                   )""",
+                (user_id, user_id, SOURCE_STORE_MAX_PER_USER, SOURCE_STORE_MAX_BYTES_PER_USER)
+            )
+    except Exception as e:
+        print(f"Error saving sources for {user_id}: {str(e)}")
+
+
+def _source_from_row(row: tuple, with_content: bool) -> Dict[str, Any]:
+    source = {
+        "url": row[0],
+        "title": row[1],
+        "summary": json.loads(row[2]),
+        "subtopics": json.loads(row[3]),
+        "used_at": row[4]
+    }
+    if with_content:
+        source["content"] = row[5]
+    return source
+
+
+def list_sources(user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Get a user's stored sources without their content, most recently used first."""
+    try:
+        rows = get_connection().execute(
+            "SELECT url, title, summary, subtopics, used_at FROM sources WHERE user_id = ? ORDER BY used_at DESC LIMIT ?",
+            (user_id, -1 if limit is None else limit)
+        ).fetchall()
+    except Exception as e:
+        print(f"Error loading sources for {user_id}: {str(e)}")
+        return []
+    return [_source_from_row(row, with_content=False) for row in rows]
+
+
+def get_sources(user_id: str, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Get a user's stored sources for the given URLs, with their content, by URL."""
+    if not urls:
+        return {}
+    placeholders = ", ".join("?" for _ in urls)
+    try:
+        rows = get_connection().execute(
+            f"SELECT url, title, summary, subtopics, used_at, content FROM sources WHERE user_id = ? AND url IN ({placeholders})",
+            (user_id, *urls)
+        ).fetchall()
+    except Exception as e:
+        print(f"Error loading sources for {user_id}: {str(e)}")
+        return {}
+    return {row[0]: _source_from_row(row, with_content=True) for row in rows}
\ No newline at end of file
@@ -0,0 +1,176 @@
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from .llm_cache import is_cached
+from .metrics import LLM_TOKENS
+from ..utils.config import TOKENIZER_ENCODING, MODEL_CONTEXT_WINDOWS, DEFAULT_CONTEXT_WINDOW
+
+# One shared token counter for every LLM call site. Groq does not publish
+# tokenizers for its models, so counts use a tiktoken encoding as a close
+# proxy (Llama 3 uses a tiktoken-style BPE) and fall back to a character
+# estimate when the encoding cannot be loaded. Provider-reported usage is
+# preferred whenever a response carries it.
+
+# Headroom for the difference between the proxy tokenizer and the model's own
+PROMPT_SAFETY_MARGIN = 0.9
+
+# Blank lines, which separate the sources and sections of a prompt
+_BLOCK_SEPARATOR = re.compile(r"(\n[ \t]*\n\s*)")
+
+_usage_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    """Get the shared tiktoken encoding, or None if it is not available."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        print(f"Tokenizer not available, estimating token counts: {str(e)}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens in text."""
+    encoding = get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def get_context_window(model_name: str) -> int:
+    """Get a model's context window, in tokens."""
+    return MODEL_CONTEXT_WINDOWS.get(model_name, DEFAULT_CONTEXT_WINDOW)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens, keeping its start and end and dropping the middle."""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    marker = "\n...\n"
+    # Prompts end with their instructions and output format, so keep more of the end
+    head_tokens = max(0, max_tokens // 3)
+    tail_tokens = max(1, max_tokens - head_tokens - count_tokens(marker))
+
+    encoding = get_encoding()
+    if encoding is None:
+        head = text[:head_tokens * 4]
+        tail = text[len(text) - tail_tokens * 4:]
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        head = encoding.decode(tokens[:head_tokens])
+        tail = encoding.decode(tokens[len(tokens) - tail_tokens:])
+    return f"{head}{marker}{tail}"
+
+
+def trim_blocks(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens by dropping whole blocks from its middle.
+
+    Blocks are separated by blank lines, so a prompt loses whole sources or
+    sections rather than half of one. The end, where prompts keep their
+    instructions and output format, is kept first and gets up to two thirds
+    of the budget, then the start gets the rest. Text whose first and last
+    blocks alone do not fit is cut in the middle by truncate_tokens.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    parts = _BLOCK_SEPARATOR.split(text)
+    blocks, separators = parts[0::2], parts[1::2]
+    marker = "[...]"
+    budget = max_tokens - count_tokens(marker) - count_tokens(separators[0] if separators else "") * 2
+    costs = [count_tokens(block) + (count_tokens(separators[i - 1]) if i else 0) for i, block in enumerate(blocks)]
+    if len(blocks) < 3 or costs[0] + costs[-1] > budget:
+        return truncate_tokens(text, max_tokens)
+
+    head, tail = 1, len(blocks) - 1
+    used = costs[0] + costs[-1]
+    while tail - 1 > head and used + costs[tail - 1] <= budget * 2 // 3:
+        tail -= 1
+        used += costs[tail]
+    while head < tail and used + costs[head] <= budget:
+        used += costs[head]
+        head += 1
+
+    kept = blocks[:head] + [marker] + blocks[tail:]
+    kept_separators = separators[:head] + separators[tail - 1:]
+    trimmed = kept[0] + "".join(separator + block for separator, block in zip(kept_separators, kept[1:]))
+    # Token counts of joined text can differ slightly from the sum of its parts
+    return trimmed if count_tokens(trimmed) <= max_tokens else truncate_tokens(trimmed, max_tokens)
+
+
+def fit_prompt(prompt: str, model_name: str, max_completion_tokens: int) -> Tuple[str, int]:
+    """Trim a prompt so it and the completion fit in the model's context window.
+
+    Returns the prompt to send and its token count.
+    """
+    budget = int((get_context_window(model_name) - max_completion_tokens) * PROMPT_SAFETY_MARGIN)
+    prompt_tokens = count_tokens(prompt)
+    if prompt_tokens <= budget:
+        return prompt, prompt_tokens
+
+    print(f"Prompt for {model_name} has {prompt_tokens} tokens, trimming to {budget}")
+    prompt = trim_blocks(prompt, budget)
+    return prompt, count_tokens(prompt)
+
+
+def response_usage(response: Any, prompt_tokens: int, content: Any) -> Tuple[int, int]:
+    """Get the prompt and completion tokens of a response, preferring provider-reported usage.
+
+    Responses without usage metadata, or whose content is not text, fall
+    back to counting the prompt and the text they have.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if isinstance(usage, dict) and isinstance(usage.get("input_tokens"), int) and usage["input_tokens"]:
+        output_tokens = usage.get("output_tokens")
+        return usage["input_tokens"], output_tokens if isinstance(output_tokens, int) else 0
+    return prompt_tokens, count_tokens(content) if isinstance(content, str) else 0
+
+
+def record_usage(usage: Optional[Dict[str, Any]], node: str, model_name: str, prompt_tokens: int, completion_tokens: int):
+    """Add one LLM call to a usage record, broken down by node and by model."""
+    LLM_TOKENS.inc(prompt_tokens, model=model_name, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, model=model_name, kind="completion")
+    
+    if usage is None:
+        return
+
+    with _usage_lock:
+        for group, key in (("nodes", node), ("models", model_name)):
+            entry = usage.setdefault(group, {}).setdefault(key, {"calls": 0, "prompt": 0, "completion": 0, "total": 0})
+            entry["calls"] += 1
+            entry["prompt"] += prompt_tokens
+            entry["completion"] += completion_tokens
+            entry["total"] += prompt_tokens + completion_tokens
+
+
+def record_response(usage: Optional[Dict[str, Any]], node: str, model_name: str, response: Any, prompt_tokens: int, content: str):
+    """Add a model response to a usage record.
+
+    Responses served from the LLM cache cost no tokens and are not counted.
+    """
+    if is_cached(response):
+        return
+    record_usage(usage, node, model_name, *response_usage(response, prompt_tokens, content))
+
+
+def merge_usage(usage: Dict[str, Any], other: Optional[Dict[str, Any]]):
+    """Add the calls and tokens of another usage record to usage."""
+    with _usage_lock:
+        for group, entries in (other or {}).items():
+            for key, counts in entries.items():
+                entry = usage.setdefault(group, {}).setdefault(key, {"calls": 0, "prompt": 0, "completion": 0, "total": 0})
+                for field, value in counts.items():
+                    entry[field] = entry.get(field, 0) + value
+
+
+def total_usage(usage: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """Sum a usage record over all nodes."""
+    entries = (usage or {}).get("nodes", {}).values()
+    prompt = sum(entry["prompt"] for entry in entries)
+    completion = sum(entry["completion"] for entry in entries)
+    return {"prompt": prompt, "completion": completion, "total": prompt + completion}
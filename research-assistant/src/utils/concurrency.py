@@ -0,0 +1,26 @@
+import asyncio
+import threading
+from typing import Any, Awaitable
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Get the process-wide event loop used to run async code from sync callers."""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="research-assistant-loop", daemon=True)
+            thread.start()
+    return _loop
+
+
+def run_sync(coro: Awaitable[Any]) -> Any:
+    """Run a coroutine to completion from synchronous code.
+
+    Coroutines are scheduled on a long-lived background loop so that
+    loop-bound resources such as pooled HTTP clients survive between calls.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop()).result()
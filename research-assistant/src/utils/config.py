@@ -0,0 +1,129 @@
+import os
+import json
+
+# API startup
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+# Per-worker limit on concurrently running workflows; 0 disables it
+MAX_INFLIGHT_WORKFLOWS = int(os.getenv("MAX_INFLIGHT_WORKFLOWS", "16"))
+
+# Attach per-node timings to FinalBrief.metadata["timings"]
+REQUEST_TIMINGS_ENABLED = os.getenv("REQUEST_TIMINGS_ENABLED", "false").lower() == "true"
+
+# Background brief jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(os.getenv("STORAGE_DIR", "./storage"), "jobs.sqlite3"))
+# A running job whose lease is not renewed in time (e.g. its worker died) is picked up again
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# ...up to JOB_MAX_ATTEMPTS times; a job that keeps killing its worker is then marked failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+# Finished jobs, and their results, are deleted this long after they finished
+JOB_TTL = int(os.getenv("JOB_TTL", str(24 * 60 * 60)))
+
+# Workflow checkpoints: the state is saved after every node, so a retry with
+# the same run id resumes after the last completed node. Expire after the TTL
+CHECKPOINTS_ENABLED = os.getenv("CHECKPOINTS_ENABLED", "true").lower() == "true"
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", os.path.join(os.getenv("STORAGE_DIR", "./storage"), "checkpoints.sqlite3"))
+CHECKPOINT_TTL = int(os.getenv("CHECKPOINT_TTL", str(24 * 60 * 60)))
+
+# LLM scheduling
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+# Per-model budgets; 0 disables a limit. Override with a JSON object in LLM_RATE_LIMITS.
+LLM_RATE_LIMITS = {
+    "llama3-70b-8192": {"requests_per_minute": 30, "tokens_per_minute": 6000},
+    "mixtral-8x7b-32768": {"requests_per_minute": 30, "tokens_per_minute": 5000},
+    **json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+}
+LLM_DEFAULT_RATE_LIMIT = {"requests_per_minute": 30, "tokens_per_minute": 0}
+
+# Shared HTTP connection pool for LLM clients
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "60"))
+
+# Token accounting: counts use this tiktoken encoding as a proxy for the Groq models
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+MODEL_CONTEXT_WINDOWS = {
+    "llama3-70b-8192": 8192,
+    "mixtral-8x7b-32768": 32768
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# LLM response cache: "readwrite", "replay" (never call the provider) or "off"
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "readwrite").lower()
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.getenv("STORAGE_DIR", "./storage"), "cache", "llm.sqlite3"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Follow-up context
+CONTEXT_TOP_K = int(os.getenv("CONTEXT_TOP_K", "5"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_SUMMARY_MAX_WORDS = int(os.getenv("CONTEXT_SUMMARY_MAX_WORDS", "250"))
+# Times a rolling summary update is redone when another update saved first
+CONTEXT_SUMMARY_UPDATE_ATTEMPTS = int(os.getenv("CONTEXT_SUMMARY_UPDATE_ATTEMPTS", "3"))
+
+# Source reuse: summarized sources are kept per user, and a follow-up reuses
+# stored sources matching at least SOURCE_REUSE_MIN_MATCH of a subtopic's
+# terms. Subtopics with SOURCE_REUSE_PER_SUBTOPIC such sources are not searched
+SOURCE_REUSE_ENABLED = os.getenv("SOURCE_REUSE_ENABLED", "true").lower() == "true"
+SOURCE_REUSE_PER_SUBTOPIC = int(os.getenv("SOURCE_REUSE_PER_SUBTOPIC", "2"))
+SOURCE_REUSE_MIN_MATCH = float(os.getenv("SOURCE_REUSE_MIN_MATCH", "0.5"))
+# The least recently used stored sources are dropped past either cap
+SOURCE_STORE_MAX_PER_USER = int(os.getenv("SOURCE_STORE_MAX_PER_USER", "500"))
+SOURCE_STORE_MAX_BYTES_PER_USER = int(os.getenv("SOURCE_STORE_MAX_BYTES_PER_USER", str(32 * 1024 * 1024)))
+
+# Near-duplicate sources: pages whose shingle sets have an estimated Jaccard
+# similarity at or above the threshold are collapsed into one source
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))
+DEDUP_SIGNATURE_SIZE = int(os.getenv("DEDUP_SIGNATURE_SIZE", "128"))
+
+# Source content extraction: pages are split into chunks and the chunks most
+# relevant to the topic are packed into a per-model prompt budget (in tokens)
+EXTRACTION_CHUNK_TOKENS = int(os.getenv("EXTRACTION_CHUNK_TOKENS", "150"))
+EXTRACTION_TOKEN_BUDGETS = {
+    "mixtral-8x7b-32768": 800,
+    "llama3-70b-8192": 600,
+    **json.loads(os.getenv("EXTRACTION_TOKEN_BUDGETS", "{}"))
+}
+EXTRACTION_DEFAULT_TOKEN_BUDGET = int(os.getenv("EXTRACTION_DEFAULT_TOKEN_BUDGET", "800"))
+
+# Only the sources most relevant to the plan are summarized: depth * this many
+SOURCES_PER_DEPTH = int(os.getenv("SOURCES_PER_DEPTH", "3"))
+
+# Each subtopic of the plan is searched, fetched and summarized in its own
+# parallel branch, with an equal share of the source limit
+SUBTOPIC_BRANCHES_ENABLED = os.getenv("SUBTOPIC_BRANCHES_ENABLED", "true").lower() == "true"
+
+# Hierarchical synthesis: above this many tokens of source summaries, sections
+# are drafted per subtopic in parallel and then combined into the brief
+SYNTHESIS_MAP_REDUCE_THRESHOLD = int(os.getenv("SYNTHESIS_MAP_REDUCE_THRESHOLD", "2500"))
+SYNTHESIS_GROUP_TOKEN_BUDGET = int(os.getenv("SYNTHESIS_GROUP_TOKEN_BUDGET", "1500"))
+
+# Search
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", "4"))
+
+# Content fetching
+FETCH_MAX_CONCURRENCY = int(os.getenv("FETCH_MAX_CONCURRENCY", "10"))
+FETCH_PER_HOST_CONCURRENCY = int(os.getenv("FETCH_PER_HOST_CONCURRENCY", "2"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "10"))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+FETCH_USER_AGENT = os.getenv(
+    "FETCH_USER_AGENT",
+    "Mozilla/5.0 (compatible; ResearchAssistant/1.0; +https://github.com/Anshad-Aziz/research-assistant)"
+)
+FETCH_ALLOWED_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Page content cache
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", os.path.join(os.getenv("STORAGE_DIR", "./storage"), "cache", "pages"))
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", str(24 * 60 * 60)))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Fetched pages of at least BLOB_SPILL_MIN_CHARS are spilled to files while a
+# workflow runs, so the graph state carries a handle instead of the text.
+# Files left by failed runs are swept once they are older than BLOB_TTL.
+# Pages the page cache holds are not written again; their handle refers to it.
+BLOB_STORE_ENABLED = os.getenv("BLOB_STORE_ENABLED", "true").lower() == "true"
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.join(os.getenv("STORAGE_DIR", "./storage"), "blobs"))
+BLOB_SPILL_MIN_CHARS = int(os.getenv("BLOB_SPILL_MIN_CHARS", "2048"))
+BLOB_TTL = int(os.getenv("BLOB_TTL", str(60 * 60)))
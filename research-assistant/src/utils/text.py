@@ -0,0 +1,47 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List
+
+STOPWORDS = {
+    "a", "about", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for",
+    "from", "has", "have", "how", "i", "in", "is", "it", "its", "of", "on", "or",
+    "that", "the", "this", "to", "was", "what", "when", "where", "which", "who",
+    "why", "will", "with", "you", "your"
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens, dropping stopwords."""
+    return [word for word in _WORD_RE.findall(text.lower()) if word not in STOPWORDS and len(word) > 1]
+
+
+def bm25_term_score(tf: int, df: int, n_docs: int, doc_len: int, avg_len: float, k1: float = 1.5, b: float = 0.75) -> float:
+    """Score one query term against one document with Okapi BM25."""
+    idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+    norm = tf + k1 * (1 - b + b * doc_len / (avg_len or 1))
+    return idf * tf * (k1 + 1) / norm
+
+
+class BM25:
+    """In-memory BM25 index over a small set of documents."""
+
+    def __init__(self, documents: List[str]):
+        self.doc_terms = [Counter(tokenize(doc)) for doc in documents]
+        self.doc_lens = [sum(terms.values()) for terms in self.doc_terms]
+        self.avg_len = sum(self.doc_lens) / len(self.doc_lens) if self.doc_lens else 0.0
+        self.df: Dict[str, int] = Counter(term for terms in self.doc_terms for term in terms)
+
+    def scores(self, query: str) -> List[float]:
+        """Score every document against the query, in document order."""
+        query_terms = set(tokenize(query))
+        n_docs = len(self.doc_terms)
+        return [
+            sum(
+                bm25_term_score(terms[term], self.df[term], n_docs, doc_len, self.avg_len)
+                for term in query_terms if term in terms
+            )
+            for terms, doc_len in zip(self.doc_terms, self.doc_lens)
+        ]
@@ -0,0 +1,169 @@
+# tests/unit/fakes.py
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from src.services.context import wait_for_rolling_summary_updates
+
+# Offline stand-ins for the LLM, search and web, small enough to run the
+# whole workflow in a unit test. Responses are derived from the prompt, query
+# or URL, and nothing sleeps: tests control ordering through the hooks below.
+
+SUBTOPICS = ["Subtopic 1", "Subtopic 2", "Subtopic 3"]
+
+_VOCABULARY = (
+    "energy solar wind battery storage grid policy market cost efficiency research climate emissions "
+    "carbon demand supply technology investment data analysis growth capacity panel turbine network "
+    "regulation price consumer industry report evidence study result trend model forecast region"
+).split()
+
+
+def make_text(key: str, words: int) -> str:
+    """Deterministic filler text, different for every key."""
+    rng = random.Random(hashlib.sha256(key.encode("utf-8")).hexdigest())
+    return " ".join(rng.choice(_VOCABULARY) for _ in range(words)) + "."
+
+
+class FakeLLM:
+    """Answers each workflow prompt with valid JSON or text."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompts: List[str] = []
+
+    def asked(self, text: str) -> int:
+        """How many prompts so far contained text."""
+        return sum(1 for prompt in self.prompts if text in prompt)
+
+    def respond(self, prompt: str) -> str:
+        if "Create a detailed research plan" in prompt:
+            return json.dumps({
+                "main_topic": "Test topic",
+                "subtopics": SUBTOPICS,
+                "queries": [
+                    {"query": f"{subtopic} query {j + 1}", "purpose": "Test", "subtopic": subtopic}
+                    for subtopic in SUBTOPICS for j in range(2)
+                ],
+                "expected_depth": 3,
+                "estimated_sources": 6
+            })
+        if "Analyze and summarize the following content from" in prompt:
+            url = re.search(r"content from (\S+)", prompt).group(1)
+            return json.dumps({
+                "source_url": url,
+                "source_title": f"Page {url}",
+                "key_points": [make_text(f"{url}:point", 10)],
+                "evidence": [],
+                "relevance_score": 0.8,
+                "summary": make_text(f"{url}:summary", 30),
+                "content_type": "article"
+            })
+        if "Write one section" in prompt:
+            subtopic = re.search(r"subtopic: (.+)", prompt).group(1).strip()
+            references = [int(index) for index in re.findall(r"Source (\d+):", prompt)]
+            return json.dumps({"heading": subtopic, "content": make_text(subtopic, 40), "references": references})
+        if "research brief" in prompt:
+            references = sorted({int(index) for index in re.findall(r"Source (\d+):", prompt)}) or [1]
+            return json.dumps({
+                "topic": "Test topic",
+                "summary": make_text("brief", 30),
+                "sections": [{"heading": "Findings", "content": make_text("findings", 40), "references": references}],
+                "references": [],
+                "metadata": {},
+                "timestamp": "2024-01-01T00:00:00",
+                "token_usage": {"prompt": 0, "completion": 0, "total": 0}
+            })
+        return make_text(f"text:{len(prompt)}", 30)
+
+    async def ainvoke(self, prompt: str, *args, **kwargs) -> AIMessage:
+        self.calls += 1
+        self.prompts.append(prompt)
+        await asyncio.sleep(0)
+        return AIMessage(content=self.respond(prompt))
+
+    async def astream(self, prompt: str, *args, **kwargs):
+        response = await self.ainvoke(prompt)
+        yield AIMessageChunk(content=response.content)
+
+
+class FakeSearchTool:
+    """Returns two results per query, plus any extra results every query finds."""
+
+    def __init__(self, extra: Optional[List[Dict[str, Any]]] = None):
+        self.calls = 0
+        self.extra = extra or []
+
+    async def ainvoke(self, query: str) -> List[Dict[str, Any]]:
+        self.calls += 1
+        await asyncio.sleep(0)
+        slug = query.replace(" ", "-").lower()
+        results = [
+            {"url": f"https://example.com/{slug}/{i}", "title": f"Result {slug} {i}", "content": "snippet", "score": 1 - i / 10}
+            for i in range(2)
+        ]
+        return results + [dict(result) for result in self.extra]
+
+
+class FakeWeb:
+    """Stands in for fetcher.fetch_pages, serving a distinct page per URL.
+
+    URLs in failing raise, and before_fetch, if set, is awaited with the
+    URLs of each call before its pages are returned.
+    """
+
+    def __init__(self, words: int = 200):
+        self.words = words
+        self.fetched: List[str] = []
+        self.failing = set()
+        self.before_fetch: Optional[Callable[[List[str]], Any]] = None
+
+    def page(self, url: str) -> str:
+        return make_text(url, self.words)
+
+    async def fetch_pages(self, urls: List[str], client=None, store=None) -> List[Any]:
+        if self.before_fetch:
+            await self.before_fetch(urls)
+        pages = []
+        for url in urls:
+            self.fetched.append(url)
+            if url in self.failing:
+                pages.append(ConnectionError(f"Could not reach {url}"))
+            else:
+                text = self.page(url)
+                pages.append(store(text) if store else text)
+        return pages
+
+
+@contextmanager
+def offline_workflow(storage_dir: str, llm: Optional[FakeLLM] = None, search_tool: Optional[FakeSearchTool] = None,
+                     web: Optional[FakeWeb] = None):
+    """Patch the workflow onto the fakes, with storage, checkpoints and blobs in storage_dir."""
+    llm = llm or FakeLLM()
+    search_tool = search_tool or FakeSearchTool()
+    web = web or FakeWeb()
+
+    with ExitStack() as stack:
+        stack.enter_context(patch("src.graph.nodes.get_llm", return_value=llm))
+        stack.enter_context(patch("src.services.context.get_llm", return_value=llm))
+        stack.enter_context(patch("src.services.search.get_search_tool", return_value=search_tool))
+        stack.enter_context(patch("src.graph.nodes.fetch_pages", web.fetch_pages))
+        stack.enter_context(patch("src.services.storage.STORAGE_DIR", storage_dir))
+        stack.enter_context(patch("src.services.checkpoints.CHECKPOINT_DB_PATH", os.path.join(storage_dir, "checkpoints.sqlite3")))
+        stack.enter_context(patch("src.services.blobs.BLOB_STORE_DIR", os.path.join(storage_dir, "blobs")))
+        stack.enter_context(patch("src.services.scheduler._schedulers", {}))
+        stack.enter_context(patch("src.services.scheduler.LLM_RATE_LIMITS", {}))
+        stack.enter_context(patch(
+            "src.services.scheduler.LLM_DEFAULT_RATE_LIMIT",
+            {"requests_per_minute": 0, "tokens_per_minute": 0}
+        ))
+        # Background rolling summary updates must finish while storage is still patched
+        stack.callback(wait_for_rolling_summary_updates)
+        yield llm, search_tool, web
@@ -0,0 +1,139 @@
+# tests/unit/test_api.py
+import threading
+from unittest.mock import Mock
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from src.api.main import app
+
+
+@pytest.fixture(autouse=True)
+def isolated_jobs(tmp_path):
+    """Keep the job workers started with the app off the real queue."""
+    with patch("src.services.jobs.JOBS_DB_PATH", str(tmp_path / "jobs.sqlite3")):
+        yield
+
+
+def test_ready_only_after_warmup():
+    """/ready reports 503 until warmup finishes while /health stays up."""
+    release = threading.Event()
+
+    with patch("src.api.main.warm_up", side_effect=lambda: release.wait(5)):
+        with TestClient(app) as client:
+            assert client.get("/health").status_code == 200
+            assert client.get("/ready").status_code == 503
+
+            release.set()
+            for _ in range(50):
+                if client.get("/ready").status_code == 200:
+                    break
+                threading.Event().wait(0.05)
+
+            assert client.get("/ready").json() == {"status": "ready"}
+
+
+def test_warmup_creates_llm_clients_on_the_server_loop():
+    """Model clients are warmed up on the loop requests run on, not on a worker thread."""
+    import asyncio
+    from src.utils.concurrency import get_background_loop
+
+    loops = []
+
+    def get_llm(task_type):
+        loops.append(asyncio.get_running_loop())
+
+    with patch("src.api.main.warm_up"), patch("src.services.llm.get_llm", side_effect=get_llm):
+        with TestClient(app) as client:
+            for _ in range(50):
+                if client.get("/ready").status_code == 200:
+                    break
+                threading.Event().wait(0.05)
+            server_loop = client.portal.call(asyncio.get_running_loop)
+
+    assert len(loops) == 3
+    assert set(loops) == {server_loop}
+    assert server_loop is not get_background_loop()
+
+
+def test_workflow_is_compiled_once():
+    """The compiled graph is built once and reused for every request."""
+    with patch("src.api.main.warm_up"):
+        with TestClient(app):
+            compiled = app.state.workflow
+
+    from src.graph.workflow import get_research_graph
+    assert get_research_graph() is compiled
+
+
+def test_brief_requests_run_concurrently():
+    """Briefs are awaited on the event loop, so concurrent requests overlap."""
+    import asyncio
+    import httpx
+    from unittest.mock import Mock
+
+    running = []
+    all_started = asyncio.Event()
+
+    async def ainvoke(state):
+        running.append(state["topic"])
+        if len(running) == 3:
+            all_started.set()
+        # Only returns once every request is in the workflow at the same time
+        await asyncio.wait_for(all_started.wait(), 5)
+        return {"final_brief": Mock(dict=lambda: {"topic": state["topic"]})}
+
+    payload = {"depth": 1, "follow_up": False, "user_id": "test_user"}
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/brief", json={**payload, "topic": f"Topic {i}"}) for i in range(3)
+            ))
+
+    with patch("src.api.main.get_research_graph") as mock_graph:
+        mock_graph.return_value.ainvoke = ainvoke
+        responses = asyncio.run(main())
+
+    assert [r.json()["topic"] for r in responses] == ["Topic 0", "Topic 1", "Topic 2"]
+
+
+def test_brief_sheds_load_past_inflight_limit():
+    """Requests beyond the in-flight limit are rejected with 503."""
+    from src.api.main import workflow_limiter
+
+    payload = {"topic": "Topic", "depth": 1, "follow_up": False, "user_id": "test_user"}
+    with patch.object(workflow_limiter, "in_flight", workflow_limiter.limit):
+        response = TestClient(app).post("/brief", json=payload)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+
+def test_stream_brief_emits_progress_events():
+    """The streaming endpoint relays node progress, summaries and tokens as SSE."""
+    from src.models.plan import ResearchPlan
+    from src.services.events import emit
+    from src.cli.main import iter_events
+
+    plan = ResearchPlan(main_topic="Topic", subtopics=["A"], queries=[], expected_depth=1, estimated_sources=1)
+    final_brief = Mock(dict=lambda: {"topic": "Topic"})
+
+    async def astream(state):
+        yield {"planning": {**state, "research_plan": plan}}
+        emit("sources", {"subtopic": "A", "count": 1, "sources": [{"url": "https://example.com", "title": "Example"}]})
+        emit("source_summary", {"index": 0, "total": 1, "subtopic": "A", "summary": {"source_title": "Example"}})
+        yield {"subtopic_research": {"subtopic_branches": [{"subtopic": "A"}]}}
+        emit("token", {"delta": "{"})
+        yield {"post_processing": {**state, "final_brief": final_brief}}
+
+    payload = {"topic": "Topic", "depth": 1, "follow_up": False, "user_id": "test_user"}
+    with patch("src.api.main.get_research_graph") as mock_graph:
+        mock_graph.return_value.astream = astream
+        with TestClient(app).stream("POST", "/brief/stream", json=payload) as response:
+            events = list(iter_events(response.iter_lines()))
+
+    names = [event for event, _ in events]
+    assert names == ["plan", "node", "sources", "source_summary", "node", "token", "node", "brief"]
+    assert events[2][1]["count"] == 1
+    assert events[-1][1] == {"topic": "Topic"}
@@ -0,0 +1,62 @@
+# tests/unit/test_batch.py
+import json
+from unittest.mock import Mock, patch
+from click.testing import CliRunner
+from src.cli.batch import read_topics, run_batch
+
+
+def test_read_topics_accepts_jsonl_and_csv(tmp_path):
+    """Rows from either format get the same fields, with defaults for the missing ones."""
+    jsonl = tmp_path / "topics.jsonl"
+    jsonl.write_text('{"topic": "Solar power", "depth": 2}\n\n{"topic": "Wind power", "id": "wind"}\n')
+    csv_file = tmp_path / "topics.csv"
+    csv_file.write_text("topic,depth,follow_up,user_id\nSolar power,2,,\nWind power,,yes,alice\n")
+
+    from_jsonl = read_topics(str(jsonl), depth=3, user_id="nightly")
+    from_csv = read_topics(str(csv_file), depth=3, user_id="nightly")
+
+    assert from_jsonl[0] == {"topic": "Solar power", "depth": 2, "follow_up": False, "user_id": "nightly", "id": "nightly:2:0:Solar power"}
+    assert from_jsonl[1]["id"] == "wind"
+    assert from_csv[0] == from_jsonl[0]
+    assert from_csv[1] == {"topic": "Wind power", "depth": 3, "follow_up": True, "user_id": "alice", "id": "alice:3:1:Wind power"}
+
+
+def test_run_batch_resumes_after_failures(tmp_path):
+    """A rerun skips topics that succeeded and retries the ones that failed."""
+    output = tmp_path / "briefs.jsonl"
+    items = [{"id": topic, "topic": topic, "depth": 1, "follow_up": False, "user_id": "u"} for topic in ("a", "b", "c")]
+    posted = []
+
+    def flaky(item):
+        posted.append(item["topic"])
+        if item["topic"] == "b":
+            raise RuntimeError("server busy")
+        return {"topic": item["topic"]}
+
+    first = run_batch(items, str(output), flaky, concurrency=3)
+    second = run_batch(items, str(output), lambda item: posted.append(item["topic"]) or {"topic": item["topic"]})
+
+    assert (first["done"], first["failed"]) == (3, 1)
+    assert (second["total"], second["skipped"], second["failed"]) == (1, 2, 0)
+    assert sorted(posted) == ["a", "b", "b", "c"]
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [record["status"] for record in records].count("ok") == 3
+    assert records[-1] == {**records[-1], "id": "b", "status": "ok", "brief": {"topic": "b"}}
+
+
+def test_cli_generates_a_brief_without_a_command():
+    """The pre-subcommand invocation `cli --topic ... --user-id ...` still generates a brief."""
+    from src.cli.main import cli
+
+    brief = {"topic": "Solar power", "summary": "Solar is growing.", "sections": [], "references": []}
+    with patch("requests.post", return_value=Mock(json=Mock(return_value=brief))) as mock_post:
+        old = CliRunner().invoke(cli, ["--topic", "Solar power", "--user-id", "alice", "--depth", "2"])
+        new = CliRunner().invoke(cli, ["generate", "--topic", "Solar power", "--user-id", "alice", "--depth", "2"])
+
+    assert old.exit_code == 0 and new.exit_code == 0
+    assert old.output == new.output
+    assert "Research Brief: Solar power" in old.output
+    assert mock_post.call_args_list[0] == mock_post.call_args_list[1]
+    assert mock_post.call_args.kwargs["json"] == {"topic": "Solar power", "depth": 2, "follow_up": False, "user_id": "alice"}
+    assert CliRunner().invoke(cli, []).exit_code == 2
@@ -0,0 +1,28 @@
+# tests/unit/test_benchmarks.py
+import asyncio
+from benchmarks.fakes import BenchmarkProfile
+from benchmarks.run import compare, percentile, run_benchmark
+
+
+def test_offline_benchmark_produces_comparable_results():
+    """The benchmark runs the whole workflow on fakes and reports every metric group."""
+    profile = BenchmarkProfile(llm_latency=0, search_latency=0, fetch_latency=0, page_words=200)
+
+    results = asyncio.run(run_benchmark(profile, briefs=2, concurrency=2, depth=1))
+
+    assert results["end_to_end"]["count"] == 2
+    assert {"planning", "synthesis", "post_processing"} <= set(results["nodes"])
+    assert results["throughput"]["status_codes"] == {"200": 2}
+    assert results["llm"]["calls_per_brief"] > 2
+    assert results["memory"]["peak_traced_bytes"] > 0
+
+    slower = {**results, "end_to_end": {**results["end_to_end"], "p95": results["end_to_end"]["p95"] * 2}}
+    assert compare(results, results, 0.1) == []
+    assert compare(slower, results, 0.1)[0].startswith("end_to_end.p95")
+
+
+def test_percentile_uses_nearest_rank():
+    """Percentiles pick an observed value rather than interpolating."""
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile([1, 2, 3, 4], 95) == 4
+    assert percentile([], 50) == 0.0
@@ -0,0 +1,55 @@
+# tests/unit/test_blobs.py
+import asyncio
+import os
+from unittest.mock import patch
+from src.services import blobs
+from src.services.memory import text_bytes, track_memory
+
+
+def test_long_pages_are_spilled_and_released(tmp_path):
+    """Long pages are kept on disk behind a handle and only count as held while loaded."""
+    page, snippet = "word " * 1000, "short page"
+
+    with patch("src.services.blobs.BLOB_STORE_DIR", str(tmp_path)), \
+            patch("src.services.blobs.BLOB_SPILL_MIN_CHARS", 100), \
+            track_memory() as tracker:
+        spilled = {"url": "https://example.com/long", "content": "snippet"}
+        blobs.set_content(spilled, blobs.content_fields(page))
+        kept = {"url": "https://example.com/short"}
+        blobs.set_content(kept, snippet)
+
+        assert "content" not in spilled and spilled["content_length"] == len(page)
+        assert kept["content"] == snippet
+        assert blobs.read_content(spilled) == page
+        assert tracker.current == text_bytes(snippet)
+        with blobs.loaded_content(spilled) as text:
+            assert text == page
+            assert tracker.current == text_bytes(snippet) + text_bytes(page)
+
+        blobs.release_content([spilled, kept])
+
+    assert tracker.report() == {"peak_bytes": text_bytes(snippet) + text_bytes(page), "spilled_bytes": text_bytes(page)}
+    assert tracker.current == 0
+    assert not blobs.has_content(spilled) and not blobs.has_content(kept)
+    assert [files for _, _, files in os.walk(tmp_path) if files] == []
+
+
+def test_workflow_state_carries_no_page_content(tmp_path):
+    """A brief spills its pages, releases them after summarization and reports its peak."""
+    from benchmarks.fakes import BenchmarkProfile, offline_services
+    from src.graph.state import ResearchState
+
+    profile = BenchmarkProfile(llm_latency=0, search_latency=0, fetch_latency=0, page_words=1000)
+    state = ResearchState(user_id="test_user", topic="Benchmark topic", depth=1, is_follow_up=False).dict()
+
+    with offline_services(profile, str(tmp_path)):
+        from src.graph.workflow import get_research_graph
+        with track_memory() as tracker:
+            result = asyncio.run(get_research_graph().ainvoke(state))
+
+    memory = result["final_brief"].metadata["memory"]
+    assert memory == tracker.report()
+    assert 0 < memory["peak_bytes"] < memory["spilled_bytes"]
+    assert tracker.current == 0
+    assert result["search_results"] and not any(blobs.has_content(r) for r in result["search_results"])
+    assert [files for _, _, files in os.walk(tmp_path / "blobs") if files] == []
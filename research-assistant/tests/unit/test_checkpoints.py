@@ -0,0 +1,177 @@
+# tests/unit/test_checkpoints.py
+import asyncio
+import os
+import time
+import pytest
+from contextlib import ExitStack
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from src.graph.state import ResearchState
+from src.services import checkpoints
+from src.services.llm_cache import CachedLLM
+from tests.unit.fakes import FakeLLM, FakeWeb, offline_workflow
+
+
+class FailingSynthesisLLM(FakeLLM):
+    """Returns an unparseable brief the first time synthesis is asked for."""
+
+    def respond(self, prompt: str) -> str:
+        if "Synthesize a comprehensive research brief" in prompt and self.asked("Synthesize") == 1:
+            return "not a brief"
+        return super().respond(prompt)
+
+
+def _state(topic: str = "Test topic", run_id: str = "run-1") -> dict:
+    return ResearchState(user_id="test_user", topic=topic, depth=1, is_follow_up=False, run_id=run_id).dict()
+
+
+def test_retry_with_run_id_resumes_after_last_completed_node(tmp_path):
+    """A failed synthesis is retried without searching, fetching or summarizing again."""
+    llm = FailingSynthesisLLM()
+    fingerprint = checkpoints.request_fingerprint("test_user", "Test topic", 1, False)
+
+    with offline_workflow(str(tmp_path), llm) as (_, search_tool, web):
+        from src.graph.workflow import get_research_graph
+        workflow = get_research_graph()
+
+        failed = asyncio.run(workflow.ainvoke(_state()))
+        calls, searches, fetches = llm.calls, search_tool.calls, len(web.fetched)
+        assert "synthesizing" in failed["error"]
+        assert checkpoints.get_completed_nodes("run-1", fingerprint)[-1] == "merge_subtopics"
+
+        resumed = asyncio.run(workflow.ainvoke(_state()))
+
+    assert resumed.get("error") is None
+    assert resumed["final_brief"].metadata["run_id"] == "run-1"
+    assert len(resumed["source_summaries"]) == len(failed["source_summaries"])
+    assert (search_tool.calls, len(web.fetched)) == (searches, fetches)
+    assert llm.calls - calls < calls / 2
+
+
+def _cached_workflow(storage_dir, llm):
+    """offline_workflow with the LLM behind a real response cache."""
+    cached = CachedLLM(llm, "llama3-70b-8192", 0.1)
+    stack = ExitStack()
+    stack.enter_context(offline_workflow(storage_dir, llm))
+    stack.enter_context(patch("src.services.llm_cache.LLM_CACHE_PATH", os.path.join(storage_dir, "llm.sqlite3")))
+    stack.enter_context(patch("src.graph.nodes.get_llm", return_value=cached))
+    stack.enter_context(patch("src.services.context.get_llm", return_value=cached))
+    return stack
+
+
+def test_malformed_reply_is_not_replayed_from_the_llm_cache(tmp_path):
+    """Only replies that parse are cached, so retrying a failed synthesis asks the model again."""
+    llm = FailingSynthesisLLM()
+
+    with _cached_workflow(str(tmp_path), llm):
+        from src.graph.workflow import get_research_graph
+        workflow = get_research_graph()
+
+        failed = asyncio.run(workflow.ainvoke(_state(run_id=None)))
+        retried = asyncio.run(workflow.ainvoke(_state(run_id=None)))
+
+    assert "synthesizing" in failed["error"]
+    assert retried.get("error") is None
+    assert llm.asked("Synthesize a comprehensive research brief") == 2
+    # The plan and summaries parsed, so the retry was served them from the cache
+    assert llm.asked("Create a detailed research plan") == 1
+
+
+def test_resumed_run_skips_cached_replies(tmp_path):
+    """A resumed run asks the model again for the nodes it runs, rather than replaying the attempt that failed."""
+    llm = FailingSynthesisLLM()
+    llm.prompts.append("Synthesize a comprehensive research brief")  # Only answer with valid briefs
+    fingerprint = checkpoints.request_fingerprint("test_user", "Test topic", 1, False)
+
+    with _cached_workflow(str(tmp_path), llm):
+        from src.graph.workflow import get_research_graph
+        workflow = get_research_graph()
+
+        assert asyncio.run(workflow.ainvoke(_state(run_id=None))).get("error") is None
+        checkpoints.save_checkpoint("run-1", fingerprint, ["context_summarization"], ResearchState(**_state()).json())
+        resumed = asyncio.run(workflow.ainvoke(_state()))
+
+    assert resumed.get("error") is None and resumed["resumed"]
+    assert llm.asked("Create a detailed research plan") == 2
+    assert llm.asked("Synthesize a comprehensive research brief") == 3
+
+
+def test_resumed_run_keeps_finished_subtopic_branches(tmp_path):
+    """Branches are checkpointed too: after a worker stops mid-research, only the unfinished branch carries on."""
+    class WorkerStopped(BaseException):
+        pass
+
+    llm = FakeLLM()
+    web = FakeWeb()
+    stopped = []
+    fingerprint = checkpoints.request_fingerprint("test_user", "Test topic", 1, False)
+
+    async def stop_at_subtopic_3(urls):
+        if any("subtopic-3" in url for url in urls) and not stopped:
+            stopped.append(urls)
+            # Stop once the other branches have checkpointed their summaries (or fail instead of hanging)
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline and any("source_summarization" not in checkpoints.get_completed_nodes(f"run-1:branch-{i}", fingerprint) for i in range(2)):
+                await asyncio.sleep(0.01)
+            raise WorkerStopped()
+
+    web.before_fetch = stop_at_subtopic_3
+    with offline_workflow(str(tmp_path), llm, web=web) as (_, search_tool, _):
+        from src.graph.workflow import get_research_graph
+        workflow = get_research_graph()
+
+        with pytest.raises(WorkerStopped):
+            asyncio.run(workflow.ainvoke(_state()))
+        searches, summaries = search_tool.calls, llm.asked("Analyze and summarize")
+        web.fetched.clear()
+        assert checkpoints.get_completed_nodes("run-1:branch-2", fingerprint) == ["search"]
+
+        resumed = asyncio.run(workflow.ainvoke(_state()))
+
+    assert resumed.get("error") is None
+    assert set(resumed["source_subtopics"]) == {"Subtopic 1", "Subtopic 2", "Subtopic 3"}
+    assert search_tool.calls == searches
+    assert web.fetched and all("subtopic-3" in url for url in web.fetched)
+    assert llm.asked("Analyze and summarize") - summaries == resumed["source_subtopics"].count("Subtopic 3")
+
+
+def test_run_id_of_another_request_is_not_resumed(tmp_path):
+    """A run_id reused for a different request neither restores nor overwrites the other request's checkpoint."""
+    llm = FailingSynthesisLLM()
+    fingerprint = checkpoints.request_fingerprint("test_user", "Test topic", 1, False)
+
+    with offline_workflow(str(tmp_path), llm) as (_, search_tool, _):
+        from src.graph.workflow import get_research_graph
+        workflow = get_research_graph()
+
+        asyncio.run(workflow.ainvoke(_state()))
+        completed, searches = checkpoints.get_completed_nodes("run-1", fingerprint), search_tool.calls
+
+        other = asyncio.run(workflow.ainvoke(_state(topic="Another topic")))
+
+        assert other.get("error") is None
+        assert other["topic"] == "Another topic"
+        assert search_tool.calls > searches
+        assert checkpoints.get_completed_nodes("run-1", fingerprint) == completed
+        assert checkpoints.is_run_of_other_request("run-1", checkpoints.request_fingerprint("test_user", "Another topic", 1, False))
+
+        from src.api.main import app
+        response = TestClient(app).post("/brief", json={"user_id": "other_user", "topic": "Test topic", "depth": 1, "follow_up": False, "run_id": "run-1"})
+
+    assert response.status_code == 409
+    assert response.headers["X-Run-Id"] == "run-1"
+
+
+def test_checkpoints_expire_after_ttl(tmp_path):
+    """Expired checkpoints are ignored and deleted by the next write."""
+    with patch("src.services.checkpoints.CHECKPOINT_DB_PATH", str(tmp_path / "checkpoints.sqlite3")):
+        assert checkpoints.save_checkpoint("old", "request", ["planning"], "{}")
+        later = time.time() + checkpoints.CHECKPOINT_TTL + 1
+
+        with patch("src.services.checkpoints.time.time", return_value=later):
+            assert checkpoints.load_checkpoint("old", "request") is None
+            checkpoints.save_checkpoint("new", "request", ["planning"], "{}")
+
+        assert checkpoints.get_completed_nodes("new", "request") == ["planning"]
+        rows = checkpoints._get_connection().execute("SELECT run_id FROM checkpoints").fetchall()
+        assert rows == [("new",)]
@@ -0,0 +1,96 @@
+# tests/unit/test_context.py
+import asyncio
+import threading
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from src.services import storage
+from src.services.context import get_relevant_interactions, aupdate_rolling_summary, get_rolling_summary
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path):
+    """Point storage at a temporary directory."""
+    storage._migrated_users.clear()
+    with patch("src.services.storage.STORAGE_DIR", str(tmp_path)):
+        yield tmp_path
+
+
+def test_relevant_interactions_respect_token_budget():
+    """Relevant briefs are added best first until the token budget is spent."""
+    for i in range(4):
+        storage.save_brief("alice", {"topic": f"Quantum computing {i}", "summary": "qubits " * 200})
+
+    with patch("src.services.context.CONTEXT_TOKEN_BUDGET", 500):
+        relevant = get_relevant_interactions("alice", "quantum computing")
+
+    assert len(relevant) == 1
+
+
+def test_rolling_summary_is_updated_incrementally():
+    """Each update sends only the previous rolling summary and the new brief."""
+    with patch("src.services.context.get_llm") as mock_get_llm:
+        mock_get_llm.return_value.ainvoke = AsyncMock(return_value=Mock(content="Solar and wind research.", usage_metadata=None, response_metadata={}))
+
+        asyncio.run(aupdate_rolling_summary("bob", {"topic": "Solar power", "summary": "Solar is growing."}))
+        mock_get_llm.assert_not_called()
+
+        asyncio.run(aupdate_rolling_summary("bob", {"topic": "Wind power", "summary": "Wind is cheap."}))
+        prompt = mock_get_llm.return_value.ainvoke.call_args[0][0]
+
+    assert "Solar power: Solar is growing." in prompt
+    assert "Wind is cheap." in prompt
+    assert get_rolling_summary("bob") == "Solar and wind research."
+    assert storage.get_context_summary("bob")["brief_count"] == 2
+
+
+def test_concurrent_rolling_summary_updates_keep_every_brief():
+    """An update whose summary changed while the LLM ran is redone on the newer summary."""
+    storage.save_context_summary("carol", "Solar", 1)
+
+    async def ainvoke(prompt):
+        # Let the other update read the same summary before this one saves
+        await asyncio.sleep(0.01)
+        previous = prompt.split("research so far:")[1].split("The user has just")[0].strip()
+        topic = prompt.split("research on:")[1].split("Summary of")[0].strip()
+        return Mock(content=f"{previous}, {topic}", usage_metadata=None, response_metadata={})
+
+    async def main():
+        await asyncio.gather(
+            aupdate_rolling_summary("carol", {"topic": "Wind", "summary": "Wind is cheap."}),
+            aupdate_rolling_summary("carol", {"topic": "Hydro", "summary": "Hydro is steady."})
+        )
+
+    with patch("src.services.context.get_llm") as mock_get_llm:
+        mock_get_llm.return_value.ainvoke = ainvoke
+        asyncio.run(main())
+
+    summary = storage.get_context_summary("carol")
+    assert summary["brief_count"] == 3
+    assert sorted(summary["summary"].split(", ")) == ["Hydro", "Solar", "Wind"]
+
+
+def test_brief_is_returned_before_the_rolling_summary_is_updated(tmp_path):
+    """Post-processing hands the rolling summary update to the background instead of waiting for the LLM."""
+    from src.graph.state import ResearchState
+    from tests.unit.fakes import FakeLLM, offline_workflow
+
+    storage.save_context_summary("test_user", "Earlier research", 1)
+    release = threading.Event()
+
+    class SlowSummaryLLM(FakeLLM):
+        async def ainvoke(self, prompt, *args, **kwargs):
+            if "running summary" in prompt:
+                await asyncio.to_thread(release.wait, 10)
+            return await super().ainvoke(prompt)
+
+    state = ResearchState(user_id="test_user", topic="Test topic", depth=1, is_follow_up=False).dict()
+    with offline_workflow(str(tmp_path), SlowSummaryLLM()):
+        from src.graph.workflow import get_research_graph
+        result = asyncio.run(get_research_graph().ainvoke(state))
+
+        assert result.get("error") is None
+        assert get_rolling_summary("test_user") == "Earlier research"
+        release.set()
+
+    # offline_workflow waits for the update before restoring storage
+    assert storage.get_context_summary("test_user")["brief_count"] == 2
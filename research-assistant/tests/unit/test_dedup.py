@@ -0,0 +1,47 @@
+# tests/unit/test_dedup.py
+from src.services.dedup import SketchIndex, cluster_duplicates, collapse_duplicates, result_signature
+
+ARTICLE = " ".join(f"The city council approved budget item {i} for new solar installations." for i in range(40))
+
+
+def test_near_duplicates_are_clustered():
+    """Syndicated copies with small edits cluster together; unrelated pages do not."""
+    mirror = ARTICLE.replace("item 3 ", "line 3 ") + " Reprinted with permission."
+    other = " ".join(f"Wind turbines in region {i} generated record output this winter." for i in range(40))
+
+    assert cluster_duplicates([ARTICLE, other, mirror]) == [[0, 2], [1]]
+
+
+def test_collapse_keeps_all_urls_on_representative():
+    """The best-scored copy is kept and lists the other URLs, queries and subtopics."""
+    results = [
+        {"url": "https://a.example.com/story", "title": "A", "content": ARTICLE, "score": 0.5, "queries": ["q1"], "subtopics": ["s1"]},
+        {"url": "https://b.example.com/story", "title": "B", "content": ARTICLE, "score": 0.9, "queries": ["q2"], "subtopics": ["s1"]},
+        {"url": "https://c.example.com/", "title": "C"}
+    ]
+
+    unique = collapse_duplicates(results)
+
+    assert [result["url"] for result in unique] == ["https://b.example.com/story", "https://c.example.com/"]
+    assert unique[0]["duplicates"] == [{"url": "https://a.example.com/story", "title": "A"}]
+    assert unique[0]["queries"] == ["q2", "q1"]
+    assert unique[0]["subtopics"] == ["s1"]
+
+
+def test_sketch_index_lists_skipped_pages_on_the_kept_page():
+    """A page skipped as a near-duplicate of another branch's page is listed on that page, with its own duplicates."""
+    index = SketchIndex()
+    kept = {"url": "https://a.example.com/story", "title": "A", "content": ARTICLE, "subtopics": ["s1"]}
+    copy = {
+        "url": "https://b.example.com/story", "title": "B", "content": ARTICLE, "subtopics": ["s2"],
+        "duplicates": [{"url": "https://c.example.com/story", "title": "C"}]
+    }
+
+    assert index.add(result_signature(kept), kept)
+    assert not index.add(result_signature(copy), copy)
+
+    assert kept["duplicates"] == [
+        {"url": "https://b.example.com/story", "title": "B"},
+        {"url": "https://c.example.com/story", "title": "C"}
+    ]
+    assert kept["subtopics"] == ["s1", "s2"]
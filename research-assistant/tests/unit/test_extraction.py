@@ -0,0 +1,41 @@
+# tests/unit/test_extraction.py
+from src.services.extraction import chunk_text, extract_relevant_content, select_chunks, strip_boilerplate
+from src.services.tokens import count_tokens
+
+
+def test_strip_boilerplate_drops_menus_and_banners():
+    """Repeated menu items, link runs and cookie banners are removed; headings and prose stay."""
+    text = "\n".join([
+        "Home", "News", "Sport", "Weather",
+        "We use cookies to improve your experience",
+        "Solar panels",
+        "Photovoltaic cells convert sunlight directly into electricity.",
+        "Home",
+        "Copyright 2024 Example Ltd"
+    ])
+
+    assert strip_boilerplate(text) == "Solar panels\nPhotovoltaic cells convert sunlight directly into electricity."
+
+
+def test_selection_keeps_relevant_chunks_within_budget():
+    """The chunks matching the query are kept in page order, even deep in a long page."""
+    filler = [f"Paragraph {i} talks about the history of the company and its offices." for i in range(40)]
+    relevant = "Battery storage lets solar energy be used at night."
+    text = "\n".join(filler[:30] + [relevant] + filler[30:])
+
+    excerpt = extract_relevant_content(text, "solar battery storage", token_budget=200)
+
+    assert relevant in excerpt
+    assert count_tokens(excerpt) <= 210
+    assert len(excerpt) < len(text)
+
+
+def test_chunks_cover_text_and_respect_size():
+    """Chunking splits long lines by sentence and keeps every sentence."""
+    text = " ".join(f"Sentence number {i} is here." for i in range(50))
+    chunks = chunk_text(text, chunk_tokens=30)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 40 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+    assert select_chunks([], "query", 100) == ""
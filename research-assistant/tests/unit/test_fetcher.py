@@ -0,0 +1,160 @@
+# tests/unit/test_fetcher.py
+import asyncio
+import os
+import httpx
+import pytest
+from unittest.mock import patch
+from src.services import blobs, page_cache
+from src.services.fetcher import fetch_pages, FetchError
+
+PAGES = {
+    "https://a.example.com/": ("text/html", b"<html><body><h1>Alpha</h1><script>x()</script></body></html>"),
+    "https://b.example.com/": ("text/html; charset=utf-8", b"<html><body><p>Beta</p></body></html>"),
+    "https://c.example.com/report.pdf": ("application/pdf", b"%PDF-1.4"),
+}
+
+
+REQUESTS = []
+IN_FLIGHT = {}
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path):
+    """Point the page cache at a temporary directory."""
+    REQUESTS.clear()
+    IN_FLIGHT.update(now=0, peak=0, hosts={}, host_peaks={})
+    with patch("src.services.page_cache.PAGE_CACHE_DIR", str(tmp_path)):
+        yield tmp_path
+
+
+async def _handler(request: httpx.Request) -> httpx.Response:
+    REQUESTS.append(request)
+    host = request.url.host
+    IN_FLIGHT["now"] += 1
+    IN_FLIGHT["peak"] = max(IN_FLIGHT["peak"], IN_FLIGHT["now"])
+    IN_FLIGHT["hosts"][host] = IN_FLIGHT["hosts"].get(host, 0) + 1
+    IN_FLIGHT["host_peaks"][host] = max(IN_FLIGHT["host_peaks"].get(host, 0), IN_FLIGHT["hosts"][host])
+    try:
+        await asyncio.sleep(0.05)
+    finally:
+        IN_FLIGHT["now"] -= 1
+        IN_FLIGHT["hosts"][host] -= 1
+    url = str(request.url)
+    if url not in PAGES:
+        return httpx.Response(404)
+    if request.headers.get("if-none-match") == '"v1"':
+        return httpx.Response(304)
+    content_type, body = PAGES[url]
+    return httpx.Response(200, headers={"content-type": content_type, "etag": '"v1"'}, content=body)
+
+
+def _run(urls):
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(_handler)) as client:
+            return await fetch_pages(urls, client=client)
+    return asyncio.run(main())
+
+
+def test_fetch_pages_runs_concurrently_and_keeps_order():
+    """Pages are downloaded at the same time and returned in input order."""
+    urls = ["https://a.example.com/", "https://b.example.com/"]
+
+    pages = _run(urls)
+
+    assert pages == ["Alpha", "Beta"]
+    assert IN_FLIGHT["peak"] == 2
+
+
+def test_busy_host_does_not_hold_global_slots():
+    """Requests waiting on a busy host leave the global slots to other hosts."""
+    PAGES.update({f"https://a.example.com/{i}": PAGES["https://a.example.com/"] for i in range(4)})
+    urls = [f"https://a.example.com/{i}" for i in range(4)] + ["https://b.example.com/"]
+
+    with patch("src.services.fetcher.FETCH_MAX_CONCURRENCY", 2), \
+            patch("src.services.fetcher.FETCH_PER_HOST_CONCURRENCY", 1):
+        pages = _run(urls)
+
+    assert pages == ["Alpha"] * 4 + ["Beta"]
+    assert IN_FLIGHT["host_peaks"]["a.example.com"] == 1
+    # Beta was downloaded alongside the first a.example.com page, not after all of them
+    assert [str(request.url) for request in REQUESTS].index("https://b.example.com/") == 1
+
+
+def test_fetch_pages_records_failures_per_url():
+    """Non-HTML content and HTTP errors are returned as exceptions in place."""
+    pages = _run([
+        "https://c.example.com/report.pdf",
+        "https://a.example.com/",
+        "https://missing.example.com/",
+    ])
+
+    assert isinstance(pages[0], FetchError)
+    assert pages[1] == "Alpha"
+    assert isinstance(pages[2], httpx.HTTPStatusError)
+
+
+def test_fetch_pages_stops_at_byte_cap():
+    """Downloads are truncated once the byte cap is reached."""
+    PAGES["https://big.example.com/"] = ("text/html", b"<p>" + b"x" * 10000 + b"</p>")
+
+    with patch("src.services.fetcher.FETCH_MAX_BYTES", 100):
+        pages = _run(["https://big.example.com/"])
+
+    assert len(pages[0]) <= 100
+
+
+def test_fetch_pages_serves_repeat_urls_from_cache():
+    """A repeat URL is read from disk instead of the network."""
+    before = page_cache.get_cache_stats()
+
+    assert _run(["https://a.example.com/"]) == ["Alpha"]
+    assert _run(["https://a.example.com/?utm_source=feed"]) == ["Alpha"]
+
+    after = page_cache.get_cache_stats()
+    assert len(REQUESTS) == 1
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 1
+
+
+def test_fetch_pages_revalidates_stale_entries():
+    """Stale entries are revalidated with their ETag and reused on 304."""
+    _run(["https://b.example.com/"])
+
+    with patch("src.services.page_cache.PAGE_CACHE_TTL", 0):
+        assert _run(["https://b.example.com/"]) == ["Beta"]
+
+    assert REQUESTS[1].headers["if-none-match"] == '"v1"'
+
+
+def test_spilled_pages_refer_to_the_page_cache(tmp_path):
+    """A page the page cache holds is spilled as a handle to its entry rather than written twice."""
+    PAGES["https://long.example.com/"] = ("text/html", b"<p>" + b"word " * 100 + b"</p>")
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(_handler)) as client:
+            return await fetch_pages(["https://long.example.com/"], client=client, store=blobs.content_fields)
+
+    with patch("src.services.blobs.BLOB_STORE_DIR", str(tmp_path / "blobs")), \
+            patch("src.services.blobs.BLOB_SPILL_MIN_CHARS", 100):
+        [cached] = asyncio.run(main())
+        with patch("src.services.fetcher.PAGE_CACHE_ENABLED", False):
+            [uncached] = asyncio.run(main())
+
+        assert blobs.read_content(cached) == blobs.read_content(uncached) == page_cache.get_entry("https://long.example.com/")["text"]
+        assert [files for _, _, files in os.walk(tmp_path / "blobs") if files] == [[f"{uncached['content_blob']}.txt"]]
+        blobs.release_content([cached, uncached])
+
+    assert page_cache.get_entry("https://long.example.com/") is not None
+
+
+def test_page_cache_evicts_least_recently_used(isolated_cache):
+    """Entries beyond the size cap are evicted oldest first."""
+    with patch("src.services.page_cache._total_bytes", None), \
+            patch("src.services.page_cache.PAGE_CACHE_MAX_BYTES", 800):
+        page_cache.put_entry("https://one.example.com/", "x" * 200)
+        page_cache.put_entry("https://two.example.com/", "y" * 200)
+        page_cache.get_entry("https://one.example.com/")
+        page_cache.put_entry("https://three.example.com/", "z" * 200)
+
+        assert page_cache.get_entry("https://one.example.com/") is not None
+        assert page_cache.get_entry("https://two.example.com/") is None
@@ -0,0 +1,23 @@
+# tests/unit/test_imports.py
+import pytest
+from benchmarks.import_time import parse_importtime, profile_import
+
+
+@pytest.mark.parametrize("module", ["src.cli.main", "src.api.main"])
+def test_entry_points_leave_langchain_for_first_use(module):
+    """Importing the CLI or the API app doesn't load langchain, langgraph or (for the CLI) requests."""
+    profile = profile_import(module, runs=1)
+
+    assert profile["lazy_violations"] == []
+    assert profile["import_ms"] > 0
+
+
+def test_parse_importtime_reads_self_and_cumulative_times():
+    """The -X importtime header is skipped and nested modules keep their names."""
+    output = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |   json.decoder",
+        "import time:       300 |        420 | json"
+    ])
+
+    assert parse_importtime(output) == [("json.decoder", 120, 120), ("json", 300, 420)]
@@ -0,0 +1,119 @@
+# tests/unit/test_jobs.py
+import asyncio
+import sqlite3
+import time
+import pytest
+from unittest.mock import Mock, patch
+from fastapi.testclient import TestClient
+from src.api.main import app
+from src.services import jobs
+
+
+@pytest.fixture(autouse=True)
+def isolated_jobs(tmp_path):
+    """Point the job queue and the checkpoints its runs look up at temporary databases."""
+    with patch("src.services.jobs.JOBS_DB_PATH", str(tmp_path / "jobs.sqlite3")), \
+            patch("src.services.checkpoints.CHECKPOINT_DB_PATH", str(tmp_path / "checkpoints.sqlite3")):
+        yield
+
+
+def test_identical_jobs_are_coalesced():
+    """Double-submitting the same brief runs the workflow once and both callers get the result."""
+    calls = []
+
+    async def ainvoke(state):
+        calls.append(state["topic"])
+        await asyncio.sleep(0.2)
+        return {"final_brief": Mock(dict=lambda: {"topic": state["topic"]})}
+
+    payload = {"topic": "Topic", "depth": 1, "follow_up": False, "user_id": "test_user"}
+    with patch("src.api.main.warm_up"), patch("src.api.main.get_research_graph") as mock_graph:
+        mock_graph.return_value.ainvoke = ainvoke
+        with TestClient(app) as client:
+            first = client.post("/jobs", json=payload)
+            second = client.post("/jobs", json=payload)
+            other = client.post("/jobs", json={**payload, "depth": 2})
+
+            assert first.status_code == 202
+            assert first.json()["created"] and not second.json()["created"]
+            assert second.json()["job_id"] == first.json()["job_id"]
+            assert other.json()["job_id"] != first.json()["job_id"]
+
+            job_id = first.json()["job_id"]
+            for _ in range(100):
+                job = client.get(f"/jobs/{job_id}").json()
+                if job["status"] == jobs.SUCCEEDED:
+                    break
+                time.sleep(0.05)
+
+            assert job["result"] == {"topic": "Topic"}
+            assert client.get("/jobs/missing").status_code == 404
+
+    assert calls == ["Topic", "Topic"]
+
+
+def test_job_with_expired_lease_is_claimed_again():
+    """A running job whose worker died is picked up once its lease runs out."""
+    job_id, _ = jobs.submit_job({"topic": "Topic", "depth": 1, "follow_up": False, "user_id": "test_user"})
+    assert jobs.claim_next_job()[0] == job_id
+    assert jobs.claim_next_job() is None
+
+    with patch("src.services.jobs.time.time", return_value=time.time() + jobs.JOB_LEASE_SECONDS + 1):
+        claimed = jobs.claim_next_job()
+
+    assert claimed == (job_id, {"topic": "Topic", "depth": 1, "follow_up": False, "user_id": "test_user", "run_id": job_id})
+    assert jobs.get_job(job_id)["status"] == jobs.RUNNING
+
+
+
+def test_job_is_failed_after_max_attempts():
+    """A job whose worker keeps dying is failed once its attempts run out, and the next job is claimed."""
+    job_id, _ = jobs.submit_job({"topic": "Poison", "depth": 1, "follow_up": False, "user_id": "test_user"})
+    expired = time.time() + jobs.JOB_LEASE_SECONDS + 1
+
+    with patch("src.services.jobs.JOB_MAX_ATTEMPTS", 2):
+        assert jobs.claim_next_job()[0] == job_id
+        with patch("src.services.jobs.time.time", return_value=expired):
+            assert jobs.claim_next_job()[0] == job_id
+        next_id, _ = jobs.submit_job({"topic": "Next", "depth": 1, "follow_up": False, "user_id": "test_user"})
+        with patch("src.services.jobs.time.time", return_value=expired + jobs.JOB_LEASE_SECONDS + 1):
+            assert jobs.claim_next_job()[0] == next_id
+
+    job = jobs.get_job(job_id)
+    assert job["status"] == jobs.FAILED
+    assert "2 attempts" in job["error"]
+
+
+def test_job_is_stopped_when_its_lease_cannot_be_renewed():
+    """A worker that cannot renew its lease stops the job instead of running it alongside the next claimant."""
+    job_id, _ = jobs.submit_job({"topic": "Topic", "depth": 1, "follow_up": False, "user_id": "test_user"})
+    jobs.claim_next_job()
+    cancelled = []
+
+    async def runner(request):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(request)
+            raise
+
+    with patch("src.services.jobs.JOB_LEASE_SECONDS", 0.3), \
+            patch("src.services.jobs.renew_lease", side_effect=sqlite3.OperationalError("database is locked")):
+        asyncio.run(asyncio.wait_for(jobs.JobWorkerPool(runner, 1)._run(job_id, {"topic": "Topic"}), 5))
+
+    assert cancelled == [{"topic": "Topic"}]
+    # Left running, for another worker to claim once the lease runs out
+    assert jobs.get_job(job_id)["status"] == jobs.RUNNING
+
+
+def test_finished_jobs_are_deleted_after_ttl():
+    """Finished jobs and their results are deleted JOB_TTL after they finished; queued ones are kept."""
+    done_id, _ = jobs.submit_job({"topic": "Done", "depth": 1, "follow_up": False, "user_id": "test_user"})
+    queued_id, _ = jobs.submit_job({"topic": "Queued", "depth": 1, "follow_up": False, "user_id": "test_user"})
+    jobs.complete_job(done_id, {"topic": "Done"})
+
+    with patch("src.services.jobs.time.time", return_value=time.time() + jobs.JOB_TTL + 1):
+        jobs.submit_job({"topic": "New", "depth": 1, "follow_up": False, "user_id": "test_user"})
+
+    assert jobs.get_job(done_id) is None
+    assert jobs.get_job(queued_id)["status"] == jobs.QUEUED
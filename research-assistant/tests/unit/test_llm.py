@@ -0,0 +1,86 @@
+# tests/unit/test_llm.py
+import asyncio
+import pytest
+import threading
+from unittest.mock import patch
+from src.services.llm import get_llm, reset_llm_registry
+from src.utils.config import LLM_HTTP_TIMEOUT
+
+
+@pytest.fixture(autouse=True)
+def groq_key(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_test")
+    monkeypatch.setenv("LANGCHAIN_DEBUG", "false")
+
+
+def test_get_llm_reuses_clients_per_task_type():
+    """Repeated calls share one configured client and one HTTP pool."""
+    planning = get_llm("planning")
+
+    assert get_llm("planning") is planning
+    assert get_llm("synthesis") is not planning
+    assert get_llm("synthesis").llm.http_client is planning.llm.http_client
+
+
+def test_get_llm_resets_when_settings_change(monkeypatch):
+    """Changing LANGCHAIN_DEBUG or the API key rebuilds the clients."""
+    before = get_llm("summarization")
+
+    monkeypatch.setenv("LANGCHAIN_DEBUG", "true")
+    with patch("src.services.llm.set_debug") as mock_set_debug:
+        after = get_llm("summarization")
+
+    assert after is not before
+    mock_set_debug.assert_called_once_with(True)
+
+
+def test_get_llm_keeps_async_clients_per_event_loop():
+    """Async callers on another event loop get clients bound to that loop."""
+    sync_llm = get_llm("planning")
+
+    async def main():
+        return get_llm("planning"), get_llm("planning")
+
+    first, second = asyncio.run(main())
+
+    assert first is second
+    assert first is not sync_llm
+    assert first.llm.http_async_client is not sync_llm.llm.http_async_client
+
+
+
+def test_reset_closes_old_pools_after_calls_finish():
+    """Old HTTP pools stay open for calls in flight, then each async pool is closed on its own loop."""
+    from src.utils.concurrency import get_background_loop
+
+    closed = []
+    timers = []
+    done = threading.Event()
+
+    class Timer:
+        def __init__(self, delay, function):
+            timers.append((delay, function))
+
+        def start(self):
+            pass
+
+    old = get_llm("planning")
+    async_client, sync_client = old.llm.http_async_client, old.llm.http_client
+
+    async def aclose():
+        closed.append(("async", asyncio.get_running_loop()))
+        done.set()
+
+    with patch("src.services.llm.threading.Timer", Timer), \
+            patch.object(async_client, "aclose", aclose), \
+            patch.object(sync_client, "close", lambda: closed.append(("sync", None))):
+        reset_llm_registry()
+        assert get_llm("planning") is not old
+        assert closed == []
+
+        delay, close = timers[0]
+        close()
+        assert done.wait(5)
+
+    assert delay == LLM_HTTP_TIMEOUT
+    assert closed == [("sync", None), ("async", get_background_loop())]
@@ -0,0 +1,107 @@
+# tests/unit/test_llm_cache.py
+import asyncio
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+from src.services.llm import get_llm
+from src.services.llm_cache import CachedLLM, LLMCacheMiss, commit_response, fresh_replies, get_response, make_key, put_response
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path):
+    """Point the LLM response cache at a temporary database."""
+    with patch("src.services.llm_cache.LLM_CACHE_PATH", str(tmp_path / "llm.sqlite3")):
+        yield
+
+
+def test_cached_llm_serves_repeat_prompts():
+    """A repeated prompt is answered from the cache once its reply has been committed."""
+    inner = Mock()
+    inner.invoke.return_value = Mock(content="plan", response_metadata={})
+    inner.ainvoke = AsyncMock(return_value=Mock(content="summary", response_metadata={}))
+    llm = CachedLLM(inner, "mixtral-8x7b-32768", 0.2)
+
+    commit_response(llm, "Create a plan", llm.invoke("Create a plan"))
+    assert llm.invoke("Create a plan").content == "plan"
+    commit_response(llm, "Summarize", asyncio.run(llm.ainvoke("Summarize")))
+    assert asyncio.run(llm.ainvoke("Summarize")).content == "summary"
+
+    assert inner.invoke.call_count == 1
+    assert inner.ainvoke.await_count == 1
+
+
+def test_uncommitted_replies_are_not_cached():
+    """A reply the caller never committed, for instance because it did not parse, is asked for again."""
+    inner = Mock()
+    inner.invoke.return_value = Mock(content="not json", response_metadata={})
+    llm = CachedLLM(inner, "mixtral-8x7b-32768", 0.2)
+
+    llm.invoke("Create a plan")
+    llm.invoke("Create a plan")
+    commit_response(llm, "Create a plan", llm.invoke("Create a plan"))
+    with fresh_replies():
+        llm.invoke("Create a plan")
+
+    assert inner.invoke.call_count == 4
+    assert llm.invoke("Create a plan").content == "not json"
+
+
+def test_cache_key_includes_model_and_temperature():
+    """The same prompt at a different model or temperature is a separate entry."""
+    put_response(make_key("llama3-70b-8192", 0.1, "prompt"), "llama3-70b-8192", "cached")
+
+    assert get_response(make_key("llama3-70b-8192", 0.1, "prompt")) == "cached"
+    assert get_response(make_key("llama3-70b-8192", 0.2, "prompt")) is None
+    assert get_response(make_key("mixtral-8x7b-32768", 0.1, "prompt")) is None
+
+
+def test_replay_mode_runs_offline(monkeypatch):
+    """Replay mode needs no API key and fails loudly on unrecorded prompts."""
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    put_response(make_key("llama3-70b-8192", 0.1, "recorded"), "llama3-70b-8192", "replayed")
+
+    with patch("src.services.llm.LLM_CACHE_MODE", "replay"), \
+            patch("src.services.llm_cache.LLM_CACHE_MODE", "replay"):
+        llm = get_llm("planning")
+
+        assert llm.invoke("recorded").content == "replayed"
+        with pytest.raises(LLMCacheMiss):
+            llm.invoke("never recorded")
+
+
+def test_eviction_keeps_cache_under_size_cap():
+    """Least recently used responses are evicted past the size cap."""
+    with patch("src.services.llm_cache.LLM_CACHE_MAX_BYTES", 250):
+        for i in range(3):
+            put_response(make_key("m", 0.0, str(i)), "m", "x" * 100)
+
+    assert get_response(make_key("m", 0.0, "0")) is None
+    assert get_response(make_key("m", 0.0, "2")) == "x" * 100
+
+
+def test_cache_hits_are_not_metered_or_counted(monkeypatch):
+    """Only calls that reach the model are recorded as LLM latency and token usage."""
+    from langchain_core.messages import AIMessage
+    from src.services.llm import ainvoke_counted, invoke_counted
+    from src.services.metrics import LLM_DURATION, LLM_TOKENS
+
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_test")
+    model = Mock(return_value=Mock(
+        invoke=Mock(return_value=AIMessage(content="summary", usage_metadata={"input_tokens": 10, "output_tokens": 2, "total_tokens": 12})),
+        ainvoke=AsyncMock(return_value=AIMessage(content="summary"))
+    ))
+    usage = {}
+
+    with patch("langchain_groq.ChatGroq", model), patch("src.services.llm._registry", {}):
+        llm = get_llm("summarization")
+        calls = LLM_DURATION.count(model="mixtral-8x7b-32768")
+        tokens = LLM_TOKENS.value(model="mixtral-8x7b-32768", kind="prompt")
+
+        invoke_counted(llm, "summarization", "Summarize", usage, "source_summarization")
+        invoke_counted(llm, "summarization", "Summarize", usage, "source_summarization")
+        assert asyncio.run(ainvoke_counted(llm, "summarization", "Summarize", usage, "source_summarization")) == "summary"
+
+    assert model.return_value.invoke.call_count == 1
+    assert model.return_value.ainvoke.await_count == 0
+    assert LLM_DURATION.count(model="mixtral-8x7b-32768") - calls == 1
+    assert LLM_TOKENS.value(model="mixtral-8x7b-32768", kind="prompt") - tokens == 10
+    assert usage["nodes"]["source_summarization"] == {"calls": 1, "prompt": 10, "completion": 2, "total": 12}
@@ -0,0 +1,71 @@
+# tests/unit/test_metrics.py
+import asyncio
+from unittest.mock import Mock, patch
+from fastapi.testclient import TestClient
+from src.api.main import app
+from src.graph.workflow import _instrumented
+from src.services.metrics import Counter, Histogram, NODE_DURATION, NODE_ERRORS
+
+
+def test_metrics_render_in_prometheus_format():
+    """Histograms expose cumulative buckets, sum and count; counters their labelled values."""
+    histogram = Histogram("test_duration_seconds", "Test latency.", ["node"], buckets=(0.1, 1))
+    histogram.observe(0.05, node="a")
+    histogram.observe(0.5, node="a")
+    counter = Counter("test_errors_total", "Test errors.", ["node"])
+    counter.inc(node='say "hi"')
+
+    lines = histogram.render() + counter.render()
+
+    assert 'test_duration_seconds_bucket{node="a",le="0.1"} 1' in lines
+    assert 'test_duration_seconds_bucket{node="a",le="+Inf"} 2' in lines
+    assert 'test_duration_seconds_count{node="a"} 2' in lines
+    assert 'test_errors_total{node="say \\"hi\\""} 1' in lines
+    assert "# TYPE test_duration_seconds histogram" in lines
+
+
+def test_nodes_record_latency_errors_and_timings():
+    """Instrumented nodes are timed, count reported errors and attach per-request timings."""
+    brief = Mock(metadata={})
+
+    async def failing(state):
+        return {**state, "error": "boom"}
+
+    async def finishing(state):
+        return {**state, "final_brief": brief}
+
+    errors_before = NODE_ERRORS.value(node="test_failing")
+    with patch("src.graph.workflow.REQUEST_TIMINGS_ENABLED", True):
+        state = asyncio.run(_instrumented("test_failing", Mock(), failing).ainvoke({}))
+        state = asyncio.run(_instrumented("test_finishing", Mock(), finishing).ainvoke(state))
+
+    assert NODE_ERRORS.value(node="test_failing") == errors_before + 1
+    assert NODE_DURATION.count(node="test_finishing") >= 1
+    assert set(brief.metadata["timings"]) == {"test_failing", "test_finishing"}
+
+
+def test_metrics_endpoint_exposes_registry():
+    """/metrics serves the registry, including cache hit ratios."""
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE research_node_duration_seconds histogram" in response.text
+    assert 'research_cache_hit_ratio{cache="page"}' in response.text
+    assert "# TYPE research_cache_lookups_total counter" in response.text
+
+
+def test_cache_lookups_are_counted_as_they_happen(tmp_path):
+    """Cache hits and misses increment a counter, so rate() works across restarts."""
+    from src.services import llm_cache
+    from src.services.metrics import CACHE_LOOKUPS
+
+    hits, misses = CACHE_LOOKUPS.value(cache="llm", result="hit"), CACHE_LOOKUPS.value(cache="llm", result="miss")
+    with patch("src.services.llm_cache.LLM_CACHE_PATH", str(tmp_path / "llm.sqlite3")):
+        llm_cache.get_response("missing")
+        llm_cache.put_response("present", "m", "reply")
+        llm_cache.get_response("present")
+        llm_cache.get_response("present")
+
+    assert CACHE_LOOKUPS.value(cache="llm", result="hit") - hits == 2
+    assert CACHE_LOOKUPS.value(cache="llm", result="miss") - misses == 1
@@ -1,6 +1,6 @@
 # tests/unit/test_nodes.py
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, AsyncMock, patch
 from src.graph.nodes import summarize_context, create_research_plan, execute_search
 from src.graph.state import ResearchState
 
@@ -18,11 +18,101 @@ def test_create_research_plan():
         mock_llm = Mock()
         mock_response = Mock()
         mock_response.content = '{"main_topic": "Climate Change", "subtopics": ["Causes", "Effects"], "queries": [{"query": "What causes climate change?", "purpose": "Understand causes", "subtopic": "Causes"}], "expected_depth": 3, "estimated_sources": 5}'
-        mock_llm.invoke.return_value = mock_response
+        mock_llm.ainvoke = AsyncMock(return_value=mock_response)
         mock_get_llm.return_value = mock_llm
         
         result = create_research_plan(state)
         
-        assert "research_plan" in result
-        assert result["research_plan"]["main_topic"] == "Climate Change"
-        mock_get_llm.assert_called_once_with("planning")
\ No newline at end of file
+        assert result.get("error") is None
+        assert result["research_plan"].main_topic == "Climate Change"
+        assert result["research_plan"].queries[0].subtopic == "Causes"
+        mock_get_llm.assert_called_once_with("planning")
+
+def test_large_source_sets_are_synthesized_per_subtopic():
+    """Above the threshold, sections are drafted per subtopic and references keep their global indices."""
+    from src.graph.nodes import synthesize_brief
+    from src.models.plan import ResearchPlan
+    from src.models.summary import SourceSummary
+
+    summaries = [
+        SourceSummary(source_url=f"https://example.com/{i}", source_title=f"Source {i}", key_points=["Point"],
+                      evidence=[], relevance_score=0.8, summary="Summary", content_type="article")
+        for i in range(3)
+    ]
+    state = {
+        "topic": "Energy",
+        "research_plan": ResearchPlan(main_topic="Energy", subtopics=["Solar", "Wind"], queries=[], expected_depth=2, estimated_sources=3),
+        "source_summaries": summaries,
+        "source_subtopics": ["Wind", "Solar", "Wind"]
+    }
+    prompts = []
+
+    async def ainvoke(prompt):
+        prompts.append(prompt)
+        if "Write one section" in prompt:
+            refs = [2] if "subtopic: Solar" in prompt else [1, 3]
+            return Mock(content=f'{{"heading": "Draft", "content": "Text", "references": {refs}}}')
+        return Mock(content='{"topic": "Energy", "summary": "Overall", "sections": [{"heading": "Solar", "content": "Text", "references": [2, 7]}], "references": [], "metadata": {}, "timestamp": "2024-01-01T00:00:00", "token_usage": {"prompt": 0, "completion": 0, "total": 0}}')
+
+    with patch('src.graph.nodes.get_llm') as mock_get_llm, \
+            patch('src.graph.nodes.SYNTHESIS_MAP_REDUCE_THRESHOLD', 10):
+        mock_get_llm.return_value.ainvoke = ainvoke
+        result = synthesize_brief(state)
+
+    brief = result["final_brief"]
+    section_prompts = [prompt for prompt in prompts if "Write one section" in prompt]
+    assert len(section_prompts) == 2
+    assert "subtopic: Solar" in section_prompts[0] and "Source 2: Source 1" in section_prompts[0]
+    assert [reference.url for reference in brief.references] == [summary.source_url for summary in summaries]
+    assert brief.sections[0].references == [2]
+    assert result["token_usage"]["nodes"]["synthesis"]["calls"] == 3
+
+
+def test_follow_up_reuses_stored_sources(tmp_path):
+    """Covered subtopics are not searched again, and stored sources skip fetching and summarization."""
+    from src.graph.nodes import fetch_content, summarize_sources
+    from src.models.plan import ResearchPlan, ResearchQuery
+    from src.services import storage
+    from src.services.blobs import content_fields
+
+    plan = ResearchPlan(
+        main_topic="Solar power",
+        subtopics=["Battery storage", "Policy"],
+        queries=[
+            ResearchQuery(query="solar battery storage", purpose="Storage", subtopic="Battery storage"),
+            ResearchQuery(query="solar subsidies", purpose="Policy", subtopic="Policy")
+        ],
+        expected_depth=1,
+        estimated_sources=2
+    )
+    summary = {"source_url": "", "source_title": "", "key_points": ["Batteries store solar power"], "evidence": [],
+               "relevance_score": 0.9, "summary": "Solar battery storage costs fell.", "content_type": "article"}
+    state = {"user_id": "test_user", "topic": "Solar power", "depth": 1, "is_follow_up": True, "research_plan": plan}
+
+    with patch("src.services.storage.STORAGE_DIR", str(tmp_path)), \
+            patch("src.graph.nodes.run_searches", new_callable=AsyncMock) as mock_search, \
+            patch("src.graph.nodes.fetch_pages", new_callable=AsyncMock) as mock_fetch, \
+            patch("src.graph.nodes.get_llm") as mock_get_llm:
+        storage.save_sources("test_user", [
+            {"url": f"https://example.com/{i}", "title": f"Battery storage {i}", "content": "Stored page",
+             "summary": {**summary, "source_url": f"https://example.com/{i}"}, "subtopics": ["Battery storage"]}
+            for i in range(2)
+        ])
+        mock_search.return_value = [
+            {"url": "https://example.com/1", "title": "Battery storage 1", "content": "snippet", "score": 0.8,
+             "queries": ["solar subsidies"], "subtopics": ["Policy"]},
+            {"url": "https://example.com/new", "title": "Subsidies", "content": "snippet", "score": 0.7,
+             "queries": ["solar subsidies"], "subtopics": ["Policy"]}
+        ]
+        mock_fetch.return_value = ["New page about solar subsidies"]
+        mock_get_llm.return_value.ainvoke = AsyncMock(return_value=Mock(content='{"source_url": "https://example.com/new", "source_title": "Subsidies", "key_points": [], "evidence": [], "relevance_score": 0.5, "summary": "Subsidies.", "content_type": "article"}'))
+
+        result = summarize_sources(fetch_content(execute_search(state)))
+
+    assert [query.query for query in mock_search.call_args.args[0]] == ["solar subsidies"]
+    mock_fetch.assert_called_once_with(["https://example.com/new"], store=content_fields)
+    assert mock_get_llm.return_value.ainvoke.call_count == 1
+    assert sorted(s.source_url for s in result["source_summaries"]) == [
+        "https://example.com/0", "https://example.com/1", "https://example.com/new"
+    ]
+    assert result["source_reuse"] == {"sources_reused": 2, "queries_skipped": 1, "fetches_skipped": 2, "llm_calls_saved": 2}
@@ -0,0 +1,53 @@
+# tests/unit/test_relevance.py
+from src.graph.nodes import filter_sources
+from src.models.plan import ResearchPlan, ResearchQuery
+
+
+def test_only_top_sources_per_depth_are_kept():
+    """Off-topic sources are dropped once there are more than depth * SOURCES_PER_DEPTH."""
+    plan = ResearchPlan(
+        main_topic="Solar power",
+        subtopics=["Battery storage"],
+        queries=[ResearchQuery(query="solar battery storage cost", purpose="Costs", subtopic="Battery storage")],
+        expected_depth=1,
+        estimated_sources=3
+    )
+    results = [
+        {"url": "https://a.example.com", "content": "Recipes for chocolate cake and cookies."},
+        {"url": "https://b.example.com", "content": "Solar battery storage cost fell sharply."},
+        {"url": "https://c.example.com"},
+        {"url": "https://d.example.com", "content": "Solar power output depends on the weather."},
+        {"url": "https://e.example.com", "content": "Football league results from the weekend."},
+        {"url": "https://f.example.com", "content": "Battery storage smooths solar power supply."}
+    ]
+    state = {"topic": "Solar power", "depth": 1, "research_plan": plan, "search_results": results}
+
+    result = filter_sources(state)
+
+    assert [source["url"] for source in result["search_results"]] == [
+        "https://b.example.com", "https://d.example.com", "https://f.example.com"
+    ]
+    assert result["relevance_filter"] == {"candidates": 5, "selected": 3}
+
+
+def test_stored_sources_are_matched_to_subtopics():
+    """Stored sources cover a subtopic only if they mention it and enough of the topic, once each."""
+    from src.services.relevance import select_reusable_sources
+
+    def stored(url, title, summary):
+        return {"url": url, "title": title, "summary": {"summary": summary, "key_points": []}, "subtopics": []}
+
+    sources = [
+        stored("https://a.example.com", "Solar battery storage", "Battery storage costs for solar power."),
+        stored("https://b.example.com", "Battery chemistry", "Lithium battery chemistry for phones."),
+        stored("https://c.example.com", "Solar panel efficiency", "Solar power panels convert sunlight."),
+        stored("https://d.example.com", "Home batteries", "Storing solar power in home battery storage.")
+    ]
+    plan = ResearchPlan(main_topic="Solar power", subtopics=["Battery storage", "Panel efficiency", "Policy"],
+                        queries=[], expected_depth=1, estimated_sources=3)
+
+    selected = select_reusable_sources(sources, "Solar power", plan, per_subtopic=2, min_match=0.5)
+
+    assert [s["url"] for s in selected["Battery storage"]] == ["https://a.example.com", "https://d.example.com"]
+    assert [s["url"] for s in selected["Panel efficiency"]] == ["https://c.example.com"]
+    assert "Policy" not in selected
@@ -0,0 +1,83 @@
+# tests/unit/test_scheduler.py
+import asyncio
+import pytest
+from unittest.mock import patch
+from src.services.llm_cache import CachedLLM, commit_response
+from src.services.scheduler import LLMScheduler, TokenBucket
+from tests.unit.fakes import FakeLLM
+
+
+def test_map_preserves_order_and_isolates_failures():
+    """Results follow input order and one failure does not cancel the rest."""
+    scheduler = LLMScheduler(max_in_flight=2, requests_per_minute=0, tokens_per_minute=0)
+    in_flight = 0
+    peak = 0
+
+    async def call(i):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05 * (4 - i))
+        in_flight -= 1
+        if i == 1:
+            raise ValueError("bad response")
+        return i
+
+    results = asyncio.run(scheduler.map([lambda i=i: call(i) for i in range(4)], [10] * 4))
+
+    assert results[0] == 0
+    assert isinstance(results[1], ValueError)
+    assert results[2:] == [2, 3]
+    assert peak == 2
+
+
+def test_token_bucket_delays_once_budget_is_spent():
+    """Requests beyond the per-minute budget wait for the bucket to refill."""
+    bucket = TokenBucket(per_minute=60)
+
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+    assert TokenBucket(per_minute=0).reserve(1000) == 0
+
+
+def test_calls_waiting_for_budget_do_not_hold_slots():
+    """A call that has its budget runs while earlier calls still wait for the bucket to refill."""
+    scheduler = LLMScheduler(max_in_flight=1, requests_per_minute=0, tokens_per_minute=60)
+    finished = []
+
+    async def call(name):
+        finished.append(name)
+        return name
+
+    async def run():
+        assert scheduler.tokens.reserve(60) == 0  # Spend the budget
+        waiting = asyncio.ensure_future(scheduler.submit(lambda: call("waiting"), tokens=60))
+        await asyncio.sleep(0.05)
+        scheduler.tokens.capacity = 0  # Lift the limit for later calls
+        await asyncio.wait_for(scheduler.submit(lambda: call("free")), timeout=1)
+        waiting.cancel()
+
+    asyncio.run(run())
+
+    assert finished == ["free"]
+
+
+def test_cached_replies_use_no_rate_budget(tmp_path):
+    """Only replies that reach the provider take a request from the bucket."""
+    llm = FakeLLM()
+    cached = CachedLLM(llm, "llama3-70b-8192", 0.1)
+    scheduler = LLMScheduler(max_in_flight=1, requests_per_minute=60, tokens_per_minute=0)
+
+    async def ask():
+        response = await scheduler.ainvoke(cached, "Create a detailed research plan")
+        commit_response(cached, "Create a detailed research plan", response)
+        return response
+
+    with patch("src.services.llm_cache.LLM_CACHE_PATH", str(tmp_path / "llm.sqlite3")):
+        first = asyncio.run(ask())
+        budget = scheduler.requests.available
+        repeats = [asyncio.run(ask()) for _ in range(3)]
+
+    assert llm.calls == 1
+    assert all(response.content == first.content for response in repeats)
+    assert scheduler.requests.available >= budget
@@ -0,0 +1,64 @@
+# tests/unit/test_search.py
+import asyncio
+import time
+import pytest
+from unittest.mock import Mock, patch
+from src.models.plan import ResearchQuery
+from src.services.search import run_searches
+from src.utils.urls import normalize_url
+
+QUERIES = [
+    ResearchQuery(query="causes of climate change", purpose="Causes", subtopic="Causes"),
+    ResearchQuery(query="effects of climate change", purpose="Effects", subtopic="Effects"),
+]
+
+RESULTS = {
+    "causes of climate change": [
+        {"url": "https://www.example.com/climate/?utm_source=x", "title": "Climate", "score": 0.5},
+        {"url": "https://causes.example.org/", "title": "Causes", "score": 0.7},
+    ],
+    "effects of climate change": [
+        {"url": "https://example.com/climate#effects", "title": "Climate", "score": 0.9},
+    ],
+}
+
+
+def test_normalize_url():
+    """Trivially different URLs normalize to the same key."""
+    assert normalize_url("HTTPS://www.Example.com:443/a/?b=2&a=1&utm_medium=x#top") == "https://example.com/a?a=1&b=2"
+    assert normalize_url("http://example.com:8080/") == "http://example.com:8080"
+
+
+def test_run_searches_merges_duplicate_urls():
+    """Queries run concurrently and results are de-duplicated by URL."""
+    async def ainvoke(query):
+        await asyncio.sleep(0.2)
+        return RESULTS[query]
+
+    with patch("src.services.search.get_search_tool") as mock_tool:
+        mock_tool.return_value.ainvoke = ainvoke
+
+        start = time.monotonic()
+        results = asyncio.run(run_searches(QUERIES, max_results=4))
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 0.35
+    assert [r["title"] for r in results] == ["Climate", "Causes"]
+    assert results[0]["queries"] == ["causes of climate change", "effects of climate change"]
+    assert results[0]["subtopics"] == ["Causes", "Effects"]
+    assert results[0]["score"] == 0.9
+
+
+def test_run_searches_skips_failed_queries():
+    """A failing query is reported and does not drop the other results."""
+    async def ainvoke(query):
+        if query.startswith("causes"):
+            raise RuntimeError("rate limited")
+        return RESULTS[query]
+
+    with patch("src.services.search.get_search_tool") as mock_tool:
+        mock_tool.return_value.ainvoke = ainvoke
+        results = asyncio.run(run_searches(QUERIES, max_results=4))
+
+    assert len(results) == 1
+    assert results[0]["queries"] == ["effects of climate change"]
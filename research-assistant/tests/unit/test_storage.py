@@ -0,0 +1,91 @@
+# tests/unit/test_storage.py
+import json
+import os
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from src.services import storage
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path):
+    """Point storage at a temporary directory."""
+    storage._migrated_users.clear()
+    with patch("src.services.storage.STORAGE_DIR", str(tmp_path)):
+        yield tmp_path
+
+
+def test_save_brief_appends_and_reads_latest(isolated_storage):
+    """Briefs are appended and the latest N can be read without the rest."""
+    for i in range(5):
+        storage.save_brief("alice", {"topic": f"Topic {i}", "timestamp": datetime(2025, 1, i + 1)})
+    storage.save_brief("bob", {"topic": "Other user"})
+
+    latest = storage.get_previous_interactions("alice", limit=2)
+
+    assert [brief["topic"] for brief in latest] == ["Topic 3", "Topic 4"]
+    assert len(storage.get_previous_interactions("alice")) == 5
+    assert latest[-1]["timestamp"] == "2025-01-05T00:00:00"
+
+
+def test_legacy_json_file_is_migrated(isolated_storage):
+    """Existing {user_id}.json files are imported transparently, once."""
+    legacy_path = isolated_storage / "carol.json"
+    legacy_path.write_text(json.dumps({"briefs": [
+        {"topic": "Old topic", "summary": "Old summary", "timestamp": "2024-05-01T10:00:00"}
+    ]}))
+
+    storage.save_brief("carol", {"topic": "New topic", "timestamp": "2025-05-01T10:00:00"})
+    briefs = storage.get_previous_interactions("carol")
+
+    assert [brief["topic"] for brief in briefs] == ["Old topic", "New topic"]
+    assert not legacy_path.exists()
+    assert os.path.exists(f"{legacy_path}.migrated")
+
+
+def test_search_briefs_ranks_by_relevance():
+    """Only briefs relevant to the query are returned, best first."""
+    storage.save_brief("dave", {"topic": "Solar panel efficiency", "summary": "Photovoltaic cells convert sunlight."})
+    storage.save_brief("dave", {"topic": "Roman history", "summary": "The empire and its emperors."})
+    storage.save_brief("dave", {"topic": "Solar power storage", "summary": "Batteries store solar energy."})
+
+    results = storage.search_briefs("dave", "solar battery storage", limit=2)
+
+    assert [brief["topic"] for brief in results] == ["Solar power storage", "Solar panel efficiency"]
+    assert storage.search_briefs("erin", "solar", limit=2) == []
+
+
+def test_sources_are_kept_per_user_by_url():
+    """Saving a URL again replaces it, and only the most recently used sources are kept."""
+    def source(i, title="Page"):
+        return {"url": f"https://example.com/{i}", "title": f"{title} {i}", "content": f"Content {i}",
+                "summary": {"summary": f"Summary {i}"}, "subtopics": ["Solar"]}
+
+    with patch("src.services.storage.SOURCE_STORE_MAX_PER_USER", 2):
+        storage.save_sources("frank", [source(1)])
+        storage.save_sources("frank", [source(2)])
+        storage.save_sources("frank", [source(1, "Updated"), source(3)])
+
+    listed = storage.list_sources("frank")
+    stored = storage.get_sources("frank", ["https://example.com/1", "https://example.com/2"])
+
+    assert sorted(s["url"] for s in listed) == ["https://example.com/1", "https://example.com/3"]
+    assert "content" not in listed[0]
+    assert list(stored) == ["https://example.com/1"]
+    assert stored["https://example.com/1"]["title"] == "Updated 1"
+    assert stored["https://example.com/1"]["content"] == "Content 1"
+    assert storage.get_sources("gina", ["https://example.com/1"]) == {}
+
+
+def test_sources_are_capped_by_content_size():
+    """The least recently used sources are dropped once a user's stored content passes the byte cap."""
+    def source(i):
+        return {"url": f"https://example.com/{i}", "title": f"Page {i}", "content": "x" * 100,
+                "summary": {"summary": f"Summary {i}"}, "subtopics": ["Solar"]}
+
+    with patch("src.services.storage.SOURCE_STORE_MAX_BYTES_PER_USER", 250):
+        storage.save_sources("hana", [source(1)])
+        storage.save_sources("hana", [source(2)])
+        storage.save_sources("hana", [source(3)])
+
+    assert sorted(s["url"] for s in storage.list_sources("hana")) == ["https://example.com/2", "https://example.com/3"]
@@ -0,0 +1,51 @@
+# tests/unit/test_tokens.py
+from unittest.mock import Mock
+from src.services.tokens import count_tokens, fit_prompt, record_usage, response_usage, total_usage
+
+
+def test_oversized_prompt_is_trimmed_to_context_window():
+    """A prompt that would overflow llama3-70b's 8192-token window keeps its start and end."""
+    prompt = "Synthesize a brief.\n" + "source text " * 20000 + "\nRespond in JSON."
+
+    trimmed, tokens = fit_prompt(prompt, "llama3-70b-8192", max_completion_tokens=4000)
+
+    assert tokens == count_tokens(trimmed)
+    assert tokens + 4000 <= 8192
+    assert trimmed.startswith("Synthesize a brief.")
+    assert trimmed.endswith("Respond in JSON.")
+    assert fit_prompt("short prompt", "llama3-70b-8192", 4000)[0] == "short prompt"
+
+
+def test_oversized_prompt_drops_whole_sources():
+    """Trimming drops whole sources from the middle, never part of one."""
+    sources = [f"Source {i}: https://example.com/{i}\n" + f"finding {i} " * 300 for i in range(1, 41)]
+    prompt = "Synthesize a brief.\n\n" + "\n\n".join(sources) + "\n        \n        Respond in JSON."
+
+    trimmed, tokens = fit_prompt(prompt, "llama3-70b-8192", max_completion_tokens=4000)
+
+    assert tokens + 4000 <= 8192
+    assert trimmed.startswith("Synthesize a brief.\n\nSource 1:")
+    assert trimmed.endswith("Respond in JSON.")
+    kept = [source for source in sources if source in trimmed]
+    assert 0 < len(kept) < len(sources)
+    assert trimmed.count("Source ") == len(kept)
+
+
+def test_usage_is_recorded_per_node_and_model():
+    """Calls are broken down by node and model, preferring provider-reported counts."""
+    usage = {}
+    reported = Mock(content="ok", usage_metadata={"input_tokens": 100, "output_tokens": 20})
+
+    record_usage(usage, "planning", "llama3-70b-8192", *response_usage(reported, 90, "ok"))
+    record_usage(usage, "source_summarization", "mixtral-8x7b-32768", 50, 10)
+    record_usage(usage, "source_summarization", "mixtral-8x7b-32768", 50, 10)
+
+    assert usage["nodes"]["planning"] == {"calls": 1, "prompt": 100, "completion": 20, "total": 120}
+    assert usage["models"]["mixtral-8x7b-32768"]["calls"] == 2
+    assert total_usage(usage) == {"prompt": 200, "completion": 40, "total": 240}
+
+
+def test_usage_falls_back_for_responses_without_metadata():
+    """Responses without usage metadata or text content are counted from what they have."""
+    assert response_usage(Mock(), 90, Mock()) == (90, 0)
+    assert response_usage(Mock(usage_metadata=None), 90, "four words of text") == (90, count_tokens("four words of text"))
@@ -0,0 +1,102 @@
+# tests/unit/test_workflow.py
+import asyncio
+import time
+from unittest.mock import patch
+from src.graph.state import ResearchState
+from src.services.events import progress_listener
+from tests.unit.fakes import FakeSearchTool, FakeWeb, offline_workflow
+
+
+def _state(depth: int = 1) -> dict:
+    return ResearchState(user_id="test_user", topic="Test topic", depth=depth, is_follow_up=False).dict()
+
+
+def test_slow_subtopic_does_not_delay_the_others(tmp_path):
+    """Subtopic 3's pages only arrive once the other subtopics are summarized, and all branches are merged for synthesis."""
+    web = FakeWeb()
+    order = []
+
+    def listener(event, data):
+        if event == "source_summary":
+            order.append(data["subtopic"])
+
+    async def hold_subtopic_3(urls):
+        if any("subtopic-3" in url for url in urls):
+            # Sequential branches would never get here: fail instead of hanging
+            deadline = time.monotonic() + 10
+            while not {"Subtopic 1", "Subtopic 2"} <= set(order) and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            order.append("fetched Subtopic 3")
+
+    web.before_fetch = hold_subtopic_3
+    with offline_workflow(str(tmp_path), web=web):
+        from src.graph.workflow import get_research_graph
+        with progress_listener(listener):
+            result = asyncio.run(get_research_graph().ainvoke(_state()))
+
+    assert result.get("error") is None
+    assert set(result["source_subtopics"]) == {"Subtopic 1", "Subtopic 2", "Subtopic 3"}
+    assert result["source_subtopics"] == sorted(result["source_subtopics"])
+    slow_fetched = order.index("fetched Subtopic 3")
+    assert {"Subtopic 1", "Subtopic 2"} <= set(order[:slow_fetched])
+    assert set(order[slow_fetched + 1:]) == {"Subtopic 3"}
+    assert result["token_usage"]["nodes"]["source_summarization"]["calls"] == len(result["source_summaries"])
+
+
+def test_page_found_for_several_subtopics_is_summarized_once(tmp_path):
+    """A page every subtopic finds is summarized by one branch only."""
+    shared = {"url": "https://shared.example.com/page", "title": "Shared", "content": "snippet", "score": 1}
+
+    with offline_workflow(str(tmp_path), search_tool=FakeSearchTool(extra=[shared])), \
+            patch("src.graph.nodes.SOURCES_PER_DEPTH", 100):
+        from src.graph.workflow import get_research_graph
+        result = asyncio.run(get_research_graph().ainvoke(_state(depth=2)))
+
+    urls = [summary.source_url for summary in result["source_summaries"]]
+    assert urls.count("https://shared.example.com/page") == 1
+    assert len(urls) == len(set(urls))
+
+
+def test_near_duplicate_pages_of_different_subtopics_are_summarized_once(tmp_path):
+    """Branches share their page sketches, so a page syndicated under another URL is only summarized by one of them."""
+    class SyndicatedWeb(FakeWeb):
+        def page(self, url):
+            # The first result of every query is the same article
+            return super().page("https://example.com/article" if url.endswith("/0") else url)
+
+    with offline_workflow(str(tmp_path), web=SyndicatedWeb()), \
+            patch("src.graph.nodes.SOURCES_PER_DEPTH", 100):
+        from src.graph.workflow import get_research_graph
+        result = asyncio.run(get_research_graph().ainvoke(_state(depth=2)))
+
+    urls = [summary.source_url for summary in result["source_summaries"]]
+    assert sum(1 for url in urls if url.endswith("/0")) == 1
+    assert len(urls) == 7
+    assert result["deduplication"]["duplicates_removed"] == 5
+    # Every copy, whichever branch found it, is listed on the page that was kept
+    [article] = [source for source in result["search_results"] if source["url"].endswith("/0")]
+    assert len(article["duplicates"]) == 5
+
+
+def test_page_that_fails_for_one_subtopic_is_fetched_by_another(tmp_path):
+    """A branch only claims pages it fetched and kept, so a failed fetch does not hide the page from the others."""
+    shared = {"url": "https://shared.example.com/page", "title": "Shared", "content": "snippet", "score": 1}
+
+    class FlakyWeb(FakeWeb):
+        async def fetch_pages(self, urls, client=None, store=None):
+            # The first branch to ask for the shared page cannot reach it
+            if shared["url"] not in self.fetched:
+                self.failing = {shared["url"]}
+            pages = await super().fetch_pages(urls, client=client, store=store)
+            self.failing = set()
+            return pages
+
+    web = FlakyWeb()
+    with offline_workflow(str(tmp_path), search_tool=FakeSearchTool(extra=[shared]), web=web), \
+            patch("src.graph.nodes.SOURCES_PER_DEPTH", 100):
+        from src.graph.workflow import get_research_graph
+        result = asyncio.run(get_research_graph().ainvoke(_state(depth=2)))
+
+    urls = [summary.source_url for summary in result["source_summaries"]]
+    assert web.fetched.count(shared["url"]) >= 2
+    assert urls.count(shared["url"]) == 1